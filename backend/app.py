@@ -1,12 +1,14 @@
 import streamlit as st
 import json
 import os
-from streamlit_advanced_audio import audix, WaveSurferOptions
-from main import process_audio_with_music_ai
-from chordsSync import sync_lyrics_with_chords, load_json_files
-from display import display_synced_lyrics
-from slice_audio import extract_chord_segments
-from utils import get_instruments, mix_audio_files
+# Audio/DSP modules (numpy, soundfile, soxr, the waveform component) are
+# imported where they are first needed, so a cold start only loads these
+from chordsSync import sync_lyrics_with_chords, load_json_files, load_or_sync_all, ALIGN_TOLERANCE
+from utils import mix_audio_files, mix_audio_region, common_samplerate, get_active_tracks
+from audio_cache import cache_path
+from job_queue import enqueue_job, ensure_worker, get_job, list_jobs, SUCCEEDED, FAILED
+import job_queue
+from library import connect, get_song, index_song, record_artifact, record_play, search_songs, list_chords
 from constants import *
 
 # Get the directory where this script is located
@@ -15,6 +17,22 @@ RESULTS_DIR = os.path.join(SCRIPT_DIR, "results")
 DEMO_DIR = os.path.join(RESULTS_DIR, "demo")
 API_DIR = os.path.join(RESULTS_DIR, "api")
 
+@st.cache_resource
+def library_connection():
+    """The song library, opened (and migrated) once per server process for every session."""
+    return connect(check_same_thread=False)
+
+# Song library index (replaces per-request directory scans)
+library_conn = library_connection()
+
+@st.cache_resource
+def jobs_connection():
+    """The job queue, opened once per server process for every session and fragment poll."""
+    return job_queue.connect(check_same_thread=False)
+
+# Persistent Music.AI job queue (processed by a separate worker process)
+jobs_conn = jobs_connection()
+
 # Set page config
 st.set_page_config(
     page_title="Play Along",
@@ -39,6 +57,8 @@ def create_waveform_player(audio_file):
         with open(temp_audio_path, "wb") as f:
             f.write(audio_file.getbuffer())
         
+        from streamlit_advanced_audio import audix, WaveSurferOptions
+        
         # Configure WaveSurfer options with custom styling
         options = WaveSurferOptions(
             wave_color="#1DB954",           # Spotify green
@@ -70,6 +90,8 @@ def create_waveform_player(audio_file):
                 if result.get('selectedRegion'):
                     region = result['selectedRegion']
                     st.caption(f"🎯 Selected: {region.get('start', 0):.1f}s - {region.get('end', 0):.1f}s")
+                    # Remembered as the default loop region of the play-along
+                    st.session_state.selected_region = (region.get('start', 0), region.get('end', 0))
         
         # Clean up temp file after a delay
         try:
@@ -84,20 +106,74 @@ def create_waveform_player(audio_file):
         # Fallback to native player
         st.audio(audio_file, format=f"audio/{file_ext}" if '.' in audio_file.name else "audio/mp3")
 
+@st.fragment(run_every=1.0)
+def show_practice_progress(render):
+    """
+    Poll a background practice render and rerun the page once it finishes.
+    Meanwhile the part rendered so far is playable; the player is refreshed at
+    5%, 25%, 50% and 75% (a refresh restarts it, so not on every poll).
+    """
+    if render['error']:
+        st.error(f"Error rendering practice track: {render['error']}")
+    elif render['done']:
+        st.rerun()
+    else:
+        st.progress(render['progress'], text=f"Rendering practice track... {render['progress']:.0%}")
+        stage = sum(render['progress'] >= mark for mark in (0.05, 0.25, 0.5, 0.75))
+        snapshot = st.session_state.get("practice_partial")
+        if stage and (snapshot is None or snapshot[0] != render['path'] or snapshot[1] < stage) \
+                and os.path.exists(render['partial_path']):
+            with open(render['partial_path'], 'rb') as f:
+                snapshot = (render['path'], stage, f.read())
+            st.session_state.practice_partial = snapshot
+        if snapshot and snapshot[0] == render['path']:
+            # The same bytes keep the same media URL, so the player keeps playing
+            st.audio(snapshot[2], format="audio/wav")
+
+@st.fragment(run_every=2.0)
+def show_job_progress(job_id):
+    """
+    Follow a queued Music.AI job. Lyrics and chords are loaded as soon as they
+    are downloaded; the page reruns as each stem lands and once the job finishes.
+    """
+    job = get_job(jobs_conn, job_id)
+    if job is None:
+        del st.session_state.active_job_id
+        return
+    
+    if job['status'] == SUCCEEDED:
+        st.session_state.results_folder = job['output_dir']
+        st.session_state.process_completed = True
+        st.session_state.pop("partial_results", None)
+        st.session_state.pop("job_artifacts_seen", None)
+        index_song(library_conn, job['output_dir'])
+        del st.session_state.active_job_id
+        st.rerun()
+    elif job['status'] == FAILED:
+        st.session_state.job_error = job['message'] or "Unknown error"
+        st.session_state.show_backup_upload = True
+        del st.session_state.active_job_id
+        st.rerun()
+    else:
+        st.info(f"⏳ Job {job['id']}: {job['message'] or job['status']}")
+        if job_queue.first_content_ready(job):
+            downloaded = sum(1 for artifact in job['artifacts'].values() if artifact['done'])
+            if st.session_state.get("job_artifacts_seen") != downloaded:
+                st.session_state.job_artifacts_seen = downloaded
+                st.session_state.results_folder = job['output_dir']
+                st.session_state.process_completed = True
+                st.session_state.partial_results = job['output_dir']
+                st.rerun(scope="app")
+
 def find_latest_json_files(output_dir):
-    """Find the latest generated JSON files in the output directory."""
-    lyrics_file = None
+    """Find the lyrics and chords JSON files of a song through the library index."""
+    song = get_song(library_conn, output_dir) or index_song(library_conn, output_dir)
+    lyrics_file = song['lyrics_file'] if song else None
     chords_file = None
     
-    if os.path.exists(output_dir):
-        files = os.listdir(output_dir)
-        for file in files:
-            if file.endswith(".json"):
-                file_path = os.path.join(output_dir, file)
-                if "lyrics" in file.lower():
-                    lyrics_file = file_path
-                elif "piano" in file.lower() or "chord" in file.lower():
-                    chords_file = file_path
+    if song and song['instruments']:
+        instrument = song['instruments'].get('piano') or next(iter(song['instruments'].values()))
+        chords_file = instrument['chords']
     
     print(f"Found lyrics file: {lyrics_file}")
     print(f"Found chords file: {chords_file}")
@@ -167,30 +243,18 @@ with col1:
                 else:
                     print(f"Saved uploaded file to {temp_file_path} ({os.path.getsize(temp_file_path)} bytes)")
                     
-                    # Use imported function from main.py
-                    with st.spinner("Processing audio with Music.AI..."):
-                        result = process_audio_with_music_ai(
-                            api_key=API_KEY,
-                            workflow_name=WORKFLOW_NAME,
-                            mp3_file_path=temp_file_path,
-                            output_dir=API_DIR,  # API results go to results/api
-                            verbose=True
-                        )
-                        print(f"Music.AI processing result: {result}")
+                    # Queue the job: a separate worker process uploads, polls and downloads,
+                    # so the job survives page reloads and server restarts
+                    job = enqueue_job(jobs_conn, temp_file_path, API_DIR, WORKFLOW_NAME)
+                    ensure_worker(conn=jobs_conn)
+                    st.session_state.active_job_id = job['id']
+                    st.session_state.pop("job_error", None)
+                    print(f"Queued Music.AI job {job['id']} ({job['output_dir']})")
                     
-                    if result["success"]:
-                        st.success("✅ Job completed successfully!")
-                        # Set the results folder for the unified workflow
-                        st.session_state.results_folder = API_DIR
-                        st.session_state.process_completed = True
-
-                        # Clean up temp file
-                        if os.path.exists(temp_file_path):
-                            os.remove(temp_file_path)
-                            print(f"Cleaned up temp file: {temp_file_path}")
-                    else:
-                        st.error(f"Job failed: {result.get('message', 'Unknown error')}")
-                        st.session_state.show_backup_upload = True
+                    # Clean up temp file (the queue keeps its own copy)
+                    if os.path.exists(temp_file_path):
+                        os.remove(temp_file_path)
+                        print(f"Cleaned up temp file: {temp_file_path}")
             
             except Exception as e:
                 st.error(f"Error processing with Music.AI: {str(e)}")
@@ -209,10 +273,58 @@ with col2:
             # Set the results folder for the unified workflow
             st.session_state.results_folder = DEMO_DIR
             st.session_state.process_completed = True
+            index_song(library_conn, DEMO_DIR)
             st.success("✅ Demo loaded successfully!")
         else:
             st.error("Demo files not found. Demo functionality is not available in this deployment.")
 
+# Browse previously processed songs (queries the library index only)
+st.divider()
+st.header("📚 Song Library")
+
+col1, col2 = st.columns(2)
+
+with col1:
+    title_query = st.text_input("Search by title", key="library_title")
+
+with col2:
+    only_chords = st.multiselect("Songs using only these chords", list_chords(library_conn), key="library_chords")
+
+matching_songs = search_songs(library_conn, title=title_query or None, only_chords=only_chords or None)
+if matching_songs:
+    song_labels = {
+        f"{song['title']} (key {song['song_key'] or '?'}, {int((song['duration'] or 0) // 60)}:{int((song['duration'] or 0) % 60):02d})": song
+        for song in matching_songs
+    }
+    selected_label = st.selectbox("Songs", list(song_labels.keys()), key="library_song")
+    if st.button("📂 Load Song", key="load_library_song"):
+        st.session_state.results_folder = song_labels[selected_label]['folder']
+        st.session_state.process_completed = True
+        st.success("✅ Song loaded successfully!")
+else:
+    st.info("No processed songs match your search.")
+
+# Progress of queued Music.AI jobs (any session can follow any job)
+active_jobs = list_jobs(jobs_conn, active_only=True)
+if active_jobs:
+    # Restart the worker if the server restarted while jobs were in flight
+    ensure_worker(conn=jobs_conn)
+
+if "active_job_id" in st.session_state:
+    show_job_progress(st.session_state.active_job_id)
+elif active_jobs:
+    job_labels = {f"Job {job['id']} ({job['status'].lower()})": job['id'] for job in active_jobs}
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_job = st.selectbox("Jobs in progress", list(job_labels.keys()), key="follow_job_select")
+    with col2:
+        if st.button("📡 Follow Job", key="follow_job"):
+            st.session_state.active_job_id = job_labels[selected_job]
+            st.rerun()
+
+if st.session_state.get("job_error"):
+    st.error(f"Job failed: {st.session_state.job_error}")
+
 # Show backup file upload only if processing failed
 if st.session_state.get("show_backup_upload", False):
     st.divider()
@@ -249,15 +361,55 @@ if st.session_state.get("process_completed", False):
     
     results_folder = st.session_state.results_folder
     
-    # Gather all stems and chord files from the selected folder
-    if os.path.exists(results_folder):
-        files = os.listdir(results_folder)
-        chords_files = [os.path.join(results_folder, f) for f in files if f.endswith("_chords.json")]
-        stem_files = [os.path.join(results_folder, f) for f in files if f.endswith(".wav")]
-        lyrics_file = os.path.join(results_folder, "lyrics.json")
+    # Stems, chord files and instruments come from the library index
+    if st.session_state.get("partial_results") == results_folder:
+        # Results still arriving: re-index so newly downloaded stems show up
+        song = index_song(library_conn, results_folder)
+    else:
+        song = get_song(library_conn, results_folder) or index_song(library_conn, results_folder)
+    if song:
+        from display import (
+            display_synced_lyrics, display_synced_lyrics_diff, synced_lyrics_views, synced_lyrics_diff,
+            update_synced_lyrics_views, chord_positions
+        )
+        from slice_audio import extract_chord_segments, extract_representative_chords
+        from loop import snap_region_to_bars
+        from audio_io import submit
+        from transpose import transpose_song
+        from practice import start_practice_render, scale_synced_data
+        from envelopes import load_envelopes, envelope_for
+        from storage import apply_storage_policy
         
-        # Load all available instruments and their files
-        instruments = get_instruments(chords_files=chords_files, stem_files=stem_files)
+        # Play counts decide which songs keep decoded stems for fast mixing and slicing
+        if st.session_state.get("played_folder") != song['folder']:
+            st.session_state.played_folder = song['folder']
+            record_play(library_conn, song['folder'])
+            submit(apply_storage_policy)
+        
+        # Transposition renders (once) a cached copy of the song in the new key
+        semitones = st.select_slider(
+            "🎚️ Transpose (semitones)",
+            options=list(range(-6, 7)),
+            value=0,
+            key="transpose_semitones"
+        )
+        if semitones:
+            with st.spinner(f"Transposing by {semitones:+d} semitones..."):
+                transposed_folder, transposed_mixes = transpose_song(song, semitones)
+                song = get_song(library_conn, transposed_folder)
+                if song is None or song['source_folder'] is None:
+                    # Not indexed yet, or indexed before transposed copies were marked
+                    song = index_song(library_conn, transposed_folder)
+                for inst, mix_file in transposed_mixes.items():
+                    if song['artifacts'].get(f"mix_{inst}") != mix_file:
+                        song = record_artifact(library_conn, transposed_folder, f"mix_{inst}", mix_file)
+            results_folder = song['folder']
+        
+        stem_files = song['stems']
+        lyrics_file = song['lyrics_file']
+        instruments = song['instruments']
+        # Per-stem activity computed at ingest (silent stems are already left out of instruments)
+        envelopes = load_envelopes(song['artifacts'].get('envelopes'))
         
         instrument_options = list(instruments.keys())
         if not instrument_options:
@@ -271,78 +423,260 @@ if st.session_state.get("process_completed", False):
                 key="mute_select"
             )
             
+            # Audition mode: one representative clip per distinct chord
+            audition_mode = st.checkbox(
+                "🎧 One clip per chord (faster)",
+                value=True,
+                key="audition_mode",
+                help="Play the same representative recording for every occurrence of a chord"
+            )
+            
+            # Slow practice: tempo-scaled playback rendered in the background
+            practice_rate = st.select_slider(
+                "🐢 Practice tempo",
+                options=[50, 60, 70, 75, 80, 90, 100],
+                value=100,
+                format_func=lambda pct: f"{pct}%",
+                key="practice_tempo"
+            ) / 100
+            
+            # How far (seconds) a chord may start from the word it is shown on
+            align_tolerance = st.slider(
+                "🎯 Chord-to-word tolerance (seconds)",
+                min_value=0.1,
+                max_value=2.0,
+                value=ALIGN_TOLERANCE,
+                step=0.05,
+                key="align_tolerance"
+            )
+            
             # Check if instrument changed to recalculate chords
             if "current_muted" not in st.session_state or st.session_state.current_muted != current_muted or "current_folder" not in st.session_state or st.session_state.current_folder != results_folder:
                 st.session_state.current_muted = current_muted
                 st.session_state.current_folder = results_folder
                 
-                # Load lyrics and chords for the muted instrument
-                with open(lyrics_file, 'r') as f:
-                    lyrics_data = json.load(f)
+                # Lyrics are synced against every instrument once per song;
+                # switching the muted instrument is then just a lookup
+                synced_cache = song['artifacts'].get('synced') or cache_path("synced", song['hash'], "json")
+                synced_all = load_or_sync_all(
+                    lyrics_file,
+                    {inst: files['chords'] for inst, files in instruments.items()},
+                    synced_cache
+                )
+                if 'synced' not in song['artifacts']:
+                    record_artifact(library_conn, results_folder, 'synced', synced_cache)
                 chords_filepath = instruments[current_muted]['chords']
-                with open(chords_filepath, 'r') as f:
-                    chords_data = json.load(f)
                 
-                # Sync lyrics and chords
-                st.session_state.synced_data = sync_lyrics_with_chords(lyrics_data, chords_data, verbose=False)
+                st.session_state.synced_data = synced_all.get(current_muted)
                 st.session_state.chords_filepath = chords_filepath
-                st.session_state.stem_filepath = instruments[current_muted]['audio']
             
-            # Get active tracks (all except muted)
-            # Always prioritize vocals, then add other instruments
-            active_tracks = []
-            active_track_names = []
-            vocals_audio = None
-            vocals_name = None
+            # Looked up on every run: while a job is still downloading, the stem may land later
+            st.session_state.stem_filepath = instruments[current_muted]['audio']
             
-            # First, check for vocals and keep it aside
-            for inst, files in instruments.items():
-                if inst.lower() == 'vocals' and files['audio']:
-                    vocals_audio = files['audio']
-                    vocals_name = inst.title()
-                    break
+            # Get active tracks (all except muted), always including vocals
+            active_tracks, active_track_names = get_active_tracks(instruments, current_muted)
             
-            # Add all active tracks except muted
-            for inst, files in instruments.items():
-                if inst != current_muted and files['audio']:
-                    active_tracks.append(files['audio'])
-                    active_track_names.append(inst.title())
+            # Start slicing the muted stem on the audio pool while the mix is built
+            slice_future = None
+            if st.session_state.get("stem_filepath"):
+                # Slice at the same rate the mix uses so clips and playback match
+                if audition_mode:
+                    # The envelope picks the clips, so only those are read from the stem
+                    slice_future = submit(
+                        extract_representative_chords,
+                        st.session_state.stem_filepath,
+                        st.session_state.chords_filepath,
+                        target_samplerate=common_samplerate(stem_files),
+                        envelope=envelope_for(envelopes, st.session_state.stem_filepath)
+                    )
+                else:
+                    slice_future = submit(
+                        extract_chord_segments,
+                        st.session_state.stem_filepath,
+                        st.session_state.chords_filepath,
+                        target_samplerate=common_samplerate(stem_files)
+                    )
             
-            # Ensure vocals is always included if available and not muted
-            if vocals_audio and current_muted.lower() != 'vocals' and vocals_audio not in active_tracks:
-                active_tracks.insert(0, vocals_audio)
-                if vocals_name not in active_track_names:
-                    active_track_names.insert(0, vocals_name)
+            # Stems still downloading: lyrics and chords are shown, mixing waits for them
+            waiting_for = []
+            if st.session_state.get("partial_results") == results_folder:
+                waiting_for = [inst.title() for inst, files in instruments.items() if inst != current_muted and not files['audio']]
             
-            if active_tracks:
+            if waiting_for:
+                st.info(f"⏳ Lyrics and chords are ready. Playback starts once these stems arrive: {', '.join(waiting_for)}")
+            elif active_tracks:
                 st.write(f"**Playing:** {' + '.join(active_track_names)}")
                 st.write(f"**Muted for play-along:** {current_muted.title()}")
                 
                 # Use a single reusable mixed file (overwrite each time)
                 mixed_file_path = os.path.join(results_folder, "mixed_playback.wav")
+                prerendered_mix = song['artifacts'].get(f"mix_{current_muted}")
+                
+                playback_path = None
+                
+                if prerendered_mix and os.path.exists(prerendered_mix):
+                    # Minus-one mix rendered ahead of time (e.g. transposed songs)
+                    playback_path = prerendered_mix
+                else:
+                    # Always regenerate the mixed file for the current selection
+                    with st.spinner("Mixing audio tracks..."):
+                        try:
+                            mixed_path = mix_audio_files(active_tracks, mixed_file_path)
+                            if mixed_path and os.path.exists(mixed_path):
+                                playback_path = mixed_path
+                            else:
+                                st.error("Failed to mix audio tracks")
+                        except Exception as e:
+                            st.error(f"Error mixing audio: {e}")
                 
-                # Always regenerate the mixed file for the current selection
-                with st.spinner("Mixing audio tracks..."):
-                    try:
-                        mixed_path = mix_audio_files(active_tracks, mixed_file_path)
-                        if mixed_path and os.path.exists(mixed_path):
-                            st.audio(mixed_path, format="audio/wav")
-                        else:
-                            st.error("Failed to mix audio tracks")
-                    except Exception as e:
-                        st.error(f"Error mixing audio: {e}")
+                if playback_path and practice_rate < 1.0:
+                    # Playable as soon as the first stretched blocks are written
+                    render = start_practice_render(playback_path, song['hash'], current_muted, practice_rate)
+                    if render['done']:
+                        st.session_state.pop("practice_partial", None)
+                        st.audio(render['path'], format="audio/wav")
+                    else:
+                        show_practice_progress(render)
+                elif playback_path:
+                    st.audio(playback_path, format="audio/wav")
+                
+                # Loop practice: mix only the selected range, read straight from the stems
+                with st.expander("🔁 Loop a passage"):
+                    duration = float(song['duration'] or 0.0)
+                    default_region = st.session_state.get("selected_region") or (0.0, min(duration, 10.0))
+                    default_region = (
+                        min(max(float(default_region[0]), 0.0), duration),
+                        min(max(float(default_region[1]), 0.0), duration)
+                    )
+                    loop_start, loop_end = st.slider(
+                        "Region (seconds)",
+                        min_value=0.0,
+                        max_value=max(duration, 0.1),
+                        value=default_region,
+                        step=0.1,
+                        key="loop_region"
+                    )
+                    if st.checkbox("Snap to bars", value=True, key="loop_snap"):
+                        loop_start, loop_end = snap_region_to_bars(loop_start, loop_end, instruments[current_muted]['chords'])
+                    
+                    if loop_end > loop_start:
+                        st.caption(f"Looping {loop_start:.2f}s - {loop_end:.2f}s")
+                        loop_file = cache_path("loops", f"{song['hash']}_{current_muted}_{loop_start:.3f}_{loop_end:.3f}")
+                        if os.path.exists(loop_file) or mix_audio_region(active_tracks, loop_start, loop_end, loop_file, envelopes=envelopes):
+                            st.audio(loop_file, format="audio/wav", loop=True)
             
             # Show lyrics for the muted instrument (chords only if not vocals)
             if "synced_data" in st.session_state:
                 st.subheader(f"🎼 Lyrics")
-                stem_filepath = st.session_state.stem_filepath
-                chords_filepath = st.session_state.chords_filepath
                 synced_data = st.session_state.synced_data
                 
+                # Tolerance changes and timing corrections re-align only the affected words
+                edit_timings = st.checkbox("✏️ Correct lyric timings", key="edit_timings")
+                sync_key = (results_folder, current_muted)
+                sync = st.session_state.get("lyric_sync")
+                # Words re-synced by this run, relative to synced_before (None: unknown)
+                changed = None
+                synced_before = None
+                if sync and sync['key'] != sync_key:
+                    sync = None
+                    st.session_state.pop("lyric_sync", None)
+                if sync or edit_timings or align_tolerance != ALIGN_TOLERANCE:
+                    from chordsSync import start_sync, update_sync, extract_chords, save_word_timings
+                    from loaders import Word, load_words, load_chords
+                    
+                    if sync is None:
+                        source_words = load_words(lyrics_file)
+                        sync = dict(
+                            start_sync(source_words, extract_chords(load_chords(st.session_state.chords_filepath)), align_tolerance),
+                            key=sync_key,
+                            source_words=source_words
+                        )
+                    
+                    words = sync['source_words']
+                    editor_key = f"timings_{song['hash']}_{current_muted}"
+                    if edit_timings:
+                        st.data_editor(
+                            [{'word': w.word, 'start': w.start, 'end': w.end} for w in sync['source_words']],
+                            key=editor_key,
+                            num_rows="fixed",
+                            width="stretch",
+                            height=250
+                        )
+                    # Only the edited rows are applied; every other Word is the loaded one
+                    edited_rows = st.session_state.get(editor_key, {}).get('edited_rows', {})
+                    if edited_rows:
+                        words = list(words)
+                        for row, change in edited_rows.items():
+                            word_info = words[int(row)]
+                            # Cleared cells keep the loaded value
+                            change = {column: value for column, value in change.items() if value is not None}
+                            words[int(row)] = Word(
+                                str(change.get('word', word_info.word)),
+                                float(change.get('start', word_info.start)),
+                                float(change.get('end', word_info.end))
+                            )
+                    
+                    synced_before = sync['synced']
+                    updated, changed = update_sync(sync, words_with_times=words, tolerance=align_tolerance)
+                    sync = st.session_state.lyric_sync = dict(updated, key=sync_key, source_words=sync['source_words'])
+                    synced_data = sync['synced']
+                    
+                    if edited_rows and st.button("💾 Save timings", key="save_timings"):
+                        if save_word_timings(lyrics_file, words):
+                            # Reload everything from the corrected file
+                            st.session_state.pop(editor_key, None)
+                            st.session_state.pop("lyric_sync", None)
+                            st.session_state.pop("current_folder", None)
+                            st.rerun()
+                
                 # Show chord buttons only if not vocals
                 show_chords = current_muted.lower() != "vocals"
                 
-                sliced_chords, sr = extract_chord_segments(stem_filepath, chords_filepath) if stem_filepath else (None, None)
-                display_synced_lyrics(synced_data, sliced_chords, sr, show_chords=show_chords)
+                sliced_chords, sr = slice_future.result() if slice_future else (None, None)
+                
+                # The page is built once per view; later changes reach it as diffs
+                # patched in place, so edits never rebuild or reload it. Only the
+                # words re-synced by this run are recomputed and compared.
+                view_key = (results_folder, current_muted, practice_rate, show_chords, audition_mode, bool(sliced_chords))
+                view = st.session_state.get("lyrics_view")
+                diff = None
+                if view and view['key'] == view_key:
+                    if view['synced'] is synced_data:
+                        indices = view['changed']
+                    elif changed is not None and view['synced'] is synced_before:
+                        view['views'], view['positions'], touched = update_synced_lyrics_views(
+                            view['views'], view['positions'], synced_data, changed, sliced_chords, rate=practice_rate
+                        )
+                        indices = view['changed'] | touched
+                    else:
+                        view['views'] = synced_lyrics_views(synced_data, sliced_chords, rate=practice_rate)
+                        view['positions'] = chord_positions(view['views'])
+                        indices = None
+                    view['synced'] = synced_data
+                    diff = synced_lyrics_diff(view['base'], view['views'], sliced_chords, sr, sent_clips=view['clips'], indices=indices)
+                if diff is None:
+                    view_id = os.urandom(8).hex()
+                    html = display_synced_lyrics(
+                        scale_synced_data(synced_data, practice_rate), sliced_chords, sr, show_chords=show_chords, view_id=view_id
+                    )
+                    views = synced_lyrics_views(synced_data, sliced_chords, rate=practice_rate)
+                    view = st.session_state.lyrics_view = {
+                        'key': view_key,
+                        'id': view_id,
+                        'html': html,
+                        'base': views,
+                        'views': views,
+                        'positions': chord_positions(views),
+                        'synced': synced_data,
+                        'changed': set(),
+                        'clips': {v[2] for v in views if v[2]}
+                    }
+                    diff = {'changes': [], 'clips': {}}
+                else:
+                    # Later diffs repeat the changes (they are cumulative) but not the clips
+                    view['changed'] = {change[0] for change in diff['changes']}
+                    view['clips'].update(diff['clips'])
+                    display_synced_lyrics(None, None, None, html=view['html'])
+                display_synced_lyrics_diff(view['id'], diff)
     else:
         st.error(f"Results folder {results_folder} not found.")
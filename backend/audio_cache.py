@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+from constants import CACHE_DIR
+
+# (path, size, mtime) -> content hash, so unchanged files are hashed only once per process
+_hash_memo = {}
+
+
+def file_hash(file_path, chunk_size=1 << 20):
+    """
+    Compute a content hash for a file, memoized on its size and modification time.
+
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int): Bytes read per iteration
+
+    Returns:
+        str: Hex digest of the file content
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+    _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def cache_path(kind, key, ext="wav"):
+    """
+    Build the on-disk location of a cached artifact.
+
+    Args:
+        kind (str): Cache namespace (e.g. "resampled")
+        key (str): Unique key inside the namespace
+        ext (str): File extension
+
+    Returns:
+        str: Path inside CACHE_DIR (the folder is created if needed)
+    """
+    folder = os.path.join(CACHE_DIR, kind)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{key}.{ext}")
+
+
+def cache_dir(kind, key):
+    """
+    Build (and create) a cache folder for artifacts made of several files.
+
+    Args:
+        kind (str): Cache namespace (e.g. "transposed")
+        key (str): Unique key inside the namespace
+
+    Returns:
+        str: Folder path inside CACHE_DIR
+    """
+    folder = os.path.join(CACHE_DIR, kind, key)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def write_audio_atomic(output_path, data, samplerate, subtype='FLOAT'):
+    """
+    Write audio to a temporary file and move it into place, so concurrent
+    readers never see a half-written cache entry.
+    """
+    import soundfile as sf
+
+    # Sessions are threads of one server process, so the thread is part of the name
+    temp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    sf.write(temp_path, data, samplerate, format='WAV', subtype=subtype)
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+def write_json_atomic(output_path, data):
+    """JSON counterpart of write_audio_atomic, for tables shared through the cache."""
+    temp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+def decoded_path(audio_file):
+    """
+    Cache location of the decoded copy of an audio file (raw float32 frames,
+    see storage.py). The key is tied to the exact file version (path, size
+    and modification time), so a rewritten stem never hits a stale copy.
+    """
+    stat = os.stat(audio_file)
+    key = hashlib.sha1(f"{os.path.abspath(audio_file)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+    return cache_path("decoded", key, "npy")
+
+
+def load_decoded(audio_file):
+    """
+    Memory-map the decoded copy of an audio file, if the storage policy made one.
+
+    Reads from the map only touch the pages they need and skip decoding
+    (FLAC stems) altogether.
+
+    Returns:
+        numpy memmap: Read-only frames (shaped like soundfile's output), or None
+    """
+    path = decoded_path(audio_file)
+    if not os.path.exists(path):
+        return None
+
+    import numpy as np
+
+    try:
+        return np.load(path, mmap_mode='r')
+    except (ValueError, OSError):
+        return None
+
+
+def read_audio(audio_file):
+    """
+    Read a whole audio file, from its decoded copy when there is one.
+
+    Returns:
+        tuple: (numpy array, sample rate)
+    """
+    import soundfile as sf
+
+    decoded = load_decoded(audio_file)
+    if decoded is not None:
+        return decoded, sf.info(audio_file).samplerate
+    return sf.read(audio_file)
+
+
+def read_resampled(audio_file, target_samplerate=None):
+    """
+    Read an audio file at the requested sample rate.
+
+    Files already at the target rate are read as-is. Otherwise the file is
+    resampled once with soxr and the result cached on disk, keyed by the
+    source content hash and the target rate.
+
+    Args:
+        audio_file (str): Path to the audio file
+        target_samplerate (int): Desired sample rate (None keeps the original)
+
+    Returns:
+        tuple: (numpy array, sample rate)
+    """
+    import soundfile as sf
+
+    if not target_samplerate or sf.info(audio_file).samplerate == target_samplerate:
+        return read_audio(audio_file)
+
+    cached_file = cache_path("resampled", f"{file_hash(audio_file)}_{target_samplerate}")
+    if os.path.exists(cached_file):
+        return sf.read(cached_file)
+
+    import soxr
+
+    data, samplerate = read_audio(audio_file)
+    print(f"Resampling {audio_file} from {samplerate} Hz to {target_samplerate} Hz...")
+    resampled = soxr.resample(data, samplerate, target_samplerate)
+    write_audio_atomic(cached_file, resampled, target_samplerate)
+    return resampled, target_samplerate
@@ -0,0 +1,88 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from constants import AUDIO_WORKERS
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # A forked child inherits the pool object but none of its threads
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_pool():
+    """
+    Return the process-wide thread pool used for audio decoding.
+
+    soundfile releases the GIL while decoding, so threads keep several cores
+    busy. The pool is bounded by AUDIO_WORKERS and shared by every caller.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(1, AUDIO_WORKERS), thread_name_prefix="audio")
+        return _pool
+
+
+def map_ordered(func, items):
+    """
+    Run func over items on the shared pool and return the results in input order.
+
+    Do not call this from inside a task already running on the pool: with every
+    worker busy waiting, the nested tasks would never be scheduled.
+
+    Args:
+        func (callable): Function applied to every item
+        items (iterable): Inputs
+
+    Returns:
+        list: Results, in the same order as items
+    """
+    return list(get_pool().map(func, items))
+
+
+def submit(func, *args, **kwargs):
+    """Schedule a single call on the shared pool and return its Future."""
+    return get_pool().submit(func, *args, **kwargs)
+
+
+def read_frames(audio_file, start=0, stop=None):
+    """
+    Read only the frames [start, stop) of an audio file (seeking, not decoding
+    the whole file). Hot songs are sliced straight out of their memory-mapped
+    decoded copy.
+
+    Returns:
+        tuple: (numpy array, sample rate)
+    """
+    import soundfile as sf
+    from audio_cache import load_decoded
+
+    decoded = load_decoded(audio_file)
+    if decoded is not None:
+        return decoded[start:stop], sf.info(audio_file).samplerate
+    return sf.read(audio_file, start=start, stop=stop)
+
+
+def read_blocks(audio_file, blocksize=65536):
+    """
+    Yield an audio file block by block, so long stems never have to be fully
+    decoded in memory.
+
+    Yields:
+        numpy array: The next block of frames
+    """
+    import soundfile as sf
+    with sf.SoundFile(audio_file) as f:
+        while True:
+            block = f.read(blocksize)
+            if not len(block):
+                break
+            yield block
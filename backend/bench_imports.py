@@ -0,0 +1,102 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must stay out of a cold start (loaded on first use instead)
+LAZY_MODULES = ["numpy", "soundfile", "soxr", "musicai_sdk", "streamlit_advanced_audio"]
+
+
+def startup_imports(script=os.path.join(SCRIPT_DIR, "app.py")):
+    """
+    List the modules a script imports at module level (what every cold start pays for).
+
+    Args:
+        script (str): Path to the Python script
+
+    Returns:
+        list: Module names, in import order
+    """
+    with open(script, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=script)
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure_imports(modules):
+    """
+    Import modules in a fresh interpreter with -X importtime.
+
+    Args:
+        modules (list): Module names to import
+
+    Returns:
+        tuple: (list of (module, self_us, cumulative_us) in import order, set of loaded lazy modules)
+    """
+    code = "import sys\n" + "".join(f"import {m}\n" for m in modules)
+    code += f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))\n"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SCRIPT_DIR,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    loaded = {m for m in proc.stdout.strip().split(",") if m}
+    return rows, loaded
+
+
+def report(rows, modules, top=15):
+    """Print the top-level module breakdown and the slowest individual imports."""
+    by_name = {name.strip(): cumulative for name, _, cumulative in rows if not name.startswith("  ")}
+    total = sum(by_name.values())
+
+    print(f"{'module':<48}{'cumulative ms':>15}")
+    for module in modules:
+        print(f"{module:<48}{by_name.get(module, 0) / 1000:>15.1f}")
+    print(f"{'total':<48}{total / 1000:>15.1f}")
+
+    print("\nSlowest imports (self time):")
+    for name, self_us, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"{name.strip():<48}{self_us / 1000:>15.1f}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import time of the app's cold start")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to measure (the fastest is reported)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail when the cold start takes longer than this")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    modules = startup_imports()
+    # The first run also warms the OS file cache; keep the fastest
+    runs = [measure_imports(modules) for _ in range(max(1, args.runs))]
+    rows, loaded = min(runs, key=lambda run: sum(c for n, _, c in run[0] if not n.startswith("  ")))
+    total = report(rows, modules, top=args.top)
+
+    failed = False
+    if loaded:
+        print(f"\nFAIL: heavy modules loaded at startup: {', '.join(sorted(loaded))}")
+        failed = True
+    if args.budget_ms is not None and total / 1000 > args.budget_ms:
+        print(f"\nFAIL: startup imports took {total / 1000:.1f} ms (budget {args.budget_ms:.1f} ms)")
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -1,7 +1,287 @@
 import json
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from loaders import Word, Chord, words_from_lyrics, chords_from_data, load_words, load_chords
 
 LYRICS_JSON_PATH = "results2/lyrics_file.json"
 CHORDS_JSON_PATH = "results2/piano_chords.json"
+# Maximum distance (seconds) between a chord and the start of the word it is placed on
+ALIGN_TOLERANCE = 0.5
+
+
+def extract_words(lyrics_data):
+    """
+    Flatten the lyrics phrases into Word records sorted by start time.
+    
+    Args:
+        lyrics_data (list): Lyrics data from JSON (or Word records from loaders)
+    
+    Returns:
+        list: Word records
+    """
+    if lyrics_data and isinstance(lyrics_data[0], Word):
+        return sorted(lyrics_data, key=lambda w: w.start)
+    return words_from_lyrics(lyrics_data)
+
+
+def extract_chords(chords_data):
+    """
+    Keep the chord events (skipping "N", no chord) sorted by start time.
+    
+    Args:
+        chords_data (list): Chords data from JSON (or Chord records from loaders)
+    
+    Returns:
+        list: Chord records
+    """
+    if not (chords_data and isinstance(chords_data[0], Chord)):
+        chords_data = chords_from_data(chords_data)
+    chords_with_times = [c for c in chords_data if c.chord != 'N']  # Skip "N" (no chord)
+    chords_with_times.sort(key=lambda c: c.start)
+    return chords_with_times
+
+
+def _place_chord(word_info, chords_with_times, chord_index, tolerance):
+    """
+    One step of the alignment: the chord placed on this word (or None) and the
+    position of the chord pointer for the next word.
+    """
+    # Look for the next chord that starts close to or before this word
+    if chord_index < len(chords_with_times):
+        chord_info = chords_with_times[chord_index]
+        
+        # If chord starts before the end of this word, place it with this word
+        if chord_info.start <= word_info.end:
+            # Only place chord if it's reasonably close to word start (within the tolerance)
+            chord = chord_info.chord if abs(chord_info.start - word_info.start) <= tolerance else None
+            return chord, chord_index + 1
+    # Otherwise the chord is too far in the future, stop looking
+    return None, chord_index
+
+
+def align_chords(words_with_times, chords_with_times, jit=None, times=None, tolerance=ALIGN_TOLERANCE):
+    """
+    Decide which chord (if any) is placed before each word.
+    
+    Args:
+        words_with_times (list): Output of extract_words
+        chords_with_times (list): Output of extract_chords
+        jit (dict): Compiled kernels to use ({} forces the Python loop;
+            default: kernels.jit_kernels(), i.e. only with USE_NUMBA=1)
+        times (tuple): kernels.word_times(words_with_times), shared between instruments
+        tolerance (float): Maximum distance (s) between a chord and its word's start
+    
+    Returns:
+        dict: {word_index: chord_name} for the words that get a chord
+    """
+    if words_with_times and chords_with_times and jit != {}:
+        from kernels import align_chord_placements
+        
+        placements = align_chord_placements(words_with_times, chords_with_times, tolerance, jit, times)
+        if placements is not None:
+            return placements
+    
+    placements = {}
+    chord_index = 0
+    
+    for word_idx, word_info in enumerate(words_with_times):
+        chord, chord_index = _place_chord(word_info, chords_with_times, chord_index, tolerance)
+        if chord:
+            placements[word_idx] = chord
+    
+    return placements
+
+
+def chord_cursors(words_with_times, chords_with_times):
+    """
+    Position of align_chords' chord pointer before each word (plus one entry
+    after the last word). The pointer depends only on word ends and chord
+    starts, never on the tolerance.
+    
+    Returns:
+        list: len(words_with_times) + 1 chord indices (non-decreasing)
+    """
+    cursors = [0]
+    chord_index = 0
+    for word_info in words_with_times:
+        if chord_index < len(chords_with_times) and chords_with_times[chord_index].start <= word_info.end:
+            chord_index += 1
+        cursors.append(chord_index)
+    return cursors
+
+
+def start_sync(words_with_times, chords_with_times, tolerance=ALIGN_TOLERANCE):
+    """
+    Align a song fully, keeping what update_sync needs to re-align it
+    incrementally after edits.
+    
+    Args:
+        words_with_times (list): Output of extract_words
+        chords_with_times (list): Output of extract_chords
+        tolerance (float): See align_chords
+    
+    Returns:
+        dict: {'words', 'chords', 'tolerance', 'placements', 'cursors', 'synced'}
+    """
+    placements = align_chords(words_with_times, chords_with_times, tolerance=tolerance)
+    return {
+        'words': list(words_with_times),
+        'chords': list(chords_with_times),
+        'tolerance': tolerance,
+        'placements': placements,
+        'cursors': chord_cursors(words_with_times, chords_with_times),
+        'synced': build_synced_result(words_with_times, placements),
+    }
+
+
+def _same_word(a, b):
+    return a.word == b.word and a.start == b.start and a.end == b.end
+
+
+def _same_chord(a, b):
+    return a.chord == b.chord and a.start == b.start
+
+
+def update_sync(sync, words_with_times=None, chords_with_times=None, tolerance=None):
+    """
+    Re-align a song after edits, recomputing only the words whose time window
+    changed, that border a changed chord or whose placement flips with the new
+    tolerance.
+    
+    Word and chord edits re-run the alignment from the first affected word,
+    until the chord pointer is back where the previous run had it (after the
+    last edit); from there on both runs are identical. A tolerance change
+    keeps the pointer as it is and only re-checks the words that consumed a
+    chord at a distance between the old and the new tolerance.
+    
+    Edits that add, remove or reorder words or chords fall back to a full
+    alignment.
+    
+    Args:
+        sync (dict): Output of start_sync or update_sync (left unchanged)
+        words_with_times (list): Edited words (None keeps the current ones)
+        chords_with_times (list): Edited chords (None keeps the current ones)
+        tolerance (float): New tolerance (None keeps the current one)
+    
+    Returns:
+        tuple: (new sync dict, sorted list of the word indices whose synced
+                entry changed, or None after a full alignment)
+    """
+    words = sync['words'] if words_with_times is None else list(words_with_times)
+    chords = sync['chords'] if chords_with_times is None else list(chords_with_times)
+    tolerance = sync['tolerance'] if tolerance is None else tolerance
+    old_words, old_chords, cursors = sync['words'], sync['chords'], sync['cursors']
+    
+    def in_order(items):
+        return all(items[i].start <= items[i + 1].start for i in range(len(items) - 1))
+    
+    if len(words) != len(old_words) or len(chords) != len(old_chords):
+        return start_sync(words, chords, tolerance), None
+    dirty_words = [i for i in range(len(words)) if words[i] is not old_words[i] and not _same_word(words[i], old_words[i])]
+    dirty_chords = [c for c in range(len(chords)) if chords[c] is not old_chords[c] and not _same_chord(chords[c], old_chords[c])]
+    if (dirty_words and not in_order(words)) or (dirty_chords and not in_order(chords)):
+        return start_sync(words, chords, tolerance), None
+    
+    placements = dict(sync['placements'])
+    new_cursors = list(cursors)
+    changed = set()
+    
+    # Where the edits start to matter: an edited word, or the first word that
+    # looks at an edited chord (a chord is only ever compared while the
+    # pointer is on it)
+    starts = list(dirty_words)
+    for c in dirty_chords:
+        first = bisect_left(cursors, c, 0, len(words))
+        if first < len(words) and cursors[first] == c:
+            starts.append(first)
+    
+    rerun = range(0)
+    if starts:
+        first_word, last_edit = min(starts), max(starts)
+        last_chord = max(dirty_chords, default=-1)
+        chord_index = cursors[first_word]
+        word_idx = first_word
+        while word_idx < len(words):
+            if word_idx > last_edit and chord_index == cursors[word_idx] and chord_index > last_chord:
+                break
+            new_cursors[word_idx] = chord_index
+            chord, chord_index = _place_chord(words[word_idx], chords, chord_index, tolerance)
+            if placements.get(word_idx) != chord:
+                changed.add(word_idx)
+                if chord:
+                    placements[word_idx] = chord
+                else:
+                    placements.pop(word_idx, None)
+            word_idx += 1
+        if word_idx == len(words):
+            new_cursors[word_idx] = chord_index
+        rerun = range(first_word, word_idx)
+    
+    # Tolerance: only words that consumed a chord between the two thresholds flip
+    if tolerance != sync['tolerance']:
+        low, high = sorted((tolerance, sync['tolerance']))
+        for word_idx in range(len(words)):
+            if word_idx in rerun or new_cursors[word_idx + 1] == new_cursors[word_idx]:
+                continue
+            chord_info = chords[new_cursors[word_idx]]
+            if low < abs(chord_info.start - words[word_idx].start) <= high:
+                changed.add(word_idx)
+                if abs(chord_info.start - words[word_idx].start) <= tolerance:
+                    placements[word_idx] = chord_info.chord
+                else:
+                    placements.pop(word_idx, None)
+    
+    # Words whose text or times changed need a new entry even with the same chord
+    changed.update(dirty_words)
+    synced = list(sync['synced'])
+    for word_idx in changed:
+        synced[word_idx] = build_synced_result([words[word_idx]], {0: placements[word_idx]} if word_idx in placements else {})[0]
+    
+    return {
+        'words': words,
+        'chords': chords,
+        'tolerance': tolerance,
+        'placements': placements,
+        'cursors': new_cursors,
+        'synced': synced,
+    }, sorted(changed)
+
+
+def build_synced_result(words_with_times, placements, plain_words=None):
+    """
+    Turn a word table and chord placements into the synced word list.
+    
+    Args:
+        words_with_times (list): Output of extract_words
+        placements (dict): Output of align_chords
+        plain_words (list): Optional prebuilt chord-less entries to share between
+            results (they must be treated as read-only)
+    
+    Returns:
+        list: Synced result with words and chord information
+    """
+    synced_result = []
+    for word_idx, word_info in enumerate(words_with_times):
+        chord = placements.get(word_idx)
+        if chord:
+            synced_result.append({
+                'word': '{' + chord + '}' + word_info.word,
+                'start': word_info.start,
+                'end': word_info.end,
+                'has_chord': True
+            })
+        elif plain_words is not None:
+            synced_result.append(plain_words[word_idx])
+        else:
+            synced_result.append({
+                'word': word_info.word,
+                'start': word_info.start,
+                'end': word_info.end,
+                'has_chord': False
+            })
+    return synced_result
 
 
 def sync_lyrics_with_chords(lyrics_data, chords_data, verbose=True):
@@ -23,80 +303,20 @@ def sync_lyrics_with_chords(lyrics_data, chords_data, verbose=True):
             print("=" * 60)
         
         # Extract all words with their timings
-        words_with_times = []
-        for phrase in lyrics_data:
-            for word_info in phrase.get('words', []):
-                words_with_times.append({
-                    'word': word_info['word'],
-                    'start': word_info['start'],
-                    'end': word_info['end']
-                })
+        words_with_times = extract_words(lyrics_data)
         
         if verbose:
             print(f"✓ Extracted {len(words_with_times)} words")
         
         # Extract chords with their timings
-        chords_with_times = []
-        for chord_info in chords_data:
-            if chord_info['chord_simple_pop'] != 'N':  # Skip "N" (no chord)
-                chords_with_times.append({
-                    'chord': chord_info['chord_simple_pop'],
-                    'start': chord_info['start'],
-                    'end': chord_info['end']
-                })
+        chords_with_times = extract_chords(chords_data)
         
         if verbose:
             print(f"✓ Extracted {len(chords_with_times)} chords")
         
-        # Sort both by start time
-        words_with_times.sort(key=lambda x: x['start'])
-        chords_with_times.sort(key=lambda x: x['start'])
-        
-        # Track which chords have been inserted to avoid duplicates
-        inserted_chords = set()
-        
         # Build the synced text with better chord placement
-        synced_result = []
-        chord_index = 0
-        
-        for word_idx, word_info in enumerate(words_with_times):
-            word = word_info['word']
-            word_start = word_info['start']
-            word_end = word_info['end']
-            
-            # Check if there's a chord that should be placed before this word
-            chord_to_place = None
-            
-            # Look for the next chord that starts close to or before this word
-            while chord_index < len(chords_with_times):
-                chord_info = chords_with_times[chord_index]
-                chord_start = chord_info['start']
-                
-                # If chord starts before the end of this word, place it with this word
-                if chord_start <= word_end:
-                    # Only place chord if it's reasonably close to word start (within 0.5 seconds)
-                    if abs(chord_start - word_start) <= 0.5:
-                        chord_to_place = chord_info['chord']
-                    chord_index += 1
-                    break
-                else:
-                    # Chord is too far in the future, stop looking
-                    break
-            
-            # Create the word with chord if found
-            if chord_to_place:
-                modified_word = '{' + chord_to_place + '}' + word
-                has_chord = True
-            else:
-                modified_word = word
-                has_chord = False
-            
-            synced_result.append({
-                'word': modified_word,
-                'start': word_start,
-                'end': word_end,
-                'has_chord': has_chord
-            })
+        placements = align_chords(words_with_times, chords_with_times)
+        synced_result = build_synced_result(words_with_times, placements)
         
         if verbose:
             print(f"✓ Synced {len(synced_result)} words!")
@@ -110,28 +330,195 @@ def sync_lyrics_with_chords(lyrics_data, chords_data, verbose=True):
         return None
 
 
+def sync_all_instruments(lyrics_data, chords_by_instrument, verbose=False):
+    """
+    Synchronize the lyrics against every instrument's chords in one pass.
+    
+    The lyrics are parsed once and the word table is shared: words without a
+    chord are the same (read-only) objects in every instrument's result.
+    
+    Args:
+        lyrics_data (list): Lyrics data from JSON (or Word records)
+        chords_by_instrument (dict): {instrument: chords_data or Chord records}
+        verbose (bool): Print progress messages
+    
+    Returns:
+        tuple: (words_with_times, {instrument: placements})
+    """
+    words_with_times = extract_words(lyrics_data)
+    all_placements = {}
+    
+    # With the Numba kernels, the word times are converted to arrays only once
+    from kernels import jit_kernels, word_times
+    times = word_times(words_with_times) if jit_kernels() else None
+    for inst, chords_data in chords_by_instrument.items():
+        try:
+            all_placements[inst] = align_chords(words_with_times, extract_chords(chords_data), times=times)
+        except Exception as e:
+            if verbose:
+                print(f"✗ Error syncing {inst}: {str(e)}")
+    
+    if verbose:
+        print(f"✓ Synced {len(words_with_times)} words against {len(all_placements)} instruments")
+    return words_with_times, all_placements
+
+
+def build_all_synced_results(words_with_times, all_placements):
+    """
+    Build the synced word list of every instrument, sharing chord-less entries.
+    
+    Returns:
+        dict: {instrument: synced_result}
+    """
+    plain_words = build_synced_result(words_with_times, {})
+    return {
+        inst: build_synced_result(words_with_times, placements, plain_words)
+        for inst, placements in all_placements.items()
+    }
+
+
+# Songs whose synced lyrics stay in memory (least recently used are dropped)
+SYNCED_MEMO_SIZE = 32
+# cache_file -> (source signature, {instrument: synced_result}), least recently used first
+_synced_memo = OrderedDict()
+_synced_memo_lock = threading.Lock()
+
+
+def _files_signature(file_paths):
+    """Size and modification time of every source file, to detect stale caches."""
+    signature = {}
+    for file_path in sorted(file_paths):
+        stat = os.stat(file_path)
+        signature[file_path] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def load_or_sync_all(lyrics_file, chords_files, cache_file, verbose=False):
+    """
+    Return the synced lyrics of every instrument for a song, computing them at
+    most once per change of the source files.
+    
+    Results are memoized in memory (the SYNCED_MEMO_SIZE most recently used
+    songs) and persisted to cache_file as the shared word table plus each
+    instrument's chord placements.
+    
+    Args:
+        lyrics_file (str): Path to lyrics JSON file
+        chords_files (dict): {instrument: path to chords JSON file}
+        cache_file (str): Where to persist the precomputed sync
+        verbose (bool): Print progress messages
+    
+    Returns:
+        dict: {instrument: synced_result} (empty dict if error)
+    """
+    try:
+        signature = _files_signature([lyrics_file] + list(chords_files.values()))
+        with _synced_memo_lock:
+            memo = _synced_memo.get(cache_file)
+            if memo and memo[0] == signature:
+                _synced_memo.move_to_end(cache_file)
+                return memo[1]
+        
+        cached = None
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    cached = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                cached = None
+        
+        if cached and cached.get('signature') == signature:
+            words_with_times = [Word(word, start, end) for word, start, end in cached['words']]
+            all_placements = {
+                inst: {int(idx): chord for idx, chord in placements}
+                for inst, placements in cached['placements'].items()
+            }
+        else:
+            chords_by_instrument = {inst: load_chords(chords_file) for inst, chords_file in chords_files.items()}
+            words_with_times, all_placements = sync_all_instruments(load_words(lyrics_file), chords_by_instrument, verbose)
+            
+            # Shared by every session: readers must never see a partial file
+            from audio_cache import write_json_atomic
+            os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+            write_json_atomic(cache_file, {
+                'signature': signature,
+                'words': [[w.word, w.start, w.end] for w in words_with_times],
+                'placements': {
+                    inst: sorted(placements.items()) for inst, placements in all_placements.items()
+                }
+            })
+        
+        synced_all = build_all_synced_results(words_with_times, all_placements)
+        with _synced_memo_lock:
+            # One entry per song: a newer signature replaces the stale one
+            _synced_memo[cache_file] = (signature, synced_all)
+            _synced_memo.move_to_end(cache_file)
+            while len(_synced_memo) > SYNCED_MEMO_SIZE:
+                _synced_memo.popitem(last=False)
+        return synced_all
+    
+    except Exception as e:
+        print(f"Error syncing all instruments: {str(e)}")
+        return {}
+
+
 def load_json_files(lyrics_file, chords_file):
     """
-    Load lyrics and chords from JSON files.
+    Load lyrics and chords from JSON files as typed records.
     
     Args:
         lyrics_file (str): Path to lyrics JSON file
         chords_file (str): Path to chords JSON file
     
     Returns:
-        tuple: (lyrics_data, chords_data) or (None, None) if error
+        tuple: (Word records, Chord records) or (None, None) if error
     """
     try:
-        with open(lyrics_file, 'r') as f:
+        return load_words(lyrics_file), load_chords(chords_file)
+    except Exception as e:
+        print(f"Error loading JSON files: {str(e)}")
+        return None, None
+
+
+def save_word_timings(lyrics_file, words_with_times):
+    """
+    Write corrected word texts and timings back into a lyrics JSON file.
+    Phrases, scores and syllables are kept; phrase bounds follow their words.
+    
+    Args:
+        lyrics_file (str): Path to lyrics JSON file
+        words_with_times (list): Word records, in the order load_words returns
+            them for this file
+    
+    Returns:
+        str: Path to the saved file, or None if error
+    """
+    try:
+        with open(lyrics_file, 'r', encoding='utf-8') as f:
             lyrics_data = json.load(f)
         
-        with open(chords_file, 'r') as f:
-            chords_data = json.load(f)
+        # Same (stable) order as words_from_lyrics
+        entries = [word_info for phrase in lyrics_data for word_info in phrase.get('words', [])]
+        order = sorted(range(len(entries)), key=lambda idx: float(entries[idx]['start']))
+        if len(order) != len(words_with_times):
+            print(f"Error saving timings: {lyrics_file} has {len(order)} words, got {len(words_with_times)}")
+            return None
         
-        return lyrics_data, chords_data
+        for word_info, idx in zip(words_with_times, order):
+            entries[idx].update(word=word_info.word, start=word_info.start, end=word_info.end)
+        for phrase in lyrics_data:
+            if phrase.get('words'):
+                phrase['start'] = min(w['start'] for w in phrase['words'])
+                phrase['end'] = max(w['end'] for w in phrase['words'])
+        
+        temp_file = f"{lyrics_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(lyrics_data, f, ensure_ascii=False)
+        os.replace(temp_file, lyrics_file)
+        return lyrics_file
     except Exception as e:
-        print(f"Error loading JSON files: {str(e)}")
-        return None, None
+        print(f"Error saving timings: {str(e)}")
+        return None
 
 
 def save_synced_output(synced_result, output_file="lyrics_with_chords.txt"):
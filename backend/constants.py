@@ -7,8 +7,28 @@ API_KEY = os.getenv("API_KEY", "")
 WORKFLOW_NAME = "play-along-workflow"
 OUTPUT_DIR = "results/api"
 DEMO_DIR = "demo"
-
-if not API_KEY:
-    print("Warning: API_KEY not found. Check your .env file.")
-else:
-    print("API_KEY loaded successfully.")
\ No newline at end of file
+# Size of the shared thread pool used to decode/read stems (per deployment)
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", min(8, os.cpu_count() or 1)))
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "cache"))
+# SQLite index of every processed song
+LIBRARY_DB = os.getenv("LIBRARY_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "library.db"))
+# Persistent Music.AI job queue (shared by the app and the worker process)
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "jobs.db"))
+# Set MUSICAI_FAKE=1 to run the pipeline offline against the demo results
+MUSICAI_FAKE = os.getenv("MUSICAI_FAKE", "") == "1"
+# Set LOCAL_CHORDS=1 to process queued jobs offline with local_chords.py instead of
+# Music.AI (chords of the uploaded file only: no stems or lyrics)
+LOCAL_CHORDS = os.getenv("LOCAL_CHORDS", "") == "1"
+# Results folder the fake serves (default: the demo) and seconds per stem download
+MUSICAI_FAKE_SOURCE = os.getenv("MUSICAI_FAKE_SOURCE", "")
+MUSICAI_FAKE_DOWNLOAD_DELAY = float(os.getenv("MUSICAI_FAKE_DOWNLOAD_DELAY", "0"))
+# Stem storage on ingest: "" keeps the downloaded WAVs, "flac" (lossless: float stems
+# are kept as they are), "flac24" (float stems quantized to 24 bits), "flac16"
+# (16-bit FLAC) or "pcm16" (16-bit WAV)
+STEM_STORAGE = os.getenv("STEM_STORAGE", "").lower()
+# Decoded, memory-mapped stem copies are kept for the HOT_SONGS most played songs
+# (with at least HOT_MIN_PLAYS plays); every other song is read from its stems
+HOT_SONGS = int(os.getenv("HOT_SONGS", "5"))
+HOT_MIN_PLAYS = int(os.getenv("HOT_MIN_PLAYS", "3"))
+# Set USE_NUMBA=1 to run the mixing, envelope and alignment loops as Numba kernels
+USE_NUMBA = os.getenv("USE_NUMBA", "") == "1"
@@ -1,93 +1,362 @@
 import io
 import base64
+import struct
 import soundfile as sf
 import json
 import html as html_lib
-import streamlit.components.v1 as components
+from bisect import bisect_left, bisect_right, insort
+from slice_audio import sanitize_chord_name
 
-def display_synced_lyrics(synced_data, sliced_chords, samplerate, show_chords=True):
+
+def pack_time_index(values, fmt="d"):
+    """
+    Packs a sorted list of numbers into a base64 little-endian typed array.
+
+    The browser decodes it straight into a Float64Array / Int32Array, which is
+    far more compact than shipping one JSON object per word.
+
+    Args:
+        values (list): Numbers to pack (start times or indices).
+        fmt (str): struct format character ("d" for float64, "i" for int32).
+
+    Returns:
+        str: Base64 encoded bytes.
+    """
+    return base64.b64encode(struct.pack(f"<{len(values)}{fmt}", *values)).decode()
+
+
+def _script_json(value):
+    """
+    JSON for a literal inside an inline <script>: "</" is escaped, so text
+    such as a typed word containing "</script>" cannot end the block.
+    """
+    return json.dumps(value).replace("</", "<\\/")
+
+
+def _word_view(item, previous_start, rate):
+    """(text, chord or None, start, duration) of one synced word, at a playback rate."""
+    word = item.get("word", "")
+
+    # chord duration extraction
+    duration = 0.4
+    if "start" in item and "end" in item:
+        duration = max(0.15, item["end"] / rate - item["start"] / rate)
+    start = item["start"] / rate if "start" in item else previous_start
+
+    if item.get("has_chord", False) and "{" in word and "}" in word:
+        chord_start = word.rfind("{")
+        chord_end = word.rfind("}")
+        raw_chord_text = word[chord_start+1:chord_end] # e.g., "C:maj"
+        return word[:chord_start] + word[chord_end+1:], raw_chord_text, start, duration
+    return word, None, start, duration
+
+
+def _clip_key(sanitized_name, count, sliced_chords, clip_urls):
+    """The clip of the count-th occurrence of a chord: its own, the chord's representative, or None."""
+    # Reconstruct the key used in extract_chord_segments (e.g., C_0, C_1)
+    unique_key = f"{sanitized_name}_{count}"
+    # Representative clips are keyed by the chord name alone
+    clip_key = unique_key if unique_key in sliced_chords or unique_key in clip_urls else sanitized_name
+    return clip_key if clip_key in sliced_chords or clip_key in clip_urls else None
+
+
+def synced_lyrics_views(synced_data, sliced_chords=None, clip_urls=None, rate=1.0):
+    """
+    What the lyrics view shows for every word: the basis of both the full page
+    and the in-place diffs (see synced_lyrics_diff).
+
+    Args:
+        synced_data (list): The list of word objects with chords.
+        sliced_chords (dict): Clips from extract_chord_segments or extract_representative_chords.
+        clip_urls (dict): {clip key: URL} of clips stored as separate files.
+        rate (float): Playback rate the times are shown at (see practice.scale_synced_data).
+
+    Returns:
+        list: (text, chord or None, clip key or None, start, duration) per word
+    """
+    sliced_chords = sliced_chords or {}
+    clip_urls = clip_urls or {}
+
+    # We need to track chord instances to match the keys in sliced_chords (e.g., C_0, C_1)
+    chord_counter = {}
+    views = []
+    previous_start = 0.0
+
+    for item in synced_data or []:
+        word_text, chord, start, duration = _word_view(item, previous_start, rate)
+        previous_start = start
+        clip_key = None
+        if chord is not None:
+            sanitized_name = sanitize_chord_name(chord)
+            count = chord_counter.get(sanitized_name, 0)
+            chord_counter[sanitized_name] = count + 1
+            clip_key = _clip_key(sanitized_name, count, sliced_chords, clip_urls)
+        views.append((word_text, chord, clip_key, start, duration))
+    return views
+
+
+def chord_positions(views):
+    """
+    {sanitized chord: sorted word indices} of a view list: the occurrence
+    count that per-occurrence clip keys are numbered by.
+    """
+    positions = {}
+    for i, view in enumerate(views):
+        if view[1] is not None:
+            positions.setdefault(sanitize_chord_name(view[1]), []).append(i)
+    return positions
+
+
+def update_synced_lyrics_views(views, positions, synced_data, changed, sliced_chords=None, clip_urls=None, rate=1.0):
+    """
+    synced_lyrics_views after update_sync re-synced some words, recomputing
+    only those words plus the later occurrences of any chord they gained or
+    lost (their per-occurrence clip keys shift). The inputs are left unchanged.
+
+    Args:
+        views (list): Views of the data before the update
+        positions (dict): chord_positions(views)
+        synced_data (list): The updated synced word list
+        changed (list): Word indices returned by update_sync
+        sliced_chords (dict): See synced_lyrics_views
+        clip_urls (dict): See synced_lyrics_views
+        rate (float): See synced_lyrics_views
+
+    Returns:
+        tuple: (views, positions, set of the word indices whose view changed)
+    """
+    sliced_chords = sliced_chords or {}
+    clip_urls = clip_urls or {}
+    views = list(views)
+    positions = dict(positions)
+    # Chord -> first word from which its occurrences may be numbered differently
+    renumber = {}
+
+    words = {}
+    for i in changed:
+        previous_start = views[i - 1][3] if i else 0.0
+        words[i] = _word_view(synced_data[i], previous_start, rate)
+        old_chord, new_chord = views[i][1], words[i][1]
+        old_name = sanitize_chord_name(old_chord) if old_chord is not None else None
+        new_name = sanitize_chord_name(new_chord) if new_chord is not None else None
+        if old_name == new_name:
+            continue
+        for name, add in ((old_name, False), (new_name, True)):
+            if name is None:
+                continue
+            occurrences = list(positions.get(name, ()))
+            if add:
+                insort(occurrences, i)
+            else:
+                occurrences.remove(i)
+            if occurrences:
+                positions[name] = occurrences
+            else:
+                positions.pop(name, None)
+            renumber[name] = min(renumber.get(name, i), i)
+
+    touched = set()
+    for i, (word_text, chord, start, duration) in words.items():
+        clip_key = None
+        if chord is not None:
+            name = sanitize_chord_name(chord)
+            clip_key = _clip_key(name, bisect_left(positions[name], i), sliced_chords, clip_urls)
+        view = (word_text, chord, clip_key, start, duration)
+        if view != views[i]:
+            views[i] = view
+            touched.add(i)
+
+    for name, first in renumber.items():
+        occurrences = positions.get(name, [])
+        for count in range(bisect_right(occurrences, first), len(occurrences)):
+            i = occurrences[count]
+            if i in words:
+                continue
+            clip_key = _clip_key(name, count, sliced_chords, clip_urls)
+            if clip_key != views[i][2]:
+                views[i] = views[i][:2] + (clip_key,) + views[i][3:]
+                touched.add(i)
+    return views, positions, touched
+
+
+def _clip_source(clip_key, sliced_chords, samplerate, clip_urls):
+    """A clip as something an Audio element can play: its URL, or the clip as a WAV data URI."""
+    if clip_key in clip_urls:
+        return clip_urls[clip_key]
+
+    # Write the numpy array to an in-memory WAV and encode it to base64
+    buffer = io.BytesIO()
+    sf.write(buffer, sliced_chords[clip_key], samplerate, format='WAV')
+    return "data:audio/wav;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def synced_lyrics_diff(base_views, views, sliced_chords, samplerate, clip_urls=None, sent_clips=(), indices=None):
+    """
+    The changes that turn a lyrics page built from base_views into views, for
+    the page to apply in place (see display_synced_lyrics_diff). Diffs are
+    cumulative: each one is relative to the page as it was built.
+
+    Args:
+        base_views (list): synced_lyrics_views of the data the page was built from
+        views (list): synced_lyrics_views of the current data
+        sliced_chords (dict): Clips available now
+        samplerate (int): The sample rate of the clips
+        clip_urls (dict): {clip key: URL} of clips stored as separate files
+        sent_clips (iterable): Clip keys the page already holds (only the
+            others are encoded and sent)
+        indices (iterable): The only words that may differ from base_views
+            (default: every word is compared)
+
+    Returns:
+        dict: {'changes': [[index, text, chord, clip, start, duration], ...],
+               'clips': {clip key: source}}, or None if the words themselves
+              were added or removed (the page must be rebuilt)
+    """
+    if len(base_views) != len(views):
+        return None
+    sliced_chords = sliced_chords or {}
+    clip_urls = clip_urls or {}
+    sent_clips = set(sent_clips)
+
+    changes = []
+    clips = {}
+    for i in range(len(views)) if indices is None else sorted(indices):
+        view = views[i]
+        if base_views[i] == view:
+            continue
+        changes.append([i, *view])
+        clip_key = view[2]
+        if clip_key and clip_key not in sent_clips and clip_key not in clips:
+            clips[clip_key] = _clip_source(clip_key, sliced_chords, samplerate, clip_urls)
+    return {'changes': changes, 'clips': clips}
+
+
+def display_synced_lyrics_diff(view_id, diff):
+    """
+    Send a diff to the lyrics view with the given id: a tiny sibling component
+    posts it to the view, which patches the changed words and chord buttons
+    instead of reloading.
+    """
+    import streamlit.components.v1 as components
+
+    payload = _script_json(dict(diff, type="synced-lyrics-diff", view=view_id))
+    components.html(f"""
+    <script>
+    (function() {{
+        const payload = {payload};
+        try {{
+            // Kept on the parent page too, for a view that is still loading
+            const host = window.parent;
+            host.__syncedLyricsDiffs = host.__syncedLyricsDiffs || {{}};
+            // Each clip is sent once: keep the earlier ones for a view that reloads
+            const previous = host.__syncedLyricsDiffs[payload.view];
+            if (previous) payload.clips = Object.assign({{}}, previous.clips, payload.clips);
+            host.__syncedLyricsDiffs[payload.view] = payload;
+            for (let i = 0; i < host.frames.length; i++) host.frames[i].postMessage(payload, "*");
+        }} catch (e) {{
+            console.warn("Could not update the lyrics view:", e);
+        }}
+    }})();
+    </script>
+    """, height=0)
+
+
+def display_synced_lyrics(synced_data, sliced_chords, samplerate, show_chords=True, follow_playback=True, view_id=None, html=None):
     """
     Displays lyrics with interactive chord buttons that play real audio segments.
     
     Args:
         synced_data (list): The list of word objects with chords.
-        sliced_chords (dict): The dictionary from extract_chord_segments.
+        sliced_chords (dict): The dictionary from extract_chord_segments, or from
+            extract_representative_chords (one clip shared by every occurrence).
         samplerate (int): The sample rate of the audio.
         show_chords (bool): Whether to show chord buttons (default: True).
+        follow_playback (bool): Highlight the current word/chord while the page's
+            audio player is playing (default: True).
+        view_id (str): Id that display_synced_lyrics_diff addresses this view by.
+        html (str): A page built by an earlier call, shown as-is so the browser
+            keeps it (and the diffs applied to it) instead of reloading.
+    
+    Returns:
+        str: The HTML shown
+    """
+    import streamlit.components.v1 as components
+
+    if html is None:
+        html = build_synced_lyrics_html(synced_data, sliced_chords, samplerate, show_chords, follow_playback, view_id=view_id)
+    if html:
+        components.html(html, height=450, scrolling=True)
+    return html
+
+
+def build_synced_lyrics_html(synced_data, sliced_chords, samplerate, show_chords=True, follow_playback=True, clip_urls=None, view_id=None):
+    """
+    Builds the self-contained HTML/JS of the synced lyrics view (see
+    display_synced_lyrics), without Streamlit.
+
+    Args:
+        synced_data (list): The list of word objects with chords.
+        sliced_chords (dict): Clips from extract_chord_segments or
+            extract_representative_chords (ignored for keys found in clip_urls).
+        samplerate (int): The sample rate of the clips.
+        show_chords (bool): Whether to show chord buttons.
+        follow_playback (bool): Highlight the current word/chord while an audio
+            player of the page (or of the parent page) is playing.
+        clip_urls (dict): {clip key: URL} of clips stored as separate files;
+            those are referenced instead of being embedded in the page.
+        view_id (str): Id of the view for in-place diffs (see synced_lyrics_diff).
+
+    Returns:
+        str: The HTML, or "" if there is nothing to show.
     """
     if not synced_data:
-        return
+        return ""
 
     container_id = "lyrics_container"
     overlay_id = "chord_overlay"
 
     flowing_html = []
     chord_buttons = []
-    
-    # We need to track chord instances to match the keys in sliced_chords (e.g., C_0, C_1)
-    chord_counter = {}
-
-    for i, item in enumerate(synced_data):
-        word = item.get("word", "")
-        has_chord = item.get("has_chord", False)
 
-        # chord duration extraction
-        duration = 0.4
-        if "start" in item and "end" in item:
-            duration = max(0.15, item["end"] - item["start"])
-
-        if has_chord and "{" in word and "}" in word:
-            chord_start = word.rfind("{")
-            chord_end = word.rfind("}")
-            raw_chord_text = word[chord_start+1:chord_end] # e.g., "C:maj"
-            word_text = word[:chord_start] + word[chord_end+1:]
-
-            # --- AUDIO PROCESSING START ---
-            
-            # 1. Reconstruct the key used in extract_chord_segments
-            sanitized_name = raw_chord_text.replace(":", "").replace("#", "sharp")
-            
-            # Get current count for this specific chord name
-            count = chord_counter.get(sanitized_name, 0)
-            unique_key = f"{sanitized_name}_{count}"
-            
-            # Increment for next time
-            chord_counter[sanitized_name] = count + 1
-            
-            b64_audio = None
-            
-            # 2. Fetch the audio segment and convert to Base64
-            if unique_key in sliced_chords:
-                segment = sliced_chords[unique_key]
-                
-                # Create an in-memory buffer
-                buffer = io.BytesIO()
-                # Write the numpy array to the buffer as a WAV
-                sf.write(buffer, segment, samplerate, format='WAV')
-                # Encode to base64
-                b64_audio = base64.b64encode(buffer.getvalue()).decode()
-            
-            # --- AUDIO PROCESSING END ---
-
-            flowing_html.append(
-                f'<span id="word-{i}" style="white-space: pre-wrap;">{html_lib.escape(word_text)}</span>'
-            )
-
-            if show_chords:
-                chord_buttons.append({
-                    "index": i,
-                    "chord": raw_chord_text, # Display name
-                    "duration": duration,
-                    "audioData": b64_audio # The actual sound
-                })
-        else:
-            flowing_html.append(
-                f'<span style="white-space: pre-wrap;">{html_lib.escape(word)}</span>'
-            )
+    # Each clip is encoded (or linked) once and shared by every button that plays it
+    sliced_chords = sliced_chords or {}
+    clip_urls = clip_urls or {}
+    clips = {}
+
+    # Sorted start times for karaoke mode (words are already sorted by start)
+    word_starts = []
+    chord_starts = []
+    chord_words = []
+
+    for i, (word_text, chord, clip_key, start, duration) in enumerate(synced_lyrics_views(synced_data, sliced_chords, clip_urls)):
+        word_starts.append(start)
+        flowing_html.append(
+            f'<span id="word-{i}" style="white-space: pre-wrap;">{html_lib.escape(word_text)}</span>'
+        )
+        if chord is None:
+            continue
+
+        if clip_key and clip_key not in clips:
+            clips[clip_key] = _clip_source(clip_key, sliced_chords, samplerate, clip_urls)
+        chord_starts.append(start)
+        chord_words.append(i)
+
+        if show_chords:
+            chord_buttons.append({
+                "index": i,
+                "chord": chord, # Display name
+                "duration": duration,
+                "clip": clip_key # Key into clips
+            })
 
     flowing_html_str = " ".join(flowing_html)
 
     html = f"""
+    <style>
+        #lyrics_flow span {{ transition: color 0.1s; }}
+        #lyrics_flow span.kw-active {{ color: #1DB954; font-weight: 700; }}
+        .chord-btn.kw-active {{ outline: 2px solid #1DB954; outline-offset: 2px; }}
+    </style>
     <div id="{container_id}" style="
         position: relative;
         background-color: #1e1e1e;
@@ -117,18 +386,27 @@ def display_synced_lyrics(synced_data, sliced_chords, samplerate, show_chords=Tr
 
     <script>
     (function() {{
-        const chordSpecs = {json.dumps(chord_buttons)};
+        const chordSpecs = {_script_json(chord_buttons)};
+        const clips = {_script_json(clips)};
+        const followPlayback = {_script_json(follow_playback)};
+        const showChords = {_script_json(show_chords)};
+        const viewId = {_script_json(view_id)};
+        const timeIndex = {{
+            wordStarts: "{pack_time_index(word_starts)}",
+            chordStarts: "{pack_time_index(chord_starts)}",
+            chordWords: "{pack_time_index(chord_words, "i")}"
+        }};
         const container = document.getElementById("{container_id}");
         const overlay = document.getElementById("{overlay_id}");
 
         // --- 1. AUDIO PLAYER ---
         // We no longer need the complex Oscillator logic. 
-        // We simply play the Base64 string.
+        // We simply play the clip (a Base64 data URI or a file URL).
         
         let currentAudio = null;
 
-        function playChord(b64Data) {{
-            if (!b64Data) return;
+        function playChord(audioSource) {{
+            if (!audioSource) return;
 
             // Stop previous if playing (optional, keeps it clean)
             if (currentAudio) {{
@@ -136,8 +414,6 @@ def display_synced_lyrics(synced_data, sliced_chords, samplerate, show_chords=Tr
                 currentAudio.currentTime = 0;
             }}
 
-            // Create audio object from Base64 string
-            const audioSource = "data:audio/wav;base64," + b64Data;
             currentAudio = new Audio(audioSource);
             
             // Optional: Fade out logic could be added here, but native play is snappy
@@ -145,16 +421,19 @@ def display_synced_lyrics(synced_data, sliced_chords, samplerate, show_chords=Tr
         }}
 
         // --- 2. BUTTON CREATION ---
-        chordSpecs.forEach(spec => {{
+        // Buttons are kept by word index, so diffs can add, change or drop them
+        const chordByWord = new Map();
+        const chordBtns = new Map();
+
+        function makeButton(spec) {{
             const btn = document.createElement("button");
             btn.className = "chord-btn";
             btn.dataset.index = spec.index;
             btn.innerText = spec.chord;
             
-            // Store the audio data directly on the element for easy access
-            // (Note: For very large files, this might use memory, but for short chords it's fine)
-            if (spec.audioData) {{
-                btn.dataset.audio = spec.audioData;
+            // Store only the clip key; the audio itself is shared through `clips`
+            if (spec.clip) {{
+                btn.dataset.clip = spec.clip;
             }}
 
             Object.assign(btn.style, {{
@@ -180,15 +459,19 @@ def display_synced_lyrics(synced_data, sliced_chords, samplerate, show_chords=Tr
             btn.onmouseup = () => btn.style.transform = "translateX(-50%) scale(1)";
 
             overlay.appendChild(btn);
-        }});
+            chordByWord.set(spec.index, spec);
+            chordBtns.set(spec.index, btn);
+        }}
+
+        chordSpecs.forEach(makeButton);
 
         // --- 3. EVENT LISTENER ---
         overlay.addEventListener("click", ev => {{
             const el = ev.target;
             if (el && el.classList.contains("chord-btn")) {{
-                // Play the audio stored in the dataset
-                if (el.dataset.audio) {{
-                    playChord(el.dataset.audio);
+                // Play the clip referenced by the dataset
+                if (el.dataset.clip) {{
+                    playChord(clips[el.dataset.clip]);
                 }} else {{
                     console.warn("No audio data found for this chord.");
                 }}
@@ -199,9 +482,9 @@ def display_synced_lyrics(synced_data, sliced_chords, samplerate, show_chords=Tr
         function positionButtons() {{
             const containerRect = container.getBoundingClientRect();
 
-            chordSpecs.forEach(spec => {{
+            chordByWord.forEach(spec => {{
                 const wordSpan = document.getElementById("word-" + spec.index);
-                const btn = overlay.querySelector('button[data-index="' + spec.index + '"]');
+                const btn = chordBtns.get(spec.index);
 
                 if (!wordSpan || !btn) return;
 
@@ -237,8 +520,166 @@ def display_synced_lyrics(synced_data, sliced_chords, samplerate, show_chords=Tr
         }});
 
         safeReposition();
+
+        // --- 5. KARAOKE MODE ---
+        // Start times arrive as packed typed arrays; every frame we binary search
+        // the current position and only touch the DOM when the word/chord changes.
+        function decodeIndex(b64, Ctor) {{
+            const bin = atob(b64);
+            const bytes = new Uint8Array(bin.length);
+            for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+            return new Ctor(bytes.buffer);
+        }}
+
+        // Index of the last entry <= t, or -1 if t is before the first entry
+        function lastAtOrBefore(arr, t) {{
+            let lo = 0, hi = arr.length;
+            while (lo < hi) {{
+                const mid = (lo + hi) >>> 1;
+                if (arr[mid] <= t) lo = mid + 1; else hi = mid;
+            }}
+            return lo - 1;
+        }}
+
+        let wordStarts = decodeIndex(timeIndex.wordStarts, Float64Array);
+        let chordStarts = decodeIndex(timeIndex.chordStarts, Float64Array);
+        let chordWords = decodeIndex(timeIndex.chordWords, Int32Array);
+        const wordSpans = new Array(wordStarts.length);
+        let activeWord = -1;
+        let activeChord = -1;
+
+        // --- 6. IN-PLACE UPDATES ---
+        // A diff (see synced_lyrics_diff) lists the words that differ from the
+        // page as built: their text, chord, clip and timing are patched here
+        // instead of reloading the page. Diffs are cumulative, so words changed
+        // by an earlier diff and absent from this one go back to how they were.
+        const chordSet = new Set(chordWords);
+        const original = new Map();
+        let patched = new Set();
+
+        function patchWord(i, text, chord, clip, start, duration) {{
+            const span = wordSpan(i);
+            if (!span) return;
+            span.textContent = text;
+            wordStarts[i] = start;
+            if (chord) chordSet.add(i); else chordSet.delete(i);
+
+            const btn = chordBtns.get(i);
+            if (chord && showChords) {{
+                const spec = {{ index: i, chord: chord, duration: duration, clip: clip }};
+                if (btn) {{
+                    btn.innerText = chord;
+                    if (clip) btn.dataset.clip = clip; else delete btn.dataset.clip;
+                    chordByWord.set(i, spec);
+                }} else {{
+                    makeButton(spec);
+                }}
+            }} else if (btn) {{
+                btn.remove();
+                chordBtns.delete(i);
+                chordByWord.delete(i);
+            }}
+        }}
+
+        function applyDiff(diff) {{
+            Object.assign(clips, diff.clips || {{}});
+            const next = new Set();
+            diff.changes.forEach(change => {{
+                const i = change[0];
+                if (!original.has(i)) {{
+                    const span = wordSpan(i);
+                    const spec = chordByWord.get(i);
+                    original.set(i, [
+                        i, span ? span.textContent : "", chordSet.has(i) ? (spec ? spec.chord : "*") : null,
+                        spec ? (spec.clip || null) : null, wordStarts[i], spec ? spec.duration : 0.4
+                    ]);
+                }}
+                next.add(i);
+            }});
+            setActiveWord(-1);
+            setActiveChord(-1);
+            patched.forEach(i => {{ if (!next.has(i)) patchWord(...original.get(i)); }});
+            diff.changes.forEach(change => patchWord(...change));
+            patched = next;
+
+            // Rebuild the chord time index (word indices are in time order)
+            chordWords = Int32Array.from(Array.from(chordSet).sort((a, b) => a - b));
+            chordStarts = Float64Array.from(chordWords, i => wordStarts[i]);
+            safeReposition();
+        }}
+
+        window.addEventListener("message", ev => {{
+            const diff = ev.data;
+            if (viewId && diff && diff.type === "synced-lyrics-diff" && diff.view === viewId) applyDiff(diff);
+        }});
+        try {{
+            const pending = viewId && window.parent.__syncedLyricsDiffs && window.parent.__syncedLyricsDiffs[viewId];
+            if (pending) applyDiff(pending);
+        }} catch (e) {{
+            // Not embedded in a page we can read
+        }}
+
+        if (!followPlayback) return;
+
+        let player = null;
+        let lastLookup = 0;
+
+        // The audio player lives in the parent Streamlit page; prefer the one playing
+        function findPlayer(now) {{
+            if (player && !player.paused) return player;
+            if (now - lastLookup < 1000) return player;
+            lastLookup = now;
+            try {{
+                const audios = Array.from(window.parent.document.querySelectorAll("audio"));
+                player = audios.find(a => !a.paused) || audios[audios.length - 1] || null;
+            }} catch (e) {{
+                player = null;
+            }}
+            return player;
+        }}
+
+        function wordSpan(i) {{
+            if (i < 0) return null;
+            if (!wordSpans[i]) wordSpans[i] = document.getElementById("word-" + i);
+            return wordSpans[i];
+        }}
+
+        function setActiveWord(i) {{
+            const prev = wordSpan(activeWord);
+            if (prev) prev.classList.remove("kw-active");
+            activeWord = i;
+            const span = wordSpan(i);
+            if (!span) return;
+            span.classList.add("kw-active");
+            const top = span.offsetTop;
+            if (top < container.scrollTop || top > container.scrollTop + container.clientHeight - 40) {{
+                container.scrollTop = Math.max(0, top - container.clientHeight / 3);
+            }}
+        }}
+
+        function setActiveChord(c) {{
+            const prev = activeChord >= 0 ? chordBtns.get(chordWords[activeChord]) : null;
+            if (prev) prev.classList.remove("kw-active");
+            activeChord = c;
+            const btn = c >= 0 ? chordBtns.get(chordWords[c]) : null;
+            if (btn) btn.classList.add("kw-active");
+        }}
+
+        function tick(now) {{
+            const audio = findPlayer(now);
+            if (audio) {{
+                const t = audio.currentTime;
+                const w = lastAtOrBefore(wordStarts, t);
+                if (w !== activeWord) setActiveWord(w);
+                const c = lastAtOrBefore(chordStarts, t);
+                if (c !== activeChord) setActiveChord(c);
+            }}
+            requestAnimationFrame(tick);
+        }}
+
+        requestAnimationFrame(tick);
     }})();
     </script>
     """
 
-    components.html(html, height=450, scrolling=True)
\ No newline at end of file
+    return html
\ No newline at end of file
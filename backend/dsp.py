@@ -0,0 +1,149 @@
+import numpy as np
+
+N_FFT = 2048
+HOP = 512
+
+
+def _wrap_phase(phase):
+    """Wrap phases to [-pi, pi)."""
+    return phase - 2.0 * np.pi * np.round(phase / (2.0 * np.pi))
+
+
+def time_stretch_blocks(y, rate, block_frames=256, n_fft=N_FFT, hop=HOP):
+    """
+    Phase-vocoder time stretch that yields the output block by block.
+
+    Every block of block_frames STFT frames is processed with vectorized NumPy
+    (all frames and channels at once); the running phase and the overlap-add
+    tail are carried between blocks, so the concatenated output is the same as
+    stretching the whole signal in one go.
+
+    Args:
+        y (np.ndarray): Audio, shape (samples,) or (samples, channels)
+        rate (float): Speed factor (> 1 is faster/shorter, < 1 slower/longer)
+        block_frames (int): Output STFT frames synthesized per block
+        n_fft (int): FFT size (must be a multiple of hop)
+        hop (int): Hop size
+
+    Yields:
+        np.ndarray: Consecutive output blocks, with the same channel layout as y
+    """
+    mono = y.ndim == 1
+    x = y[np.newaxis, :] if mono else y.T
+    channels, n_samples = x.shape
+    target_len = int(round(n_samples / rate))
+    overlap = n_fft // hop
+
+    # Centered frames, plus one extra frame so frame k + 1 always exists
+    pad = n_fft // 2
+    x_pad = np.pad(x, ((0, 0), (pad, pad + n_fft)))
+    frames = np.lib.stride_tricks.sliding_window_view(x_pad, n_fft, axis=-1)[:, ::hop]
+    n_frames = 1 + n_samples // hop
+
+    window = np.hanning(n_fft + 1)[:-1]
+    norm = np.sum(window ** 2) / hop
+    omega = 2.0 * np.pi * hop * np.arange(n_fft // 2 + 1) / n_fft
+    steps = np.arange(0, n_frames, rate)
+
+    phase = None
+    tail = np.zeros((channels, n_fft - hop))
+    to_skip = pad
+    emitted = 0
+
+    def finish(block):
+        nonlocal to_skip, emitted
+        if to_skip:
+            cut = min(to_skip, block.shape[1])
+            block = block[:, cut:]
+            to_skip -= cut
+        block = block[:, :target_len - emitted]
+        emitted += block.shape[1]
+        return block[0] if mono else block.T
+
+    for first in range(0, len(steps), block_frames):
+        t = steps[first:first + block_frames]
+        k = t.astype(int)
+        alpha = (t - k)[np.newaxis, :, np.newaxis]
+
+        # Analysis spectra for every frame this block touches
+        spectra = np.fft.rfft(frames[:, k[0]:k[-1] + 2] * window, axis=-1)
+        s0 = spectra[:, k - k[0]]
+        s1 = spectra[:, k - k[0] + 1]
+        magnitude = (1.0 - alpha) * np.abs(s0) + alpha * np.abs(s1)
+
+        if phase is None:
+            phase = np.angle(s0[:, 0])
+
+        # Phase advance of every step, accumulated along the block
+        advance = omega + _wrap_phase(np.angle(s1) - np.angle(s0) - omega)
+        accumulated = np.cumsum(advance, axis=1)
+        phases = phase[:, np.newaxis] + np.concatenate(
+            (np.zeros_like(accumulated[:, :1]), accumulated[:, :-1]), axis=1
+        )
+        phase = phase + accumulated[:, -1]
+
+        # Synthesis and overlap-add, one hop-sized segment of each frame at a time
+        synth = np.fft.irfft(magnitude * np.exp(1j * phases), n=n_fft, axis=-1) * window
+        m = len(t)
+        segments = synth.reshape(channels, m, overlap, hop)
+        buffer = np.zeros((channels, m + overlap - 1, hop))
+        for s in range(overlap):
+            buffer[:, s:s + m] += segments[:, :, s]
+        buffer = buffer.reshape(channels, -1)
+        buffer[:, :n_fft - hop] += tail
+
+        block = finish(buffer[:, :m * hop] / norm)
+        tail = buffer[:, m * hop:]
+        if len(block):
+            yield block
+
+    block = finish(tail / norm)
+    if len(block):
+        yield block
+
+    # Pad with silence up to the exact target length
+    if emitted < target_len:
+        missing = target_len - emitted
+        yield np.zeros(missing) if mono else np.zeros((missing, channels))
+
+
+def time_stretch(y, rate):
+    """
+    Change the tempo of y by rate without changing its pitch.
+
+    Returns:
+        np.ndarray: Stretched audio of length round(len(y) / rate)
+    """
+    if rate == 1.0:
+        return y
+    return np.concatenate(list(time_stretch_blocks(y, rate)), axis=0)
+
+
+def pitch_shift(y, samplerate, semitones):
+    """
+    Shift the pitch of y by a number of semitones, keeping its duration.
+
+    The signal is stretched by the pitch factor with the phase vocoder and
+    then resampled back to the original length with soxr.
+
+    Args:
+        y (np.ndarray): Audio, shape (samples,) or (samples, channels)
+        samplerate (int): Sample rate of y
+        semitones (float): Shift amount (positive is higher)
+
+    Returns:
+        np.ndarray: Shifted audio with the same shape as y
+    """
+    if semitones == 0:
+        return y
+
+    import soxr
+
+    factor = 2.0 ** (semitones / 12.0)
+    stretched = time_stretch(y, 1.0 / factor)
+    shifted = soxr.resample(np.ascontiguousarray(stretched), samplerate * factor, samplerate)
+
+    if len(shifted) >= len(y):
+        return shifted[:len(y)]
+    padding = [(0, len(y) - len(shifted))] + [(0, 0)] * (y.ndim - 1)
+    return np.pad(shifted, padding)
@@ -0,0 +1,119 @@
+import os
+import numpy as np
+from audio_cache import cache_path
+
+# One RMS value per ENVELOPE_HOP seconds of audio
+ENVELOPE_HOP = 0.05
+# Frames quieter than this (dBFS) count as inactive
+SILENCE_DB = -50.0
+# Stems active for less than this fraction of the song are treated as silent
+MIN_ACTIVITY = 0.02
+FRAMES_PER_BLOCK = 64
+
+# path -> (mtime, envelopes), so every rerun reuses the loaded arrays
+_envelope_memo = {}
+
+
+def compute_envelope(audio_file, hop_seconds=ENVELOPE_HOP):
+    """
+    RMS envelope of a stem (mono, one value per hop), computed in a single
+    streaming pass: the file is read in blocks of whole hops and each block
+    is reduced hop by hop (see kernels.rms_per_hop).
+
+    Args:
+        audio_file (str): Path to the audio file
+        hop_seconds (float): Envelope resolution
+
+    Returns:
+        np.ndarray: float32 RMS values
+    """
+    import soundfile as sf
+    from audio_io import read_blocks
+    from kernels import rms_per_hop
+
+    hop = max(1, int(round(sf.info(audio_file).samplerate * hop_seconds)))
+    parts = []
+    for block in read_blocks(audio_file, blocksize=hop * FRAMES_PER_BLOCK):
+        # Only the last block can end with a partial hop; it is padded with silence
+        parts.append(rms_per_hop(block, hop))
+    return np.concatenate(parts).astype(np.float32) if parts else np.zeros(0, dtype=np.float32)
+
+
+def compute_song_envelopes(stem_files, output_file):
+    """
+    Compute the envelope of every stem (in parallel on the audio pool) and
+    store them together in one .npz, keyed by stem file name.
+
+    Returns:
+        str: output_file
+    """
+    from audio_io import map_ordered
+
+    envelopes = map_ordered(compute_envelope, stem_files)
+    arrays = {os.path.basename(stem): envelope for stem, envelope in zip(stem_files, envelopes)}
+    temp_path = f"{output_file}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        np.savez(f, _hop=np.float64(ENVELOPE_HOP), **arrays)
+    os.replace(temp_path, output_file)
+    return output_file
+
+
+def song_envelopes_path(song_hash):
+    """Cache location of a song's envelopes."""
+    return cache_path("envelopes", song_hash, "npz")
+
+
+def load_envelopes(path):
+    """
+    Load a song's envelopes.
+
+    Returns:
+        dict: {stem file name: envelope}, empty if the file is missing or was
+              computed with another resolution
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    mtime = os.path.getmtime(path)
+    cached = _envelope_memo.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with np.load(path) as data:
+        if '_hop' not in data.files or float(data['_hop']) != ENVELOPE_HOP:
+            return {}
+        envelopes = {name: data[name] for name in data.files if name != '_hop'}
+    _envelope_memo[path] = (mtime, envelopes)
+    return envelopes
+
+
+def envelope_for(envelopes, audio_file):
+    """The envelope of one stem, or None if it was not computed."""
+    return envelopes.get(os.path.basename(audio_file)) if envelopes and audio_file else None
+
+
+def activity(envelope, start_time=None, end_time=None):
+    """Fraction of envelope frames (optionally within a time range) above SILENCE_DB."""
+    if start_time is not None or end_time is not None:
+        first = int((start_time or 0.0) / ENVELOPE_HOP)
+        last = int(np.ceil(end_time / ENVELOPE_HOP)) if end_time is not None else len(envelope)
+        envelope = envelope[first:last]
+    if not len(envelope):
+        return 0.0
+    threshold = 10.0 ** (SILENCE_DB / 20.0)
+    return float(np.count_nonzero(envelope > threshold)) / len(envelope)
+
+
+def silent_stems(envelopes, stem_files, start_time=None, end_time=None):
+    """
+    Stems (from stem_files) that are practically silent, over the whole song
+    or within a time range. Stems without an envelope are never reported.
+
+    Returns:
+        set: Paths of silent stems
+    """
+    silent = set()
+    for stem in stem_files:
+        envelope = envelope_for(envelopes, stem)
+        if envelope is not None and activity(envelope, start_time, end_time) < MIN_ACTIVITY:
+            silent.add(stem)
+    return silent
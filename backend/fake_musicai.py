@@ -0,0 +1,78 @@
+import os
+import shutil
+import time
+import uuid
+
+DEFAULT_SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "demo")
+
+
+class FakeMusicAiClient:
+    """
+    Offline stand-in for musicai_sdk.MusicAiClient.
+
+    Jobs "run" for `delay` seconds and then return the files of source_dir as
+    their results. All job state is encoded in the job ID, so a job created in
+    one process can be polled and downloaded from another (like the real API).
+    Each audio download takes `download_delay` seconds, to mimic large stems,
+    and each upload `upload_delay` seconds. `jobs_created` counts add_job calls.
+    """
+
+    def __init__(self, api_key=None, source_dir=DEFAULT_SOURCE_DIR, delay=5.0, fail=False, download_delay=0.0,
+                 upload_delay=0.0):
+        self.source_dir = source_dir or DEFAULT_SOURCE_DIR
+        self.delay = delay
+        self.fail = fail
+        self.download_delay = download_delay
+        self.upload_delay = upload_delay
+        self.jobs_created = 0
+
+    def upload_file(self, file_path):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        time.sleep(self.upload_delay)
+        return f"fake://{os.path.abspath(file_path)}"
+
+    def add_job(self, job_name, workflow_slug, params, **options):
+        self.jobs_created += 1
+        ready_at = time.time() + self.delay
+        return {"id": f"fake-{'f' if self.fail else 's'}-{ready_at:.3f}-{uuid.uuid4().hex[:8]}"}
+
+    def get_job_status(self, job_id):
+        _, outcome, ready_at, _ = job_id.split("-", 3)
+        if time.time() < float(ready_at):
+            return {"id": job_id, "status": "STARTED"}
+        return {"id": job_id, "status": "FAILED" if outcome == "f" else "SUCCEEDED"}
+
+    def get_job(self, job_id):
+        job = self.get_job_status(job_id)
+        job["name"] = "Computação Musical"
+        if job["status"] == "SUCCEEDED":
+            job["result"] = {
+                os.path.splitext(name)[0]: f"fake://{os.path.join(self.source_dir, name)}"
+                for name in sorted(os.listdir(self.source_dir))
+                if name.endswith((".json", ".wav", ".flac")) and name != "result.musicai.json"
+            }
+        elif job["status"] == "FAILED":
+            job["error"] = {"code": "fake", "title": "Fake failure", "message": "The fake job was configured to fail"}
+        return job
+
+    def wait_for_job_completion(self, job_id):
+        while self.get_job_status(job_id)["status"] not in ("SUCCEEDED", "FAILED"):
+            time.sleep(0.1)
+        return self.get_job(job_id)
+
+    def download_file(self, url, file_destination):
+        if not url.endswith(".json"):
+            time.sleep(self.download_delay)
+        shutil.copyfile(url[len("fake://"):], file_destination)
+        return file_destination
+
+    def download_job_results(self, job_id_or_job_data, output_dir):
+        job = self.get_job(job_id_or_job_data) if isinstance(job_id_or_job_data, str) else job_id_or_job_data
+        if job["status"] != "SUCCEEDED":
+            raise RuntimeError(f"Can't download job results: Job '{job['id']}' is not completed")
+        download_result = {}
+        for result, url in job["result"].items():
+            destination = os.path.join(output_dir, os.path.basename(url))
+            download_result[result] = self.download_file(url, destination)
+        return download_result
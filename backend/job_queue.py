@@ -0,0 +1,506 @@
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from constants import JOBS_DB, LOCAL_CHORDS, MUSICAI_FAKE, MUSICAI_FAKE_SOURCE, MUSICAI_FAKE_DOWNLOAD_DELAY, STEM_STORAGE
+
+# Active states, in pipeline order. DOWNLOADING is retried if a worker dies mid-download.
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+DOWNLOADING = "DOWNLOADING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+ACTIVE_STATES = (PENDING, RUNNING, DOWNLOADING)
+
+# Adaptive polling: start fast, back off while Music.AI is still busy
+MIN_POLL_INTERVAL = 2.0
+MAX_POLL_INTERVAL = 30.0
+POLL_BACKOFF = 1.5
+# A claim older than this belongs to a dead worker and can be taken over
+STALE_CLAIM_SECONDS = 120.0
+# Workers refresh their heartbeat and claims this often, even in the middle of a long step
+HEARTBEAT_INTERVAL = 2.0
+# A worker started by the app exits after this long without any active job
+IDLE_EXIT_SECONDS = 300.0
+MAX_ATTEMPTS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    input_file TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    workflow TEXT NOT NULL,
+    status TEXT NOT NULL,
+    remote_id TEXT,
+    message TEXT,
+    result TEXT,
+    artifacts TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    poll_interval REAL NOT NULL DEFAULT 2.0,
+    next_poll_at REAL NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, next_poll_at);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+
+class ClaimLost(Exception):
+    """The job was taken over by another worker while this one was working on it."""
+
+
+def connect(db_path=JOBS_DB, check_same_thread=True):
+    """
+    Open the job queue, creating the schema on first use.
+
+    Args:
+        db_path (str): Path to the queue database
+        check_same_thread (bool): False for a connection shared by the threads
+            of a process (the app's sessions)
+
+    Returns:
+        sqlite3.Connection: Connection with rows accessible by column name
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    # Queues created before per-artifact progress was tracked
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if 'artifacts' not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN artifacts TEXT")
+    return conn
+
+
+def make_client():
+    """
+    Music.AI client for the worker (the offline fake when MUSICAI_FAKE=1), or
+    None when LOCAL_CHORDS=1 processes jobs without Music.AI.
+    """
+    if LOCAL_CHORDS:
+        return None
+    if MUSICAI_FAKE:
+        from fake_musicai import FakeMusicAiClient
+        return FakeMusicAiClient(source_dir=MUSICAI_FAKE_SOURCE, download_delay=MUSICAI_FAKE_DOWNLOAD_DELAY)
+
+    from musicai_sdk import MusicAiClient
+    from constants import API_KEY
+    if not API_KEY:
+        print("Warning: API_KEY not found. Check your .env file.")
+    return MusicAiClient(api_key=API_KEY)
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    job['artifacts'] = json.loads(job['artifacts']) if job.get('artifacts') else {}
+    return job
+
+
+def first_content_ready(job):
+    """
+    Whether the lyrics and chord tables of a job are on disk, so the song can
+    be shown while the stems are still downloading.
+    """
+    artifacts = job['artifacts'] if job else {}
+    tables = [a for a in artifacts.values() if a['file'].lower().endswith(".json")]
+    return bool(tables) and all(a['done'] for a in tables)
+
+
+def enqueue_job(conn, input_file, output_root, workflow):
+    """
+    Add a job to the queue. The input is copied next to the job's results so
+    it survives temp file cleanup and server restarts.
+
+    Args:
+        conn (sqlite3.Connection): Queue connection
+        input_file (str): Audio file to process
+        output_root (str): Folder under which the job gets its own results folder
+        workflow (str): Music.AI workflow slug
+
+    Returns:
+        dict: The new job
+    """
+    now = time.time()
+    cursor = conn.execute(
+        "INSERT INTO jobs (input_file, output_dir, workflow, status, created_at, updated_at) VALUES (?, '', ?, ?, ?, ?)",
+        (input_file, workflow, PENDING, now, now)
+    )
+    job_id = cursor.lastrowid
+    output_dir = os.path.join(output_root, f"job-{job_id}")
+    os.makedirs(output_dir, exist_ok=True)
+    stored_input = os.path.join(output_dir, "input" + os.path.splitext(input_file)[1])
+    shutil.copyfile(input_file, stored_input)
+    conn.execute(
+        "UPDATE jobs SET input_file = ?, output_dir = ? WHERE id = ?",
+        (stored_input, output_dir, job_id)
+    )
+    return get_job(conn, job_id)
+
+
+def get_job(conn, job_id):
+    """Look up a job by its queue ID."""
+    return _row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def list_jobs(conn, active_only=False, limit=20):
+    """Most recent jobs first (optionally only the unfinished ones)."""
+    query = "SELECT * FROM jobs"
+    params = []
+    if active_only:
+        query += f" WHERE status IN ({','.join('?' * len(ACTIVE_STATES))})"
+        params.extend(ACTIVE_STATES)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    return [_row_to_job(row) for row in conn.execute(query, params)]
+
+
+def _update(conn, job_id, owner=None, **fields):
+    """
+    Update columns of a job; with owner, only while that worker holds its claim.
+
+    Returns:
+        bool: Whether the job was updated
+    """
+    fields['updated_at'] = time.time()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    if owner is None:
+        cursor = conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    else:
+        cursor = conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ? AND claimed_by = ?",
+                              (*fields.values(), job_id, owner))
+    return cursor.rowcount > 0
+
+
+def claim_next_job(conn, worker_id):
+    """
+    Atomically claim the next job that is due (or abandoned by a dead worker).
+
+    Returns:
+        dict: The claimed job, or None if nothing is due
+    """
+    now = time.time()
+    row = conn.execute(
+        f"""
+        UPDATE jobs SET claimed_by = ?, claimed_at = ?
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status IN ({','.join('?' * len(ACTIVE_STATES))})
+              AND next_poll_at <= ?
+              AND (claimed_by IS NULL OR claimed_at < ?)
+            ORDER BY next_poll_at, id
+            LIMIT 1
+        )
+        RETURNING *
+        """,
+        (worker_id, now, *ACTIVE_STATES, now, now - STALE_CLAIM_SECONDS)
+    ).fetchone()
+    return _row_to_job(row)
+
+
+def _update_claimed(conn, job, **fields):
+    """Update a job claimed by this worker; raises ClaimLost once another worker has taken it over."""
+    if not _update(conn, job['id'], owner=job['claimed_by'], **fields):
+        raise ClaimLost(f"Job {job['id']} was claimed by another worker")
+
+
+def _release(conn, job, **fields):
+    _update_claimed(conn, job, claimed_by=None, claimed_at=None, **fields)
+
+
+def process_job_step(conn, job, client, verbose=True):
+    """
+    Advance a claimed job by one step: upload + create, poll, or download.
+
+    Errors are retried with backoff up to MAX_ATTEMPTS, then the job fails.
+    With LOCAL_CHORDS set, a pending job is processed offline in a single step.
+    Every write checks that this worker still holds the claim, so a job taken
+    over by another worker is dropped instead of being advanced twice.
+    """
+    from main import classify_result_files, download_results_progressively, result_downloads
+
+    try:
+        if job['status'] == PENDING and LOCAL_CHORDS:
+            # Stays PENDING while it runs, so a restarted worker simply starts over
+            from local_chords import process_audio_locally
+
+            _update_claimed(conn, job, message="Detecting chords locally")
+            result = process_audio_locally(job['input_file'], job['output_dir'], verbose=verbose)
+            if not result['success']:
+                raise RuntimeError(result['message'])
+            if verbose:
+                print(f"Job {job['id']}: chords detected locally in {job['output_dir']}")
+            _release(conn, job, status=SUCCEEDED, message=result['message'], result=json.dumps(result))
+            return
+
+        if job['status'] == PENDING:
+            song_url = client.upload_file(job['input_file'])
+            # The upload can take minutes: make sure no other worker has created the job meanwhile
+            _update_claimed(conn, job, message="Creating the Music.AI job")
+            job_result = client.add_job("Computação Musical", job['workflow'], {"inputAudio": song_url})
+            if verbose:
+                print(f"Job {job['id']}: created Music.AI job {job_result['id']}")
+            _release(conn, job, status=RUNNING, remote_id=job_result['id'],
+                     message="Processing with Music.AI", poll_interval=MIN_POLL_INTERVAL,
+                     next_poll_at=time.time() + MIN_POLL_INTERVAL)
+            return
+
+        if job['status'] == RUNNING:
+            status = client.get_job_status(job['remote_id'])["status"]
+            if status == "FAILED":
+                remote_job = client.get_job(job['remote_id'])
+                error = remote_job.get("error") or {}
+                _release(conn, job, status=FAILED,
+                         message=f"Job failed with status: FAILED {error.get('message', '')}".strip())
+                return
+            if status != "SUCCEEDED":
+                interval = min(job['poll_interval'] * POLL_BACKOFF, MAX_POLL_INTERVAL)
+                _release(conn, job, message=f"Music.AI status: {status}",
+                         poll_interval=interval, next_poll_at=time.time() + interval)
+                return
+            _update_claimed(conn, job, status=DOWNLOADING, message="Downloading results")
+            job['status'] = DOWNLOADING
+
+        if job['status'] == DOWNLOADING:
+            # One output at a time, JSON first; progress is saved per artifact so
+            # the app can show lyrics early and a restarted worker resumes
+            remote_job = client.get_job(job['remote_id'])
+            artifacts = job['artifacts'] or {}
+            for name, _, destination in result_downloads(remote_job, job['output_dir']):
+                artifacts.setdefault(name, {'file': destination, 'done': False})
+            _update_claimed(conn, job, artifacts=json.dumps(artifacts))
+
+            done = [name for name, artifact in artifacts.items() if artifact['done']]
+            for name, path in download_results_progressively(client, remote_job, job['output_dir'], done=done):
+                if STEM_STORAGE and path.lower().endswith(".wav"):
+                    # Compacted here, before the stem counts as downloaded, so the
+                    # app never starts mixing a WAV that is about to be replaced
+                    from storage import compact_stem
+                    artifacts[name]['file'] = compact_stem(path, STEM_STORAGE)
+                artifacts[name]['done'] = True
+                finished = sum(1 for artifact in artifacts.values() if artifact['done'])
+                _update_claimed(conn, job, artifacts=json.dumps(artifacts),
+                        message=f"Downloaded {finished}/{len(artifacts)} results")
+                if verbose:
+                    print(f"Job {job['id']}: downloaded {name}")
+
+            result_files = list(artifacts)
+            lyrics_file, chords_files, stem_files = classify_result_files(result_files, job['output_dir'])
+            result = {
+                "lyrics_file": lyrics_file,
+                "chords_files": chords_files,
+                "stem_files": stem_files,
+                "job_id": job['remote_id'],
+            }
+            if verbose:
+                print(f"Job {job['id']}: results downloaded to {job['output_dir']}")
+            _release(conn, job, status=SUCCEEDED, message="Processing completed successfully",
+                     result=json.dumps(result))
+
+    except ClaimLost as e:
+        if verbose:
+            print(f"{e}, dropping this step")
+
+    except Exception as e:
+        attempts = job['attempts'] + 1
+        if verbose:
+            print(f"Job {job['id']}: error ({attempts}/{MAX_ATTEMPTS}): {e}")
+        try:
+            if attempts >= MAX_ATTEMPTS:
+                _release(conn, job, status=FAILED, attempts=attempts, message=str(e))
+            else:
+                interval = min(job['poll_interval'] * POLL_BACKOFF, MAX_POLL_INTERVAL)
+                _release(conn, job, attempts=attempts, message=f"Retrying after error: {e}",
+                         poll_interval=interval, next_poll_at=time.time() + interval)
+        except ClaimLost as lost:
+            if verbose:
+                print(f"{lost}, dropping this step")
+
+
+def heartbeat(conn, worker_id):
+    conn.execute(
+        "INSERT INTO workers (id, heartbeat_at) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+        (worker_id, time.time())
+    )
+
+
+def _keep_claims_fresh(db_path, worker_id, stop):
+    """
+    Heartbeat thread of a worker: refresh its heartbeat and the claims it holds
+    every HEARTBEAT_INTERVAL, so a step that runs for minutes (an upload, a large
+    download, local chord detection) neither looks like a dead worker to the app
+    nor lets another worker take the job over.
+    """
+    conn = connect(db_path)
+    try:
+        while True:
+            try:
+                heartbeat(conn, worker_id)
+                conn.execute("UPDATE jobs SET claimed_at = ? WHERE claimed_by = ?", (time.time(), worker_id))
+            except sqlite3.Error as e:
+                print(f"Worker {worker_id}: heartbeat failed: {e}")
+            if stop.wait(HEARTBEAT_INTERVAL):
+                return
+    finally:
+        conn.close()
+
+
+def worker_alive(conn, max_age=10.0):
+    """Whether any worker process sent a heartbeat recently."""
+    row = conn.execute("SELECT MAX(heartbeat_at) AS last FROM workers").fetchone()
+    return bool(row['last'] and row['last'] > time.time() - max_age)
+
+
+def run_worker(db_path=JOBS_DB, client=None, idle_sleep=1.0, once=False, verbose=True, idle_exit=None, worker_id=None):
+    """
+    Worker loop: claim due jobs and advance them until interrupted.
+
+    Args:
+        db_path (str): Queue database
+        client: Music.AI client (defaults to make_client())
+        idle_sleep (float): Seconds to wait when no job is due
+        once (bool): Stop as soon as no active job is left (for scripts and tests)
+        verbose (bool): Print progress messages
+        idle_exit (float): Stop after this many seconds without any active job
+        worker_id (str): Claim owner name (defaults to host and process ID)
+    """
+    conn = connect(db_path)
+    client = client or make_client()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    if verbose:
+        print(f"Worker {worker_id} polling {db_path}")
+
+    stop = threading.Event()
+    keeper = threading.Thread(target=_keep_claims_fresh, args=(db_path, worker_id, stop), daemon=True)
+    keeper.start()
+    idle_since = time.time()
+    try:
+        while True:
+            job = claim_next_job(conn, worker_id)
+            if job:
+                process_job_step(conn, job, client, verbose)
+                continue
+            if list_jobs(conn, active_only=True, limit=1):
+                idle_since = time.time()
+            elif once or (idle_exit is not None and time.time() - idle_since > idle_exit):
+                return
+            time.sleep(idle_sleep)
+    finally:
+        stop.set()
+        keeper.join()
+        # Stop counting as alive right away, so the app starts a new worker when needed
+        conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+        conn.close()
+
+
+def ensure_worker(db_path=JOBS_DB, conn=None):
+    """
+    Start a detached worker process unless one is already alive.
+
+    Args:
+        db_path (str): Queue database
+        conn (sqlite3.Connection): Open queue connection to reuse (one is opened and closed otherwise)
+
+    Returns:
+        bool: Whether a worker was started
+    """
+    if conn is None:
+        conn = connect(db_path)
+        try:
+            return ensure_worker(db_path, conn)
+        finally:
+            conn.close()
+    if worker_alive(conn):
+        return False
+    # Count the spawn as a heartbeat so concurrent sessions do not start a second worker
+    heartbeat(conn, "launcher")
+    log_path = os.path.join(os.path.dirname(os.path.abspath(db_path)), "worker.log")
+    with open(log_path, "ab") as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--db", db_path, "--idle-exit", str(IDLE_EXIT_SECONDS)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+    return True
+
+
+def check_slow_steps(upload_delay=8.0, download_delay=4.0, timeout=120.0):
+    """
+    End-to-end check of the claim handling against the fake Music.AI client:
+    two workers share a queue whose upload and downloads each take longer than
+    the (shortened) stale-claim timeout and the app's heartbeat window. Set
+    MUSICAI_FAKE_SOURCE to a results folder with stems to include slow downloads.
+
+    Returns:
+        bool: Whether the job succeeded with a single Music.AI job, and the
+        workers looked alive throughout
+    """
+    global STALE_CLAIM_SECONDS, HEARTBEAT_INTERVAL
+    from fake_musicai import FakeMusicAiClient
+
+    saved = STALE_CLAIM_SECONDS, HEARTBEAT_INTERVAL
+    STALE_CLAIM_SECONDS, HEARTBEAT_INTERVAL = 3.0, 0.5
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            db_path = os.path.join(folder, "jobs.db")
+            conn = connect(db_path)
+            input_file = os.path.join(folder, "input.mp3")
+            with open(input_file, "wb") as f:
+                f.write(b"audio")
+            job = enqueue_job(conn, input_file, folder, "workflow")
+
+            client = FakeMusicAiClient(source_dir=MUSICAI_FAKE_SOURCE, delay=1.0,
+                                       upload_delay=upload_delay, download_delay=download_delay)
+            workers = [
+                threading.Thread(target=run_worker, args=(db_path, client), daemon=True,
+                                 kwargs={'once': True, 'verbose': False, 'worker_id': f"check-{n}"})
+                for n in range(2)
+            ]
+            for worker in workers:
+                worker.start()
+                time.sleep(1.0)
+            looked_dead = 0
+            deadline = time.time() + timeout
+            while any(worker.is_alive() for worker in workers) and time.time() < deadline:
+                if get_job(conn, job['id'])['status'] in ACTIVE_STATES and not worker_alive(conn):
+                    looked_dead += 1
+                time.sleep(0.5)
+
+            job = get_job(conn, job['id'])
+            conn.close()
+            print(f"Job {job['status']} ({job['message']}), Music.AI jobs created: {client.jobs_created}, "
+                  f"polls without a live worker: {looked_dead}")
+            return job['status'] == SUCCEEDED and client.jobs_created == 1 and looked_dead == 0
+    finally:
+        STALE_CLAIM_SECONDS, HEARTBEAT_INTERVAL = saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Music.AI job queue worker")
+    parser.add_argument("--db", default=JOBS_DB, help="Path to the job queue database")
+    parser.add_argument("--once", action="store_true", help="Exit when no active job is left")
+    parser.add_argument("--idle-exit", type=float, default=None, help="Exit after this many seconds without active jobs")
+    parser.add_argument("--check", action="store_true", help="Run the slow-step check against the fake Music.AI client")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(0 if check_slow_steps() else 1)
+    run_worker(args.db, once=args.once, idle_exit=args.idle_exit)
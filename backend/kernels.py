@@ -0,0 +1,288 @@
+import argparse
+import math
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from constants import USE_NUMBA
+
+# Compiled kernels, built on first use: None until then, {} if numba is unavailable
+_jit = None
+
+
+# Kernel sources: plain Python loops that numba compiles to single passes
+# without temporaries. The mixing loops run over flat (interleaved) samples
+# so they vectorize.
+
+def _accumulate_loop(out, data):
+    for i in range(data.shape[0]):
+        out[i] += data[i]
+
+
+def _normalize_loop(out):
+    peak = 0.0
+    for i in range(out.shape[0]):
+        value = abs(out[i])
+        if value > peak:
+            peak = value
+    if peak > 1.0:
+        scale = 1.0 / peak
+        for i in range(out.shape[0]):
+            out[i] *= scale
+
+
+def _rms_loop(block, hop):
+    frames = (block.shape[0] + hop - 1) // hop
+    channels = block.shape[1]
+    result = np.zeros(frames)
+    for frame in range(frames):
+        total = 0.0
+        for i in range(frame * hop, min(block.shape[0], (frame + 1) * hop)):
+            power = 0.0
+            for c in range(channels):
+                power += block[i, c] * block[i, c]
+            total += power / channels
+        # A partial last hop is averaged as if padded with silence
+        result[frame] = math.sqrt(total / hop)
+    return result
+
+
+def _align_loop(word_starts, word_ends, chord_starts, tolerance):
+    placements = np.full(word_starts.shape[0], -1, dtype=np.int64)
+    chord_index = 0
+    for word_idx in range(word_starts.shape[0]):
+        if chord_index < chord_starts.shape[0]:
+            chord_start = chord_starts[chord_index]
+            if chord_start <= word_ends[word_idx]:
+                if abs(chord_start - word_starts[word_idx]) <= tolerance:
+                    placements[word_idx] = chord_index
+                chord_index += 1
+    return placements
+
+
+def jit_kernels(force=False):
+    """
+    The Numba-compiled kernels, or None when disabled (USE_NUMBA unset) or numba
+    is not installed.
+
+    Kernels compile lazily on their first call per argument type and are cached
+    on disk (cache=True), so later processes load machine code instead of
+    paying the JIT again.
+
+    Args:
+        force (bool): Build the kernels even without USE_NUMBA (benchmarks)
+
+    Returns:
+        dict: {name: compiled function}, or None
+    """
+    global _jit
+    if not (USE_NUMBA or force):
+        return None
+    if _jit is None:
+        try:
+            import numba
+        except ImportError:
+            print("Warning: USE_NUMBA is set but numba is not installed; using the NumPy kernels.")
+            _jit = {}
+        else:
+            _jit = {
+                name: numba.njit(cache=True, nogil=True)(func)
+                for name, func in (
+                    ('accumulate', _accumulate_loop),
+                    ('normalize', _normalize_loop),
+                    ('rms', _rms_loop),
+                    ('align', _align_loop),
+                )
+            }
+    return _jit or None
+
+
+def _as_2d(data):
+    """View frames as (frames, channels) without copying."""
+    data = np.asarray(data)
+    return data.reshape(data.shape[0], -1)
+
+
+def accumulate(out, data, jit=None):
+    """
+    Add data into the first len(data) frames of out, in place.
+
+    Raises:
+        ValueError: If the channel layouts differ (as NumPy broadcasting would)
+    """
+    jit = jit_kernels() if jit is None else jit
+    if not jit or not out.flags.c_contiguous:
+        out[:len(data)] += data
+        return
+    if np.shape(data)[1:] != out.shape[1:] or len(data) > len(out):
+        raise ValueError(f"cannot add frames shaped {np.shape(data)} into a mix shaped {out.shape}")
+    data = np.ravel(data)
+    jit['accumulate'](out.reshape(-1)[:data.shape[0]], data)
+
+
+def normalize_peak(mixed, jit=None):
+    """
+    Scale a mix down to a peak of 1.0 if it would clip.
+
+    Returns:
+        numpy array: The (possibly scaled) mix; the compiled kernel scales in place
+    """
+    jit = jit_kernels() if jit is None else jit
+    if not jit or not mixed.flags.c_contiguous:
+        if mixed.max() > 1.0 or mixed.min() < -1.0:
+            mixed = mixed / np.max(np.abs(mixed))
+        return mixed
+    jit['normalize'](mixed.reshape(-1))
+    return mixed
+
+
+def rms_per_hop(block, hop, jit=None):
+    """
+    RMS of every hop of frames (mono mix of the channels), with the last
+    partial hop padded with silence.
+
+    Returns:
+        numpy array: float64 RMS values
+    """
+    jit = jit_kernels() if jit is None else jit
+    if jit:
+        return jit['rms'](_as_2d(block), hop)
+    power = block ** 2 if block.ndim == 1 else np.mean(block ** 2, axis=1)
+    frames = -(-len(power) // hop)
+    power = np.pad(power, (0, frames * hop - len(power)))
+    return np.sqrt(power.reshape(frames, hop).mean(axis=1))
+
+
+def word_times(words):
+    """(starts, ends) float64 arrays of a word table, built once per song."""
+    return (
+        np.fromiter((w.start for w in words), dtype=np.float64, count=len(words)),
+        np.fromiter((w.end for w in words), dtype=np.float64, count=len(words)),
+    )
+
+
+def align_chord_placements(words, chords, tolerance, jit=None, times=None):
+    """
+    Compiled chord-to-word alignment (same rule as chordsSync.align_chords).
+
+    Args:
+        words (list): Word records sorted by start
+        chords (list): Chord records sorted by start
+        tolerance (float): Maximum distance (s) between a chord and its word
+        times (tuple): word_times(words), when several instruments share it
+
+    Returns:
+        dict: {word_index: chord_name}, or None when the kernels are disabled
+    """
+    jit = jit_kernels() if jit is None else jit
+    if not jit:
+        return None
+    starts, ends = times if times is not None else word_times(words)
+    chord_starts = np.fromiter((c.start for c in chords), dtype=np.float64, count=len(chords))
+    indices = jit['align'](starts, ends, chord_starts, float(tolerance))
+    placed = np.flatnonzero(indices >= 0)
+    return {word_idx: chords[idx].chord for word_idx, idx in zip(placed.tolist(), indices[placed].tolist())}
+
+
+def _best_time(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _warmup_seconds(cache_dir):
+    """Seconds a fresh process spends importing numba and running every kernel once."""
+    code = (
+        "import time; started = time.perf_counter()\n"
+        "import numpy as np, kernels\n"
+        "jit = kernels.jit_kernels(force=True)\n"
+        "mix = np.zeros((16, 2)); kernels.accumulate(mix, np.ones((8, 2)), jit); kernels.normalize_peak(mix, jit)\n"
+        "kernels.rms_per_hop(np.ones(64, dtype=np.float32), 8, jit)\n"
+        "jit['align'](np.zeros(1), np.ones(1), np.zeros(1), 0.5)\n"
+        "print(time.perf_counter() - started)\n"
+    )
+    env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                          env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "warm-up failed")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def benchmark(seconds=(10, 60, 300), words=(300, 3000, 30000), samplerate=44100, stems=5):
+    """
+    Time each kernel with both backends on synthetic data of growing size
+    (best of five warm runs), plus the one-off cost of the JIT: compiling
+    from scratch versus loading the disk cache in a fresh process.
+    """
+    import tempfile
+
+    jit = jit_kernels(force=True)
+    if not jit:
+        return
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compile_s = _warmup_seconds(cache_dir)
+        cached_s = _warmup_seconds(cache_dir)
+    print(f"JIT warm-up in a fresh process: {compile_s * 1000:.0f} ms compiling, {cached_s * 1000:.0f} ms from the disk cache\n")
+
+    rng = np.random.default_rng(0)
+    print(f"{'kernel':<12}{'size':>14}{'numpy ms':>12}{'numba ms':>12}{'speedup':>10}")
+
+    def row(name, size, numpy_func, numba_func):
+        numba_func()
+        numpy_s, numba_s = _best_time(numpy_func), _best_time(numba_func)
+        print(f"{name:<12}{size:>14}{numpy_s * 1000:>12.2f}{numba_s * 1000:>12.2f}{numpy_s / numba_s:>9.1f}x")
+
+    for duration in seconds:
+        frames = int(duration * samplerate)
+        tracks = [rng.uniform(-0.5, 0.5, (frames, 2)).astype(np.float32) for _ in range(stems)]
+
+        def mix(backend):
+            out = np.zeros((frames, 2))
+            for track in tracks:
+                accumulate(out, track, backend)
+            normalize_peak(out, backend)
+
+        row("mix", f"{stems}x{duration} s", lambda: mix({}), lambda: mix(jit))
+        hop = int(samplerate * 0.05)
+        row("rms", f"{duration} s", lambda: rms_per_hop(tracks[0], hop, {}), lambda: rms_per_hop(tracks[0], hop, jit))
+
+    from chordsSync import align_chords
+    from loaders import Chord, Word
+
+    # One song aligned against every instrument (as sync_all_instruments does)
+    for count in words:
+        starts = np.cumsum(rng.uniform(0.1, 0.6, count))
+        word_list = [Word(f"w{i}", float(s), float(s) + 0.3) for i, s in enumerate(starts)]
+        chord_list = [Chord("C", float(s), float(s) + 2.0) for s in starts[::4]]
+
+        def align(backend):
+            times = word_times(word_list) if backend else None
+            for _ in range(stems):
+                align_chords(word_list, chord_list, backend, times)
+
+        row("align", f"{stems}x{count} words", lambda: align({}), lambda: align(jit))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Numba kernels for mixing, envelopes and lyric alignment")
+    parser.add_argument("--benchmark", action="store_true", help="Compare the NumPy and Numba backends")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        # Compile (or load) every kernel once, e.g. while building a deployment image
+        jit = jit_kernels(force=True)
+        if jit:
+            accumulate(np.zeros((4, 2)), np.ones((2, 2)), jit)
+            normalize_peak(np.ones((4, 1)), jit)
+            rms_per_hop(np.ones(8, dtype=np.float32), 4, jit)
+            jit['align'](np.zeros(1), np.ones(1), np.zeros(1), 0.5)
+            print("Numba kernels compiled and cached.")
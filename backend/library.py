@@ -0,0 +1,373 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from constants import CACHE_DIR, LIBRARY_DB
+from audio_cache import file_hash
+from loaders import load_chords, load_words, decode_json
+from utils import get_instruments
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    folder TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    duration REAL,
+    song_key TEXT,
+    lyrics_file TEXT,
+    instruments TEXT NOT NULL,
+    stems TEXT NOT NULL,
+    artifacts TEXT NOT NULL DEFAULT '{}',
+    indexed_at REAL NOT NULL,
+    plays INTEGER NOT NULL DEFAULT 0,
+    last_played_at REAL,
+    source_folder TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_songs_title ON songs(title COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS song_chords (
+    song_id INTEGER NOT NULL REFERENCES songs(id) ON DELETE CASCADE,
+    chord TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (song_id, chord)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_song_chords_chord ON song_chords(chord);
+"""
+
+# Library connections run in autocommit mode and may be shared by the app's
+# session threads; this lock keeps one thread's transaction (and the reads
+# that could see it half done) from interleaving with another's
+_lock = threading.RLock()
+
+
+def connect(db_path=LIBRARY_DB, check_same_thread=True):
+    """
+    Open the song library, creating the schema on first use. Group writes in
+    transaction(conn).
+
+    Args:
+        db_path (str): Path to the SQLite database
+        check_same_thread (bool): False for a connection shared by the threads
+            of a process (the app's sessions)
+
+    Returns:
+        sqlite3.Connection: Connection with rows accessible by column name
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    # Libraries created before play counts were tracked
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(songs)")}
+    if 'plays' not in columns:
+        with transaction(conn):
+            conn.execute("ALTER TABLE songs ADD COLUMN plays INTEGER NOT NULL DEFAULT 0")
+            conn.execute("ALTER TABLE songs ADD COLUMN last_played_at REAL")
+    # Libraries created before derived renders were marked: their transposed
+    # copies are dropped and re-indexed, as renders, when next used
+    if 'source_folder' not in columns:
+        transposed_root = _transposed_root()
+        with transaction(conn):
+            conn.execute("ALTER TABLE songs ADD COLUMN source_folder TEXT")
+            conn.execute("DELETE FROM songs WHERE substr(folder, 1, ?) = ?", (len(transposed_root), transposed_root))
+    return conn
+
+
+def _transposed_root():
+    return os.path.join(os.path.abspath(CACHE_DIR), "transposed") + os.sep
+
+
+@contextmanager
+def transaction(conn):
+    """
+    Run a group of writes as one transaction (BEGIN IMMEDIATE ... COMMIT, rolled
+    back on error), serialized with the other threads of the process.
+    """
+    with _lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def scan_song_folder(folder):
+    """
+    List the result files of one processed song (the only directory scan).
+
+    Returns:
+        dict: {'lyrics_file', 'chords_files', 'stem_files', 'result_file'}
+    """
+    files = sorted(os.listdir(folder))
+    lyrics_file = os.path.join(folder, "lyrics.json")
+    result_file = os.path.join(folder, "result.musicai.json")
+    return {
+        'lyrics_file': lyrics_file if os.path.exists(lyrics_file) else None,
+        'chords_files': [os.path.join(folder, f) for f in files if f.endswith("_chords.json")],
+        'stem_files': [
+            os.path.join(folder, f) for f in files
+            if f.endswith((".wav", ".flac")) and f != "mixed_playback.wav"
+        ],
+        'result_file': result_file if os.path.exists(result_file) else None,
+    }
+
+
+def estimate_key(chord_seconds):
+    """
+    Rough key guess: the chord that sounds the longest is usually the tonic.
+
+    Args:
+        chord_seconds (dict): {chord: total seconds}
+
+    Returns:
+        str: Chord label, or None if there are no chords
+    """
+    if not chord_seconds:
+        return None
+    return max(chord_seconds.items(), key=lambda item: item[1])[0]
+
+
+def _song_hash(paths):
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode())
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def _row_to_song(row):
+    if row is None:
+        return None
+    song = dict(row)
+    for column in ('instruments', 'stems', 'artifacts'):
+        song[column] = json.loads(song[column])
+    return song
+
+
+def index_song(conn, folder, title=None):
+    """
+    Add or refresh one song folder in the library.
+
+    Songs whose files hash to the same value as the stored row are left as-is.
+    Stems are only read and hashed here; compacting them is done by the job
+    worker after download (or storage.py for songs already in the library).
+
+    Args:
+        conn (sqlite3.Connection): Library connection
+        folder (str): Results folder of the song
+        title (str): Display title (defaults to the Music.AI job name or folder name)
+
+    Returns:
+        dict: The song row, or None if the folder has no usable results
+    """
+    folder = os.path.abspath(folder)
+    if not os.path.isdir(folder):
+        print(f"Error: Could not find '{folder}'.")
+        return None
+
+    scanned = scan_song_folder(folder)
+    sources = scanned['chords_files'] + scanned['stem_files']
+    if scanned['lyrics_file']:
+        sources.append(scanned['lyrics_file'])
+    if not sources:
+        return None
+
+    song_hash = _song_hash(sources)
+    existing = get_song(conn, folder)
+    if existing and existing['hash'] == song_hash and (title is None or existing['title'] == title) \
+            and ('envelopes' in existing['artifacts'] or not scanned['stem_files']) \
+            and (existing['source_folder'] or not folder.startswith(_transposed_root())):
+        return existing
+
+    source_folder = None
+    if scanned['result_file']:
+        try:
+            result_info = decode_json(scanned['result_file'])
+            title = title or result_info.get('name')
+            # Renders of another song (transposed copies) name their source
+            source_folder = result_info.get('transposed_from')
+        except (ValueError, IOError, AttributeError):
+            pass
+    if source_folder is None and folder.startswith(_transposed_root()):
+        # Copies rendered before they were marked are renders all the same, of
+        # the song whose hash starts their folder name
+        source_hash = os.path.basename(folder).rsplit("_", 1)[0]
+        with _lock:
+            row = conn.execute("SELECT folder FROM songs WHERE hash = ? AND source_folder IS NULL",
+                               (source_hash,)).fetchone()
+        source_folder = row['folder'] if row else _transposed_root()
+    title = title or os.path.basename(folder)
+
+    # Ingest: one streaming pass over every stem for its activity envelope,
+    # so silent stems are recognized without decoding them again
+    artifacts = existing['artifacts'] if existing else {}
+    silent = set()
+    if scanned['stem_files']:
+        from envelopes import compute_song_envelopes, load_envelopes, silent_stems, song_envelopes_path
+
+        envelopes_file = song_envelopes_path(song_hash)
+        if not os.path.exists(envelopes_file):
+            compute_song_envelopes(scanned['stem_files'], envelopes_file)
+        artifacts['envelopes'] = envelopes_file
+        silent = silent_stems(load_envelopes(envelopes_file), scanned['stem_files'])
+
+    instruments = get_instruments(chords_files=scanned['chords_files'], stem_files=scanned['stem_files'], silent_stems=silent)
+
+    # Chord vocabulary (seconds per chord, over every usable instrument)
+    chord_seconds = {}
+    last_event = 0.0
+    for files in instruments.values():
+        for chord in load_chords(files['chords']):
+            last_event = max(last_event, chord.end)
+            if chord.chord != 'N':
+                chord_seconds[chord.chord] = chord_seconds.get(chord.chord, 0.0) + chord.end - chord.start
+
+    duration = None
+    if scanned['stem_files']:
+        import soundfile as sf
+
+        infos = [sf.info(stem) for stem in scanned['stem_files']]
+        duration = max(info.frames / info.samplerate for info in infos)
+    else:
+        if scanned['lyrics_file']:
+            words = load_words(scanned['lyrics_file'])
+            if words:
+                last_event = max(last_event, words[-1].end)
+        duration = last_event or None
+
+    with transaction(conn):
+        conn.execute(
+            """
+            INSERT INTO songs (folder, title, hash, duration, song_key, lyrics_file, instruments, stems, artifacts,
+                               indexed_at, source_folder)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(folder) DO UPDATE SET
+                title=excluded.title, hash=excluded.hash, duration=excluded.duration,
+                song_key=excluded.song_key, lyrics_file=excluded.lyrics_file,
+                instruments=excluded.instruments, stems=excluded.stems,
+                artifacts=excluded.artifacts, indexed_at=excluded.indexed_at,
+                source_folder=excluded.source_folder
+            """,
+            (folder, title, song_hash, duration, estimate_key(chord_seconds), scanned['lyrics_file'],
+             json.dumps(instruments), json.dumps(scanned['stem_files']), json.dumps(artifacts), time.time(),
+             source_folder)
+        )
+        song_id = conn.execute("SELECT id FROM songs WHERE folder = ?", (folder,)).fetchone()['id']
+        conn.execute("DELETE FROM song_chords WHERE song_id = ?", (song_id,))
+        conn.executemany(
+            "INSERT INTO song_chords (song_id, chord, seconds) VALUES (?, ?, ?)",
+            [(song_id, chord, seconds) for chord, seconds in chord_seconds.items()]
+        )
+
+    return get_song(conn, folder)
+
+
+def get_song(conn, folder):
+    """
+    Look up a song by its results folder.
+
+    Returns:
+        dict: The song row (JSON columns decoded), or None if not indexed
+    """
+    with _lock:
+        row = conn.execute("SELECT * FROM songs WHERE folder = ?", (os.path.abspath(folder),)).fetchone()
+    return _row_to_song(row)
+
+
+def get_song_chords(conn, song_id):
+    """
+    Chord vocabulary of a song.
+
+    Returns:
+        dict: {chord: total seconds}
+    """
+    with _lock:
+        rows = conn.execute("SELECT chord, seconds FROM song_chords WHERE song_id = ?", (song_id,)).fetchall()
+    return {row['chord']: row['seconds'] for row in rows}
+
+
+def list_chords(conn):
+    """All chord labels used by the songs of the library (not their renders), sorted."""
+    with _lock:
+        rows = conn.execute(
+            "SELECT DISTINCT c.chord FROM song_chords c JOIN songs s ON s.id = c.song_id "
+            "WHERE s.source_folder IS NULL ORDER BY c.chord"
+        ).fetchall()
+    return [row['chord'] for row in rows]
+
+
+def record_artifact(conn, folder, name, path):
+    """
+    Remember where a precomputed artifact of a song lives (mixes, sync caches, ...).
+    """
+    with transaction(conn):
+        song = get_song(conn, folder)
+        if song is None:
+            return None
+        song['artifacts'][name] = path
+        conn.execute("UPDATE songs SET artifacts = ? WHERE id = ?", (json.dumps(song['artifacts']), song['id']))
+    return song
+
+
+def record_play(conn, folder):
+    """
+    Count one play of a song (play counts drive the hot/cold stem storage).
+
+    Returns:
+        int: The new play count, or None if the song is not indexed
+    """
+    with transaction(conn):
+        row = conn.execute(
+            "UPDATE songs SET plays = plays + 1, last_played_at = ? WHERE folder = ? RETURNING plays",
+            (time.time(), os.path.abspath(folder))
+        ).fetchone()
+    return row['plays'] if row else None
+
+
+def search_songs(conn, title=None, chords=None, only_chords=None, limit=50):
+    """
+    Search the library without touching the filesystem. Renders derived from
+    another song (transposed copies) are not listed.
+
+    Args:
+        conn (sqlite3.Connection): Library connection
+        title (str): Case-insensitive substring of the title
+        chords (list): Songs that use all of these chords
+        only_chords (list): Songs that use no chord outside this set
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Song rows, ordered by title
+    """
+    clauses = ["s.source_folder IS NULL"]
+    params = []
+    if title:
+        clauses.append("s.title LIKE ? COLLATE NOCASE")
+        params.append(f"%{title}%")
+    if chords:
+        chords = sorted(set(chords))
+        clauses.append(
+            f"(SELECT COUNT(*) FROM song_chords c WHERE c.song_id = s.id AND c.chord IN ({','.join('?' * len(chords))})) = ?"
+        )
+        params.extend(chords)
+        params.append(len(chords))
+    if only_chords is not None:
+        only_chords = sorted(set(only_chords))
+        clauses.append(
+            f"NOT EXISTS (SELECT 1 FROM song_chords c WHERE c.song_id = s.id AND c.chord NOT IN ({','.join('?' * len(only_chords))}))"
+        )
+        params.extend(only_chords)
+
+    query = "SELECT s.* FROM songs s WHERE " + " AND ".join(clauses)
+    query += " ORDER BY s.title COLLATE NOCASE LIMIT ?"
+    params.append(limit)
+    with _lock:
+        rows = conn.execute(query, params).fetchall()
+    return [_row_to_song(row) for row in rows]
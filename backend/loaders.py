@@ -0,0 +1,124 @@
+import json
+
+# orjson is optional: it decodes several times faster than the stdlib when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Word:
+    """One timed lyric word."""
+    __slots__ = ("word", "start", "end")
+
+    def __init__(self, word, start, end):
+        self.word = word
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Word({self.word!r}, {self.start}, {self.end})"
+
+
+class Chord:
+    """One chord event, keeping only the fields the app reads."""
+    __slots__ = ("chord", "start", "end", "start_bar", "start_beat")
+
+    def __init__(self, chord, start, end, start_bar=None, start_beat=None):
+        self.chord = chord
+        self.start = start
+        self.end = end
+        self.start_bar = start_bar
+        self.start_beat = start_beat
+
+    def __repr__(self):
+        return f"Chord({self.chord!r}, {self.start}, {self.end})"
+
+
+def decode_json(file_path):
+    """
+    Decode a JSON file with the fastest available decoder.
+
+    Raises:
+        ValueError: If the file is not valid JSON.
+    """
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"{file_path}: {e}") from e
+    return json.loads(raw)
+
+
+def words_from_lyrics(lyrics_data):
+    """
+    Validate lyrics data and project it onto Word records sorted by start time.
+    Per-syllable lists, scores and phrase text are dropped.
+
+    Args:
+        lyrics_data (list): Lyrics data from JSON
+
+    Returns:
+        list: Word records
+
+    Raises:
+        ValueError: If an entry does not follow the lyrics schema.
+    """
+    if not isinstance(lyrics_data, list):
+        raise ValueError("Lyrics data must be a list of phrases")
+
+    words = []
+    for phrase_idx, phrase in enumerate(lyrics_data):
+        try:
+            for word_info in phrase.get('words', []):
+                words.append(Word(str(word_info['word']), float(word_info['start']), float(word_info['end'])))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid lyrics phrase {phrase_idx}: {e!r}") from e
+
+    words.sort(key=lambda w: w.start)
+    return words
+
+
+def chords_from_data(chords_data, vocabulary="chord_simple_pop"):
+    """
+    Validate chord data and project it onto Chord records (including "N" events).
+    Only the requested chord vocabulary is kept.
+
+    Args:
+        chords_data (list): Chords data from JSON
+        vocabulary (str): Which chord_* label to keep
+
+    Returns:
+        list: Chord records in file order
+
+    Raises:
+        ValueError: If an entry does not follow the chords schema.
+    """
+    if not isinstance(chords_data, list):
+        raise ValueError("Chords data must be a list of chord events")
+
+    chords = []
+    for idx, chord_info in enumerate(chords_data):
+        try:
+            chords.append(Chord(
+                str(chord_info[vocabulary]),
+                float(chord_info['start']),
+                float(chord_info['end']),
+                chord_info.get('start_bar'),
+                chord_info.get('start_beat')
+            ))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid chord event {idx}: {e!r}") from e
+    return chords
+
+
+def load_words(lyrics_file):
+    """Load a lyrics JSON file as Word records sorted by start time."""
+    return words_from_lyrics(decode_json(lyrics_file))
+
+
+def load_chords(chords_file, vocabulary="chord_simple_pop"):
+    """Load a chords JSON file as Chord records."""
+    return chords_from_data(decode_json(chords_file), vocabulary)
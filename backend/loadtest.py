@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# I-IV-V-vi style progressions, as (root pitch class, minor) in C, transposed per song
+PROGRESSIONS = [
+    [(0, False), (5, False), (7, False), (9, True)],
+    [(0, False), (9, True), (5, False), (7, False)],
+    [(9, True), (5, False), (0, False), (7, False)],
+]
+# Octave (MIDI note of C) and partials of each synthetic stem
+STEM_VOICES = {"bass": (36, 2), "guitar": (52, 4), "piano": (60, 3), "vocals": (72, 2)}
+INTERACTIONS = ["cold_start", "load_song", "switch_instrument"]
+
+
+def _chord_event(start, end, beat, root, minor, tonic):
+    from local_chords import chord_labels, BEATS_PER_BAR
+
+    start_bar, start_beat = divmod(int(round(start / beat)), BEATS_PER_BAR)
+    end_bar, end_beat = divmod(int(round(end / beat)), BEATS_PER_BAR)
+    labels = chord_labels(root, minor, tonic)
+    event = {
+        "start": round(start, 2), "end": round(end, 2),
+        "start_bar": start_bar + 1, "start_beat": start_beat + 1,
+        "end_bar": end_bar + 1, "end_beat": end_beat + 1,
+        "chord_majmin": labels.pop("chord_majmin"),
+        "bass": None, "bass_nashville": None,
+    }
+    event.update(labels)
+    return event
+
+
+def make_synthetic_song(folder, title, duration=60.0, seed=0, samplerate=44100, bpm=120.0):
+    """
+    Write a complete results folder (stems, *_chords.json, lyrics.json and
+    result.musicai.json) for a synthetic song: a looping four chord
+    progression played by sine-partial voices, with one lyric word per beat.
+
+    Args:
+        folder (str): Output folder (created if needed)
+        title (str): Song name stored in result.musicai.json
+        duration (float): Length in seconds
+        seed (int): Picks the key and the progression
+        samplerate (int): Stem sample rate
+        bpm (float): Tempo (one chord per 4/4 bar)
+
+    Returns:
+        str: folder
+    """
+    import numpy as np
+    import soundfile as sf
+
+    rng = np.random.default_rng(seed)
+    tonic = int(rng.integers(12))
+    progression = [((root + tonic) % 12, minor) for root, minor in PROGRESSIONS[seed % len(PROGRESSIONS)]]
+    beat = 60.0 / bpm
+    bar = 4 * beat
+    n = int(duration * samplerate)
+    t = np.arange(n) / samplerate
+    bar_index = (t // bar).astype(int) % len(progression)
+    # Plucked envelope restarting on every beat
+    envelope = 0.3 + 0.7 * np.exp(-4.0 * (t % beat))
+
+    os.makedirs(folder, exist_ok=True)
+    for stem, (base_midi, partials) in STEM_VOICES.items():
+        audio = np.zeros(n)
+        for chord_idx, (root, minor) in enumerate(progression):
+            mask = bar_index == chord_idx
+            notes = [root] if stem == "bass" else [root, root + (3 if minor else 4), root + 7]
+            if stem == "vocals":
+                notes = notes[:1]
+            for note in notes:
+                freq = 440.0 * 2.0 ** ((base_midi + note - 69) / 12.0)
+                for k in range(1, partials + 1):
+                    audio[mask] += np.sin(2 * np.pi * freq * k * t[mask]) / k
+        audio *= 0.15 * envelope / len(STEM_VOICES)
+        sf.write(os.path.join(folder, f"{stem}.wav"), audio, samplerate)
+
+    noise = rng.standard_normal(n) * np.exp(-30.0 * (t % beat)) * 0.1
+    sf.write(os.path.join(folder, "drums.wav"), noise, samplerate)
+
+    # Chord tables: one event per bar (drums have no harmony)
+    bars = np.arange(0.0, duration, bar)
+    events = [
+        _chord_event(start, min(start + bar, duration), beat, *progression[i % len(progression)], tonic)
+        for i, start in enumerate(bars)
+    ]
+    for stem in STEM_VOICES:
+        with open(os.path.join(folder, f"{stem}_chords.json"), 'w', encoding='utf-8') as f:
+            json.dump(events, f)
+    with open(os.path.join(folder, "drums_chords.json"), 'w', encoding='utf-8') as f:
+        json.dump([_chord_event(0.0, duration, beat, None, False, tonic)], f)
+
+    # Lyrics: a phrase of 8 words every 2 bars
+    lyrics = []
+    for phrase_start in np.arange(0.0, duration - 2 * bar, 2 * bar):
+        words = [
+            {"word": f"la{j}", "start": round(phrase_start + j * beat, 2), "end": round(phrase_start + (j + 0.8) * beat, 2), "score": 1.0}
+            for j in range(8)
+        ]
+        lyrics.append({
+            "start": words[0]["start"], "end": words[-1]["end"],
+            "text": " ".join(w["word"] for w in words), "language": "english", "words": words
+        })
+    with open(os.path.join(folder, "lyrics.json"), 'w', encoding='utf-8') as f:
+        json.dump(lyrics, f)
+    with open(os.path.join(folder, "result.musicai.json"), 'w', encoding='utf-8') as f:
+        json.dump({"name": title, "result": {}}, f)
+    return folder
+
+
+def _instrument_meters():
+    """
+    Count what the app sends to the browser while AppTest drives it: the
+    protobuf size of every ForwardMsg, plus the media files (audio) that the
+    browser would download separately.
+
+    Returns:
+        dict: Running totals {'forward_bytes', 'media_bytes'}
+    """
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    totals = {'forward_bytes': 0, 'media_bytes': 0}
+
+    class MeteredScriptRunner(LocalScriptRunner):
+        def run(self, *args, **kwargs):
+            tree = super().run(*args, **kwargs)
+            totals['forward_bytes'] += sum(msg.ByteSize() for msg in self.forward_msgs())
+            return tree
+
+    load_and_get_id = MemoryMediaFileStorage.load_and_get_id
+
+    def metered_load_and_get_id(self, path_or_data, *args, **kwargs):
+        if isinstance(path_or_data, (bytes, bytearray)):
+            totals['media_bytes'] += len(path_or_data)
+        elif isinstance(path_or_data, str) and os.path.exists(path_or_data):
+            totals['media_bytes'] += os.path.getsize(path_or_data)
+        return load_and_get_id(self, path_or_data, *args, **kwargs)
+
+    app_test.LocalScriptRunner = MeteredScriptRunner
+    MemoryMediaFileStorage.load_and_get_id = metered_load_and_get_id
+    return totals
+
+
+def run_session(args):
+    """
+    One simulated user, in its own process: open the app, load a song, then
+    switch the muted instrument (each run also renders the synced lyrics).
+
+    AppTest swaps a process-wide Runtime for every script run, so concurrent
+    sessions cannot share a process.
+
+    Args:
+        args (tuple): (session index, song title or None for the demo, number of
+                       instrument switches, start timestamp, timeout)
+
+    Returns:
+        dict: 'samples' [(interaction, seconds, bytes)], 'cpu', 'max_rss_kb', 'errors'
+    """
+    session, title, switches, start_at, timeout = args
+    sys.path.insert(0, SCRIPT_DIR)
+    os.chdir(SCRIPT_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    meters = _instrument_meters()
+    samples = []
+    errors = []
+
+    def step(name, action):
+        sent = meters['forward_bytes'] + meters['media_bytes']
+        began = time.perf_counter()
+        at = action()
+        elapsed = time.perf_counter() - began
+        samples.append((name, elapsed, meters['forward_bytes'] + meters['media_bytes'] - sent))
+        if at.exception:
+            errors.append(f"session {session} {name}: {at.exception[0].value}")
+        return at
+
+    # Start every session at the same moment
+    time.sleep(max(0.0, start_at - time.time()))
+    try:
+        at = step("cold_start", lambda: AppTest.from_file("app.py", default_timeout=timeout).run())
+        if title is None:
+            at = step("load_song", lambda: at.button(key="load_demo").click().run())
+        else:
+            at.text_input(key="library_title").input(title).run()
+            at = step("load_song", lambda: at.button(key="load_library_song").click().run())
+
+        options = at.selectbox(key="mute_select").options if not at.exception else []
+        if not options:
+            errors.append(f"session {session}: no instruments to select")
+        for i in range(switches if len(options) > 1 else 0):
+            option = options[(i + 1) % len(options)]
+            at = step("switch_instrument", lambda: at.selectbox(key="mute_select").select(option).run())
+            if not at.exception and not at.get("iframe"):
+                errors.append(f"session {session}: lyrics were not rendered")
+    except Exception as e:
+        errors.append(f"session {session}: {e!r}")
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        'samples': samples,
+        'cpu': usage.ru_utime + usage.ru_stime,
+        'max_rss_kb': usage.ru_maxrss,
+        'errors': errors,
+    }
+
+
+def prepare_songs(workdir, count, duration):
+    """Generate synthetic songs and index them (ingest is not part of the measured sessions)."""
+    from library import connect, index_song
+
+    conn = connect()
+    titles = []
+    for i in range(count):
+        title = f"Load Test Song {i + 1}"
+        folder = make_synthetic_song(os.path.join(workdir, "songs", f"song_{i + 1}"), title, duration=duration, seed=i)
+        index_song(conn, folder, title=title)
+        titles.append(title)
+    return titles
+
+
+def report(results, sessions, wall):
+    """Print latency percentiles per interaction and the resource totals."""
+    import numpy as np
+
+    samples = [sample for result in results for sample in result['samples']]
+    print(f"\n{'interaction':<20}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'KB/req':>10}")
+    for name in INTERACTIONS:
+        latencies = np.array([s[1] for s in samples if s[0] == name]) * 1000
+        sizes = np.array([s[2] for s in samples if s[0] == name]) / 1024
+        if not len(latencies):
+            continue
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        print(f"{name:<20}{len(latencies):>7}{p50:>10.0f}{p90:>10.0f}{p99:>10.0f}{latencies.max():>10.0f}{sizes.mean():>10.1f}")
+
+    cpu = sum(result['cpu'] for result in results)
+    rss = [result['max_rss_kb'] / 1024 for result in results]
+    sent = sum(s[2] for s in samples)
+    print(f"\nSessions:          {sessions} concurrent")
+    print(f"Wall time:         {wall:.1f} s")
+    print(f"CPU time:          {cpu:.1f} s ({100 * cpu / wall:.0f}% of one core)")
+    print(f"Peak RSS:          {max(rss):.0f} MB per session, {sum(rss):.0f} MB total")
+    print(f"Bytes sent:        {sent / 1024 / 1024:.2f} MB ({sent / 1024 / max(len(samples), 1):.1f} KB per interaction)")
+
+    errors = [error for result in results for error in result['errors']]
+    for error in errors:
+        print(f"ERROR: {error}")
+    return not errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the play-along flow")
+    parser.add_argument("-n", "--sessions", type=int, default=4, help="Concurrent simulated sessions")
+    parser.add_argument("--songs", type=int, default=2, help="Synthetic songs to spread the sessions over")
+    parser.add_argument("--duration", type=float, default=60.0, help="Synthetic song length in seconds")
+    parser.add_argument("--switches", type=int, default=3, help="Muted instrument switches per session")
+    parser.add_argument("--demo", action="store_true", help="Load the bundled demo instead of synthetic songs")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per script run timeout in seconds")
+    parser.add_argument("--workdir", default=None, help="Where songs, caches and databases go (default: a temp dir)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="loadtest-")
+    # Isolated caches and databases, inherited by the session processes
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["LIBRARY_DB"] = os.path.join(workdir, "library.db")
+    os.environ["JOBS_DB"] = os.path.join(workdir, "jobs.db")
+    sys.path.insert(0, SCRIPT_DIR)
+
+    titles = [None] if args.demo else prepare_songs(workdir, max(1, args.songs), args.duration)
+    print(f"Running {args.sessions} sessions against {'the demo' if args.demo else f'{len(titles)} synthetic songs'} (workdir {workdir})")
+
+    start_at = time.time() + 1.0
+    jobs = [(i, titles[i % len(titles)], args.switches, start_at, args.timeout) for i in range(args.sessions)]
+    with Pool(processes=args.sessions) as pool:
+        results = pool.map(run_session, jobs)
+    wall = time.time() - start_at
+
+    sys.exit(0 if report(results, args.sessions, wall) else 1)
@@ -0,0 +1,390 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from constants import AUDIO_WORKERS
+from transpose import NOTES
+
+# Analysis settings (audio is resampled to ANALYSIS_SR, mono)
+ANALYSIS_SR = 22050
+CHROMA_FFT = 8192
+CHROMA_HOP = 2048
+ONSET_FFT = 1024
+ONSET_HOP = 512
+MIN_MIDI = 28   # E1, the lowest bass string
+MAX_MIDI = 96   # C7
+CHROMA_COMPRESSION = 10.0
+BEATS_PER_BAR = 4
+
+# Decoding: probability of keeping the same chord from one beat to the next,
+# sharpness of the template match and the score of the "no chord" state
+SELF_TRANSITION = 0.9
+MATCH_SHARPNESS = 12.0
+NO_CHORD_SCORE = 0.6
+SILENCE_DB = -50.0
+
+NASHVILLE_DEGREES = ["1", "b2", "2", "b3", "3", "4", "b5", "5", "b6", "6", "b7", "7"]
+# Krumhansl-Kessler major key profile
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+
+
+def _frames(y, n_fft, hop):
+    """Centered, windowed STFT magnitudes of a mono signal, shape (frames, bins)."""
+    y = np.pad(y, (n_fft // 2, n_fft // 2))
+    if len(y) < n_fft:
+        y = np.pad(y, (0, n_fft - len(y)))
+    frames = np.lib.stride_tricks.sliding_window_view(y, n_fft)[::hop]
+    return np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1))
+
+
+def _pitch_class_matrix(n_fft, sr):
+    """(bins, 12) weights folding FFT bins within MIN_MIDI..MAX_MIDI onto pitch classes."""
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    weights = np.zeros((len(freqs), 12))
+    with np.errstate(divide='ignore'):
+        midi = 69.0 + 12.0 * np.log2(freqs / 440.0)
+    valid = np.isfinite(midi) & (midi >= MIN_MIDI - 0.5) & (midi <= MAX_MIDI + 0.5)
+    nearest = np.round(midi[valid])
+    # Triangular weight: 1 on the semitone, 0 half a semitone away
+    weights[np.flatnonzero(valid), nearest.astype(int) % 12] = 1.0 - 2.0 * np.abs(midi[valid] - nearest)
+    return weights
+
+
+def chroma_features(y, sr=ANALYSIS_SR):
+    """
+    Log-compressed chroma of a mono signal (power per pitch class, relative
+    to the frame's strongest pitch class).
+
+    Returns:
+        tuple: (chroma of shape (frames, 12), frame energy in dB, frame times in seconds)
+    """
+    mag = _frames(y, CHROMA_FFT, CHROMA_HOP)
+    chroma = (mag ** 2) @ _pitch_class_matrix(CHROMA_FFT, sr)
+    chroma = np.log1p(CHROMA_COMPRESSION * chroma / np.maximum(chroma.max(axis=1, keepdims=True), 1e-12))
+    energy_db = 10.0 * np.log10(np.mean(mag ** 2, axis=1) / CHROMA_FFT + 1e-12)
+    times = np.arange(len(chroma)) * CHROMA_HOP / sr
+    return chroma, energy_db, times
+
+
+def estimate_beats(y, sr=ANALYSIS_SR, min_bpm=60.0, max_bpm=180.0):
+    """
+    Estimate a constant tempo and the beat times of a signal.
+
+    The onset envelope (spectral flux) is autocorrelated to find the beat
+    period, weighted towards 120 BPM; the phase is the offset whose beat
+    positions collect the most onset energy.
+
+    Returns:
+        tuple: (tempo in BPM, beat times in seconds)
+    """
+    duration = len(y) / sr
+    log_mag = np.log1p(100.0 * _frames(y, ONSET_FFT, ONSET_HOP))
+    onset = np.maximum(np.diff(log_mag, axis=0), 0.0).sum(axis=1)
+    onset -= onset.mean()
+    frame_rate = sr / ONSET_HOP
+
+    n = len(onset)
+    if n < 4:
+        return 120.0, np.arange(0.0, duration, 0.5)
+    spectrum = np.fft.rfft(onset, 2 * n)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+
+    lags = np.arange(int(frame_rate * 60.0 / max_bpm), min(int(frame_rate * 60.0 / min_bpm) + 1, n))
+    if not len(lags):
+        return 120.0, np.arange(0.0, duration, 0.5)
+    bpm = 60.0 * frame_rate / lags
+    prior = np.exp(-0.5 * (np.log2(bpm / 120.0) / 0.9) ** 2)
+    period = lags[np.argmax(autocorr[lags] * prior)]
+
+    usable = (n // period) * period
+    if usable:
+        phase = int(np.argmax(onset[:usable].reshape(-1, period).sum(axis=0)))
+    else:
+        phase = 0
+    beat_length = period / frame_rate
+    # Onset frame i measures the change between STFT frames i and i + 1
+    first_beat = (phase + 1) / frame_rate
+    return 60.0 / beat_length, np.arange(first_beat, duration, beat_length)
+
+
+def chord_templates():
+    """
+    Unit-norm triad templates: 12 major then 12 minor chords.
+
+    Returns:
+        tuple: (templates of shape (24, 12), list of (root, is_minor))
+    """
+    templates = []
+    labels = []
+    for minor, third in ((False, 4), (True, 3)):
+        for root in range(12):
+            template = np.zeros(12)
+            template[[root, (root + third) % 12, (root + 7) % 12]] = 1.0
+            templates.append(template / np.linalg.norm(template))
+            labels.append((root, minor))
+    return np.array(templates), labels
+
+
+def viterbi(log_emissions, self_transition=SELF_TRANSITION):
+    """
+    Most likely state path with a "stay or jump anywhere" transition model.
+
+    Args:
+        log_emissions (np.ndarray): Shape (steps, states)
+        self_transition (float): Probability of keeping the current state
+
+    Returns:
+        np.ndarray: State index per step
+    """
+    steps, states = log_emissions.shape
+    log_stay = np.log(self_transition)
+    log_move = np.log((1.0 - self_transition) / max(states - 1, 1))
+    transitions = np.full((states, states), log_move)
+    np.fill_diagonal(transitions, log_stay)
+
+    score = log_emissions[0].copy()
+    backpointers = np.zeros((steps, states), dtype=np.int32)
+    for t in range(1, steps):
+        candidates = score[:, np.newaxis] + transitions
+        backpointers[t] = np.argmax(candidates, axis=0)
+        score = candidates[backpointers[t], np.arange(states)] + log_emissions[t]
+
+    path = np.empty(steps, dtype=np.int32)
+    path[-1] = int(np.argmax(score))
+    for t in range(steps - 1, 0, -1):
+        path[t - 1] = backpointers[t, path[t]]
+    return path
+
+
+def estimate_tonic(chroma):
+    """Major key tonic (pitch class) best correlated with the song's average chroma."""
+    profile = chroma.mean(axis=0)
+    scores = [np.corrcoef(profile, np.roll(MAJOR_PROFILE, tonic))[0, 1] for tonic in range(12)]
+    return int(np.nanargmax(scores)) if np.any(np.isfinite(scores)) else 0
+
+
+def chord_labels(root, minor, tonic):
+    """Every chord_* vocabulary of the Music.AI schema for a triad (root None means no chord)."""
+    if root is None:
+        labels = {"chord_majmin": "N"}
+        labels.update({f"chord_{k}_{v}": "N" for v in ("jazz", "pop", "nashville") for k in ("complex", "simple", "basic")})
+        return labels
+
+    name = NOTES[root]
+    nashville = NASHVILLE_DEGREES[(root - tonic) % 12] + ("-" if minor else "")
+    jazz = name + ("-" if minor else "")
+    pop = name + ("m" if minor else "")
+    return {
+        "chord_majmin": f"{name}:{'min' if minor else 'maj'}",
+        "chord_complex_jazz": jazz,
+        "chord_simple_jazz": jazz,
+        "chord_basic_jazz": jazz,
+        "chord_complex_pop": pop,
+        "chord_simple_pop": pop,
+        "chord_basic_pop": pop,
+        "chord_complex_nashville": nashville,
+        "chord_simple_nashville": nashville,
+        "chord_basic_nashville": nashville,
+    }
+
+
+def detect_chords(y, sr):
+    """
+    Recognize the chord progression of a signal.
+
+    Chroma frames are averaged per beat, matched against triad templates plus
+    a "no chord" state (forced on silent beats) and decoded with Viterbi.
+
+    Args:
+        y (np.ndarray): Audio, shape (samples,) or (samples, channels)
+        sr (int): Sample rate
+
+    Returns:
+        list: Chord events in the Music.AI *_chords.json schema
+    """
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    if sr != ANALYSIS_SR:
+        import soxr
+        y = soxr.resample(y, sr, ANALYSIS_SR)
+    y = np.asarray(y, dtype=np.float64)
+    duration = len(y) / ANALYSIS_SR
+    if duration <= 0:
+        return []
+
+    chroma, energy_db, frame_times = chroma_features(y)
+    _, beat_times = estimate_beats(y)
+    if not len(beat_times) or beat_times[0] > 0:
+        beat_times = np.concatenate(([0.0], beat_times))
+    beat_bounds = np.append(beat_times, duration)
+
+    # Beat-synchronous chroma and energy
+    beat_of_frame = np.clip(np.searchsorted(beat_times, frame_times, side='right') - 1, 0, len(beat_times) - 1)
+    counts = np.maximum(np.bincount(beat_of_frame, minlength=len(beat_times)), 1)
+    beat_chroma = np.zeros((len(beat_times), 12))
+    np.add.at(beat_chroma, beat_of_frame, chroma)
+    beat_chroma /= counts[:, np.newaxis]
+    beat_energy = np.bincount(beat_of_frame, weights=energy_db, minlength=len(beat_times)) / counts
+
+    templates, labels = chord_templates()
+    norms = np.linalg.norm(beat_chroma, axis=1, keepdims=True)
+    similarity = (beat_chroma / np.maximum(norms, 1e-9)) @ templates.T
+    no_chord = np.where(beat_energy < SILENCE_DB, 1.0, NO_CHORD_SCORE)
+    scores = MATCH_SHARPNESS * np.column_stack([similarity, no_chord])
+    scores[beat_energy < SILENCE_DB, :-1] = -np.inf
+    log_emissions = scores - np.logaddexp.reduce(scores, axis=1, keepdims=True)
+
+    path = viterbi(log_emissions)
+    tonic = estimate_tonic(beat_chroma[path < len(labels)] if np.any(path < len(labels)) else beat_chroma)
+
+    # Downbeat: the beat position (mod BEATS_PER_BAR) where chords change most often
+    changes = np.flatnonzero(np.diff(path)) + 1
+    downbeat = int(np.argmax(np.bincount(changes % BEATS_PER_BAR, minlength=BEATS_PER_BAR))) if len(changes) else 0
+
+    def position(beat):
+        bar, beat_in_bar = divmod(beat - downbeat, BEATS_PER_BAR)
+        return int(bar) + 1, int(beat_in_bar) + 1
+
+    starts = np.concatenate(([0], changes))
+    ends = np.append(changes, len(path))
+    events = []
+    for start, end in zip(starts, ends):
+        state = path[start]
+        root, minor = labels[state] if state < len(labels) else (None, False)
+        start_bar, start_beat = position(start)
+        end_bar, end_beat = position(end)
+        chord_names = chord_labels(root, minor, tonic)
+        event = {
+            "start": round(float(beat_bounds[start]), 2),
+            "end": round(float(beat_bounds[end]), 2),
+            "start_bar": start_bar,
+            "start_beat": start_beat,
+            "end_bar": end_bar,
+            "end_beat": end_beat,
+            "chord_majmin": chord_names.pop("chord_majmin"),
+            "bass": None,
+            "bass_nashville": None,
+        }
+        event.update(chord_names)
+        events.append(event)
+    return events
+
+
+def _detect_to_file(args):
+    """Process-pool worker: detect the chords of one audio file and write the JSON (top level so it pickles)."""
+    audio_file, chords_file = args
+    import soundfile as sf
+
+    data, samplerate = sf.read(audio_file)
+    events = detect_chords(data, samplerate)
+    with open(chords_file, 'w', encoding='utf-8') as f:
+        json.dump(events, f, indent=2)
+    return chords_file, len(data) / samplerate
+
+
+def detect_chords_files(audio_files, output_dir, workers=None, verbose=True):
+    """
+    Write a {name}_chords.json next to each audio file's name in output_dir,
+    analyzing the files in parallel on a process pool.
+
+    Args:
+        audio_files (list): Stems (or full mixes) to analyze
+        output_dir (str): Where the chord tables are written
+        workers (int): Pool size (defaults to AUDIO_WORKERS)
+        verbose (bool): Print progress messages
+
+    Returns:
+        list: (chords file, audio seconds) per input, in input order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        (audio_file, os.path.join(output_dir, f"{os.path.splitext(os.path.basename(audio_file))[0]}_chords.json"))
+        for audio_file in audio_files
+    ]
+    if not jobs:
+        return []
+    workers = max(1, min(workers or AUDIO_WORKERS, len(jobs)))
+    if verbose:
+        print(f"Detecting chords of {len(jobs)} files on {workers} processes...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_detect_to_file, jobs))
+
+
+def process_audio_locally(audio_file_path, output_dir, stem_files=None, verbose=True):
+    """
+    Offline counterpart of main.process_audio_with_music_ai for chord recognition.
+
+    There is no stem separation or lyrics transcription: chords are detected
+    on the given stems (or on the file itself), and an existing lyrics.json in
+    output_dir is picked up as-is.
+
+    Args:
+        audio_file_path (str): Audio file to analyze when no stems are given
+        output_dir (str): Directory to save results
+        stem_files (list): Stems to analyze instead of the full file
+        verbose (bool): Print progress messages
+
+    Returns:
+        dict: Contains 'success' (bool), 'lyrics_file' (str), 'chords_files' (list), 'stem_files' (list),
+              'job_id' (None) and 'message' (str), like process_audio_with_music_ai
+    """
+    try:
+        stem_files = list(stem_files or [])
+        results = detect_chords_files(stem_files or [audio_file_path], output_dir, verbose=verbose)
+        lyrics_file = os.path.join(output_dir, "lyrics.json")
+        return {
+            'success': True,
+            'lyrics_file': lyrics_file if os.path.exists(lyrics_file) else None,
+            'chords_files': [chords_file for chords_file, _ in results],
+            'stem_files': stem_files,
+            'job_id': None,
+            'message': "Chords detected locally"
+        }
+    except Exception as e:
+        if verbose:
+            print(f"Error during local chord detection: {str(e)}")
+        return {
+            'success': False,
+            'job_id': None,
+            'message': str(e)
+        }
+
+
+def benchmark(audio_files, workers=None):
+    """
+    Measure throughput as audio seconds analyzed per CPU second (summed over
+    the pool's processes) and per wall-clock second.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        cpu_start = os.times()
+        wall_start = time.perf_counter()
+        results = detect_chords_files(audio_files, output_dir, workers=workers, verbose=False)
+        wall = time.perf_counter() - wall_start
+        cpu_end = os.times()
+
+    cpu = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system) \
+        + (cpu_end.children_user - cpu_start.children_user) + (cpu_end.children_system - cpu_start.children_system)
+    audio_seconds = sum(seconds for _, seconds in results)
+    print(f"Files:            {len(results)}")
+    print(f"Audio:            {audio_seconds:.1f} s")
+    print(f"Wall time:        {wall:.2f} s ({audio_seconds / wall:.1f} audio-s per s)")
+    print(f"CPU time:         {cpu:.2f} s ({audio_seconds / max(cpu, 1e-9):.1f} audio-s per CPU-s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline chord detection (Music.AI *_chords.json schema)")
+    parser.add_argument("audio_files", nargs="+", help="Stems or mixes to analyze")
+    parser.add_argument("-o", "--output-dir", default=".", help="Where the chord tables are written")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Process pool size")
+    parser.add_argument("--benchmark", action="store_true", help="Report throughput instead of keeping the results")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.audio_files, workers=args.workers)
+    else:
+        for chords_file, seconds in detect_chords_files(args.audio_files, args.output_dir, workers=args.workers):
+            print(f"{chords_file} ({seconds:.1f} s of audio)")
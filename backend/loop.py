@@ -0,0 +1,75 @@
+import numpy as np
+from loaders import load_chords
+
+
+def bar_grid(chords, until=0.0):
+    """
+    Estimate the start time of every bar from the chord events' bar/beat positions.
+
+    Each event gives a (beat number, time) point; bar starts are interpolated
+    between those points and extrapolated with the median beat length outside them.
+
+    Args:
+        chords (list): Chord records (with start_bar / start_beat)
+        until (float): Extend the grid at least up to this time (seconds)
+
+    Returns:
+        np.ndarray: Sorted bar start times in seconds (empty if the table has no bar info)
+    """
+    points = [(c.start_bar, c.start_beat, c.start) for c in chords
+              if c.start_bar is not None and c.start_beat is not None]
+    if len(points) < 2:
+        return np.array([])
+
+    bars, beats, times = (np.array(column, dtype=float) for column in zip(*points))
+    beats_per_bar = max(int(beats.max()), 1)
+    beat_index = (bars - 1) * beats_per_bar + (beats - 1)
+    beat_index, unique = np.unique(beat_index, return_index=True)
+    times = times[unique]
+    if len(beat_index) < 2:
+        return np.array([])
+
+    beat_length = np.median(np.diff(times) / np.diff(beat_index))
+    if not beat_length > 0:
+        return np.array([])
+
+    # Cover the song from 0 s up to `until`, extrapolating at the median tempo
+    first_beat = beat_index[0] - times[0] / beat_length
+    last_beat = beat_index[-1] + max(until - times[-1], 0.0) / beat_length
+    first_bar = int(np.floor(first_beat / beats_per_bar))
+    last_bar = int(np.ceil(last_beat / beats_per_bar)) + 1
+    bar_beats = np.arange(first_bar, last_bar + 1) * beats_per_bar
+
+    grid = np.interp(bar_beats, beat_index, times)
+    before = bar_beats < beat_index[0]
+    after = bar_beats > beat_index[-1]
+    grid[before] = times[0] - (beat_index[0] - bar_beats[before]) * beat_length
+    grid[after] = times[-1] + (bar_beats[after] - beat_index[-1]) * beat_length
+    return np.maximum.accumulate(np.maximum(grid, 0.0))
+
+
+def snap_region_to_bars(start_time, end_time, chords_file):
+    """
+    Widen a region so it starts and ends on bar boundaries.
+
+    Args:
+        start_time (float): Region start in seconds
+        end_time (float): Region end in seconds
+        chords_file (str): Chord JSON with start_bar / start_beat
+
+    Returns:
+        tuple: (start, end) snapped to the bar grid, or unchanged if there is no grid
+    """
+    try:
+        grid = bar_grid(load_chords(chords_file), until=end_time)
+    except (ValueError, IOError) as e:
+        print(f"Error loading bar grid: {e}")
+        return start_time, end_time
+    if len(grid) < 2:
+        return start_time, end_time
+
+    start_idx = max(np.searchsorted(grid, start_time, side='right') - 1, 0)
+    end_idx = min(np.searchsorted(grid, end_time, side='left'), len(grid) - 1)
+    if grid[end_idx] <= grid[start_idx]:
+        end_idx = min(start_idx + 1, len(grid) - 1)
+    return float(grid[start_idx]), float(grid[end_idx])
@@ -1,7 +1,105 @@
-from musicai_sdk import MusicAiClient
 import os
 
-def process_audio_with_music_ai(api_key, workflow_name, mp3_file_path, output_dir, verbose=True):
+def stored_result_path(file_path):
+    """
+    Where a downloaded result is now: a stem may have been compacted to FLAC
+    after download (see storage.py).
+    """
+    if file_path.endswith(".wav") and not os.path.exists(file_path) and os.path.exists(file_path[:-4] + ".flac"):
+        return file_path[:-4] + ".flac"
+    return file_path
+
+
+def classify_result_files(result_files, output_dir):
+    """
+    Sort the files downloaded for a job into lyrics, chords and stems.
+    
+    Args:
+        result_files (iterable): Output names returned by download_job_results
+        output_dir (str): Directory the results were downloaded to
+    
+    Returns:
+        tuple: (lyrics_file, chords_files, stem_files)
+    """
+    lyrics_file = None
+    chords_files = []
+    stem_files = []
+    
+    for file_path in result_files:
+        if "lyrics" in file_path.lower() or "chords" in file_path.lower():
+            file_path = file_path + ".json"
+        elif "stem" in file_path.lower():
+            file_path = file_path + ".wav"
+        
+        file_path = stored_result_path(os.path.join(output_dir, file_path))
+        
+        if os.path.exists(file_path):
+            if "lyrics" in file_path.lower():
+                lyrics_file = file_path
+            elif "chords" in file_path.lower():
+                chords_files.append(file_path)
+            elif "stem" in file_path.lower():
+                stem_files.append(file_path)
+            else:
+                print(f"File is not classified: {file_path}")
+        else:
+            print(f"File does not exist: {file_path}")
+    
+    return lyrics_file, chords_files, stem_files
+
+
+def result_downloads(job, output_dir):
+    """
+    Plan the downloads of a finished job, small JSON outputs (lyrics, chords)
+    before the large audio stems.
+    
+    Args:
+        job (dict): Finished Music.AI job (with its "result" map)
+        output_dir (str): Directory the results are downloaded to
+    
+    Returns:
+        list: (result name, url, destination path), in download order
+    """
+    from urllib.parse import urlparse
+    
+    downloads = []
+    for name, value in (job.get("result") or {}).items():
+        if not isinstance(value, str) or "://" not in value:
+            continue
+        extension = os.path.splitext(urlparse(value).path)[1]
+        downloads.append((name, value, os.path.join(output_dir, f"{name}{extension}")))
+    # Stable sort: JSON first, the rest in the order Music.AI listed them
+    downloads.sort(key=lambda download: not download[2].lower().endswith(".json"))
+    return downloads
+
+
+def download_results_progressively(client, job, output_dir, done=()):
+    """
+    Download a finished job's outputs one at a time (JSON first), yielding
+    each one as soon as it is on disk.
+    
+    Files are written under a temporary name and renamed when complete, so a
+    reader scanning output_dir never sees a partial file.
+    
+    Args:
+        client: Music.AI client
+        job (dict): Finished Music.AI job
+        output_dir (str): Directory to save results
+        done (iterable): Result names already downloaded (skipped if the file exists)
+    
+    Yields:
+        tuple: (result name, file path)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for name, url, destination in result_downloads(job, output_dir):
+        if name in done and os.path.exists(stored_result_path(destination)):
+            continue
+        partial_path = destination + ".part"
+        client.download_file(url, partial_path)
+        os.replace(partial_path, destination)
+        yield name, destination
+
+def process_audio_with_music_ai(api_key, workflow_name, mp3_file_path, output_dir, verbose=True, on_result=None):
     """
     Process audio file with Music.AI SDK and download results.
     
@@ -11,10 +109,15 @@ def process_audio_with_music_ai(api_key, workflow_name, mp3_file_path, output_di
         mp3_file_path (str): Path to the MP3 file
         output_dir (str): Directory to save results
         verbose (bool): Print progress messages
+        on_result (callable): Called with (result name, file path) as each output
+            lands, lyrics and chords first
     
     Returns:
         dict: Contains 'success' (bool), 'lyrics_file' (str), 'chords_files' (list), 'stem_files' (list), 'job_id' (str)
     """
+    # Imported here so the app and worker only pay for the SDK when processing
+    from musicai_sdk import MusicAiClient
+
     try:
         if verbose:
             print("=" * 60)
@@ -73,33 +176,13 @@ def process_audio_with_music_ai(api_key, workflow_name, mp3_file_path, output_di
             # Step 6: Download results
             if verbose:
                 print(f"\nStep 6: Downloading results...")
-            os.makedirs(output_dir, exist_ok=True)
-            result_files = music_ai.download_job_results(job, output_dir)
-            
-            # Find lyrics and chords files
-            lyrics_file = None
-            chords_files = []
-            stem_files = []
+            result_files = []
+            for name, file_path in download_results_progressively(music_ai, job, output_dir):
+                result_files.append(name)
+                if on_result:
+                    on_result(name, file_path)
             
-            for file_path in result_files:
-                if "lyrics" in file_path.lower() or "chords" in file_path.lower():
-                    file_path = file_path + ".json"
-                elif "stem" in file_path.lower():
-                    file_path = file_path + ".wav"
-                
-                file_path = os.path.join(output_dir, file_path)
-                
-                if os.path.exists(file_path):
-                    if "lyrics" in file_path.lower():
-                        lyrics_file = file_path
-                    elif "chords" in file_path.lower():
-                        chords_files.append(file_path)
-                    elif "stem" in file_path.lower():
-                        stem_files.append(file_path)
-                    else:
-                        print(f"File is not classified: {file_path}")
-                else:
-                    print(f"File does not exist: {file_path}")
+            lyrics_file, chords_files, stem_files = classify_result_files(result_files, output_dir)
             
             if verbose:
                 print(f"✓ Results downloaded successfully:")
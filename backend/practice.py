@@ -0,0 +1,95 @@
+import os
+import threading
+import soundfile as sf
+from audio_cache import cache_path
+from dsp import time_stretch_blocks
+
+# (song hash, muted instrument, rate) -> render state shared by every session
+_renders = {}
+_renders_lock = threading.Lock()
+
+
+def scale_synced_data(synced_data, rate):
+    """
+    Scale the timestamps of a synced word list to a playback rate.
+
+    Args:
+        synced_data (list): Output of sync_lyrics_with_chords
+        rate (float): Playback speed (0.5 = half speed)
+
+    Returns:
+        list: A copy with start/end divided by rate
+    """
+    if rate == 1.0:
+        return synced_data
+    return [dict(item, start=item['start'] / rate, end=item['end'] / rate) for item in synced_data]
+
+
+def _render(data, samplerate, rate, state):
+    """Worker thread: stretch block by block, flushing so the partial file stays playable."""
+    partial_file = state['partial_path']
+    try:
+        channels = 1 if data.ndim == 1 else data.shape[1]
+        total = int(round(len(data) / rate))
+        written = 0
+        with sf.SoundFile(partial_file, 'w', samplerate=samplerate, channels=channels, format='WAV', subtype='FLOAT') as f:
+            for block in time_stretch_blocks(data, rate):
+                f.write(block)
+                f.flush()
+                written += len(block)
+                state['progress'] = min(1.0, written / max(total, 1))
+        os.replace(partial_file, state['path'])
+        state['progress'] = 1.0
+        state['done'] = True
+    except Exception as e:
+        print(f"Error rendering practice track: {e}")
+        state['error'] = str(e)
+
+
+def start_practice_render(mix_file, song_hash, muted, rate):
+    """
+    Start (or attach to) the background time-stretch of a minus-one mix.
+
+    The finished track is cached per (song, muted instrument, rate); while it
+    renders, state['partial_path'] already holds a playable WAV of the blocks
+    done so far.
+
+    Args:
+        mix_file (str): Minus-one mix to stretch
+        song_hash (str): Library hash of the song
+        muted (str): Muted instrument
+        rate (float): Playback speed (0.5 = half speed)
+
+    Returns:
+        dict: {'path', 'partial_path', 'progress', 'done', 'error'}
+    """
+    key = f"{song_hash}_{muted}_{int(round(rate * 100))}"
+    output_file = cache_path("practice", key)
+
+    with _renders_lock:
+        state = _renders.get(key)
+        if state and not state['error']:
+            return state
+
+        state = {
+            'path': output_file,
+            'partial_path': f"{output_file}.partial.wav",
+            'progress': 0.0,
+            'done': os.path.exists(output_file),
+            'error': None,
+        }
+        _renders[key] = state
+        if state['done']:
+            state['progress'] = 1.0
+            return state
+
+    # Decode now (the mix file may be overwritten by the next rerun), but
+    # outside the lock so other songs' renders are not held up
+    try:
+        data, samplerate = sf.read(mix_file)
+    except (RuntimeError, OSError) as e:
+        print(f"Error rendering practice track: {e}")
+        state['error'] = str(e)
+        return state
+    threading.Thread(target=_render, args=(data, samplerate, rate, state), daemon=True).start()
+    return state
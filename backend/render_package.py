@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from constants import AUDIO_WORKERS
+from library import scan_song_folder
+from loaders import decode_json
+from utils import get_instruments, get_active_tracks, common_samplerate, mix_audio_files
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title} - {instrument}</title>
+<style>
+    body {{ background: #111; color: #e0e0e0; font-family: sans-serif; margin: 24px; }}
+    audio {{ width: 100%; margin: 12px 0 20px; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p><strong>Playing:</strong> {playing} &nbsp; <strong>Muted for play-along:</strong> {instrument}</p>
+<audio controls preload="metadata" src="{mix}"></audio>
+{lyrics}
+</body>
+</html>
+"""
+
+
+def song_title(folder):
+    """The Music.AI job name of a results folder, or the folder name."""
+    result_file = os.path.join(folder, "result.musicai.json")
+    if os.path.exists(result_file):
+        try:
+            name = decode_json(result_file).get('name')
+            if name:
+                return str(name)
+        except (ValueError, IOError, AttributeError):
+            pass
+    return os.path.basename(os.path.abspath(folder))
+
+
+def render_package(results_folder, output_dir, audition=True, verbose=True):
+    """
+    Render a static play-along package for one song, without Streamlit.
+
+    The package holds, per instrument, the minus-one mix, the chord clips of
+    that instrument's stem and an HTML page with the synced lyrics (chord
+    buttons play the clip files, the page's player drives the highlighting),
+    plus a manifest.json describing all of it. Paths in the manifest and the
+    pages are relative to output_dir, so the folder can be served as-is.
+
+    Args:
+        results_folder (str): A Music.AI results folder (stems, chords, lyrics)
+        output_dir (str): Package folder (created if needed)
+        audition (bool): One representative clip per chord instead of one per occurrence
+        verbose (bool): Print progress messages
+
+    Returns:
+        dict: The manifest, or None if the folder has no usable results
+    """
+    from chordsSync import load_or_sync_all
+    from display import build_synced_lyrics_html
+    from envelopes import compute_song_envelopes, load_envelopes, silent_stems, envelope_for
+    from slice_audio import extract_chord_segments, extract_representative_chords
+    from audio_cache import write_audio_atomic
+
+    scanned = scan_song_folder(results_folder)
+    if not scanned['lyrics_file'] or not scanned['chords_files']:
+        print(f"Skipping {results_folder}: no lyrics or chord files.")
+        return None
+
+    title = song_title(results_folder)
+    os.makedirs(output_dir, exist_ok=True)
+    if verbose:
+        print(f"Rendering '{title}' into {output_dir}...")
+
+    # Activity envelopes: silent stems are neither offered nor mixed
+    envelopes = {}
+    if scanned['stem_files']:
+        envelopes_file = os.path.join(output_dir, "envelopes.npz")
+        compute_song_envelopes(scanned['stem_files'], envelopes_file)
+        envelopes = load_envelopes(envelopes_file)
+    instruments = get_instruments(
+        scanned['chords_files'], scanned['stem_files'],
+        silent_stems=silent_stems(envelopes, scanned['stem_files'])
+    )
+    if not instruments:
+        return None
+
+    synced_file = os.path.join(output_dir, "synced.json")
+    synced_all = load_or_sync_all(
+        scanned['lyrics_file'],
+        {inst: files['chords'] for inst, files in instruments.items()},
+        synced_file
+    )
+    shutil.copyfile(scanned['lyrics_file'], os.path.join(output_dir, "lyrics.json"))
+
+    samplerate = common_samplerate(scanned['stem_files'])
+    manifest = {
+        'title': title,
+        'source': os.path.abspath(results_folder),
+        'rendered_at': time.time(),
+        'samplerate': samplerate,
+        'lyrics': "lyrics.json",
+        'synced': "synced.json",
+        'instruments': {}
+    }
+
+    for inst, files in instruments.items():
+        entry = {'chords': f"chords/{os.path.basename(files['chords'])}", 'mix': None, 'page': None, 'clips': {}}
+        os.makedirs(os.path.join(output_dir, "chords"), exist_ok=True)
+        shutil.copyfile(files['chords'], os.path.join(output_dir, entry['chords']))
+
+        # Minus-one mix
+        active_tracks, active_track_names = get_active_tracks(instruments, inst)
+        if active_tracks:
+            mix = f"mixes/minus_{inst}.wav"
+            os.makedirs(os.path.join(output_dir, "mixes"), exist_ok=True)
+            if mix_audio_files(active_tracks, os.path.join(output_dir, mix)):
+                entry['mix'] = mix
+
+        # Chord clips of the muted instrument, as files next to the page
+        show_chords = inst.lower() != "vocals"
+        if show_chords and files['audio']:
+            if audition:
+                sliced, clip_rate = extract_representative_chords(
+                    files['audio'], files['chords'], target_samplerate=samplerate,
+                    envelope=envelope_for(envelopes, files['audio'])
+                )
+            else:
+                sliced, clip_rate = extract_chord_segments(files['audio'], files['chords'], target_samplerate=samplerate)
+            clips_dir = os.path.join(output_dir, "clips", inst)
+            os.makedirs(clips_dir, exist_ok=True)
+            for key, segment in (sliced or {}).items():
+                if len(segment):
+                    write_audio_atomic(os.path.join(clips_dir, f"{key}.wav"), segment, clip_rate, subtype='PCM_16')
+                    entry['clips'][key] = f"clips/{inst}/{key}.wav"
+
+        # Synced lyrics page
+        lyrics_html = build_synced_lyrics_html(
+            synced_all.get(inst), None, None, show_chords=show_chords, clip_urls=entry['clips']
+        )
+        page = f"{inst}.html"
+        with open(os.path.join(output_dir, page), 'w', encoding='utf-8') as f:
+            f.write(PAGE_TEMPLATE.format(
+                title=html.escape(title),
+                instrument=html.escape(inst.title()),
+                playing=html.escape(" + ".join(active_track_names) or "-"),
+                mix=html.escape(entry['mix'] or "", quote=True),
+                lyrics=lyrics_html
+            ))
+        entry['page'] = page
+        manifest['instruments'][inst] = entry
+
+    with open(os.path.join(output_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _render_one(args):
+    """Process-pool worker (top level so it pickles)."""
+    results_folder, output_dir, audition = args
+    try:
+        manifest = render_package(results_folder, output_dir, audition=audition)
+        return results_folder, (output_dir if manifest else None), None
+    except Exception as e:
+        return results_folder, None, str(e)
+
+
+def package_name(folder):
+    """
+    Name of a song's package folder: the results folder name plus a short hash
+    of its path, so songs whose folders share a name do not overwrite each other.
+    """
+    folder = os.path.abspath(folder)
+    return f"{os.path.basename(folder)}_{hashlib.sha1(folder.encode()).hexdigest()[:8]}"
+
+
+def render_catalog(folders, output_root, workers=None, audition=True):
+    """
+    Render the packages of many songs in parallel on a process pool (one song
+    per task; each one still decodes its own stems on its audio thread pool).
+
+    Args:
+        folders (list): Results folders
+        output_root (str): Every package goes to output_root/<package_name(folder)>
+        workers (int): Pool size (defaults to AUDIO_WORKERS)
+        audition (bool): See render_package
+
+    Returns:
+        list: (results folder, package folder or None, error or None) per song
+    """
+    jobs = [
+        (folder, os.path.join(output_root, package_name(folder)), audition)
+        for folder in folders
+    ]
+    if not jobs:
+        return []
+    with ProcessPoolExecutor(max_workers=max(1, min(workers or AUDIO_WORKERS, len(jobs)))) as pool:
+        return list(pool.map(_render_one, jobs))
+
+
+def find_song_folders(root):
+    """Every folder under root that looks like a results folder (has lyrics.json)."""
+    return sorted(
+        dirpath for dirpath, _, filenames in os.walk(root)
+        if "lyrics.json" in filenames and "manifest.json" not in filenames
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render static play-along packages from Music.AI results folders")
+    parser.add_argument("folders", nargs="*", help="Results folders to render")
+    parser.add_argument("--catalog", default=None, help="Render every results folder found under this directory")
+    parser.add_argument("-o", "--output-dir", default="packages", help="Where the packages are written")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Songs rendered in parallel")
+    parser.add_argument("--all-occurrences", action="store_true", help="One clip per chord occurrence instead of per chord")
+    args = parser.parse_args()
+
+    folders = list(args.folders)
+    if args.catalog:
+        folders += find_song_folders(args.catalog)
+    if not folders:
+        parser.error("no results folders given")
+
+    started = time.perf_counter()
+    results = render_catalog(folders, args.output_dir, workers=args.workers, audition=not args.all_occurrences)
+    for folder, package, error in results:
+        print(f"{folder} -> {package or 'FAILED'}" + (f" ({error})" if error else ""))
+    print(f"Rendered {sum(1 for _, package, _ in results if package)}/{len(results)} songs in {time.perf_counter() - started:.1f} s")
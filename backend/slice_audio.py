@@ -1,11 +1,20 @@
 import soundfile as sf
 import json
 import os
+import numpy as np
+from audio_cache import read_resampled
+from loaders import load_chords
 
-def extract_chord_segments(audio_filename, json_filename):
+def sanitize_chord_name(chord_name):
+    """Turn a chord label (e.g. "C#:min") into the key used for its audio clip."""
+    return chord_name.replace(":", "").replace("#", "sharp")
+
+def extract_chord_segments(audio_filename, json_filename, target_samplerate=None):
     """
     Loads an audio file and a JSON chord map, slices the audio, 
     and returns a dictionary of audio segments.
+    If target_samplerate is given, the audio is reconciled to that rate first
+    (resampled copies are cached on disk).
     
     Returns:
         dict: A dictionary where keys are chord names (e.g., "C_0") and values are numpy arrays (audio segments).
@@ -15,7 +24,7 @@ def extract_chord_segments(audio_filename, json_filename):
     # 1. Load the audio file
     print(f"Loading {audio_filename}...")
     try:
-        data, samplerate = sf.read(audio_filename)
+        data, samplerate = read_resampled(audio_filename, target_samplerate)
     except FileNotFoundError:
         print(f"Error: Could not find '{audio_filename}'.")
         return None, None
@@ -23,8 +32,7 @@ def extract_chord_segments(audio_filename, json_filename):
     # 2. Load the chords JSON
     print(f"Loading {json_filename}...")
     try:
-        with open(json_filename, 'r') as f:
-            piano_chords = json.load(f)
+        piano_chords = load_chords(json_filename)
     except FileNotFoundError:
         print(f"Error: Could not find '{json_filename}'.")
         return None, None
@@ -37,14 +45,14 @@ def extract_chord_segments(audio_filename, json_filename):
     # 3. Process and slice
     for chord in piano_chords:
         # Convert seconds to sample indices
-        start_sample = int(chord["start"] * samplerate)
-        end_sample = int(chord["end"] * samplerate)
+        start_sample = int(chord.start * samplerate)
+        end_sample = int(chord.end * samplerate)
         
         # Extract the segment (Slicing the numpy array)
         segment = data[start_sample:end_sample]
         
         # Sanitize filename
-        chord_name_raw = chord.get("chord_simple_pop", "Unknown").replace(":", "").replace("#", "sharp")
+        chord_name_raw = sanitize_chord_name(chord.chord)
 
         # Handle duplicates by appending a number (C_sharp_0, C_sharp_1, etc.)
         chord_number = chord_instances.get(chord_name_raw, 0)
@@ -57,4 +65,152 @@ def extract_chord_segments(audio_filename, json_filename):
         chords[unique_chord_name] = segment
 
     print(f"Successfully processed {len(chords)} segments.")
-    return chords, samplerate
\ No newline at end of file
+    return chords, samplerate
+
+
+def score_chord_occurrences(data, samplerate, starts, ends, frame_size=2048, max_duration=3.0):
+    """
+    Scores every chord occurrence as an audition candidate, all at once.
+
+    Longer clips (up to max_duration) with a steady, non-silent level score
+    higher. Frame RMS is computed once for the whole stem and each occurrence
+    reads its mean/spread from prefix sums, so the cost does not grow with
+    clip length.
+
+    Args:
+        data (np.ndarray): Audio samples (mono or multi-channel).
+        samplerate (int): Sample rate of data.
+        starts (np.ndarray): Occurrence start times in seconds.
+        ends (np.ndarray): Occurrence end times in seconds.
+        frame_size (int): Samples per RMS frame.
+        max_duration (float): Duration after which longer clips stop scoring higher.
+
+    Returns:
+        np.ndarray: One score per occurrence.
+    """
+    mono = data.mean(axis=1) if data.ndim > 1 else data
+    n_frames = max(1, len(mono) // frame_size)
+    frames = np.resize(mono, n_frames * frame_size).reshape(n_frames, frame_size)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return score_from_envelope(rms, samplerate / frame_size, starts, ends, max_duration)
+
+
+def score_from_envelope(rms, frame_rate, starts, ends, max_duration=3.0):
+    """
+    Score chord occurrences from a precomputed RMS envelope (see
+    score_chord_occurrences), without touching the audio.
+
+    Args:
+        rms (np.ndarray): RMS per frame.
+        frame_rate (float): Envelope frames per second.
+        starts (np.ndarray): Occurrence start times in seconds.
+        ends (np.ndarray): Occurrence end times in seconds.
+        max_duration (float): Duration after which longer clips stop scoring higher.
+
+    Returns:
+        np.ndarray: One score per occurrence.
+    """
+    rms = np.asarray(rms, dtype=float) if len(rms) else np.zeros(1)
+    n_frames = len(rms)
+    sum_rms = np.concatenate(([0.0], np.cumsum(rms)))
+    sum_sq = np.concatenate(([0.0], np.cumsum(rms ** 2)))
+
+    first = np.clip(np.floor(starts * frame_rate), 0, n_frames - 1).astype(int)
+    last = np.clip(np.floor(ends * frame_rate), first + 1, n_frames).astype(int)
+    count = last - first
+
+    mean = (sum_rms[last] - sum_rms[first]) / count
+    variance = np.maximum((sum_sq[last] - sum_sq[first]) / count - mean ** 2, 0.0)
+    stability = 1.0 / (1.0 + np.sqrt(variance) / (mean + 1e-9))
+
+    duration = np.minimum(np.maximum(ends - starts, 0.0), max_duration)
+    return duration * mean * stability
+
+
+def extract_representative_chords(audio_filename, json_filename, target_samplerate=None, envelope=None):
+    """
+    Like extract_chord_segments, but keeps a single clip per distinct chord
+    (the best scoring occurrence) instead of one per occurrence.
+
+    With the stem's activity envelope (see envelopes.py) the occurrences are
+    scored from it and only the selected clips are read from the file.
+
+    Returns:
+        dict: Keys are sanitized chord names (e.g. "Csharp") and values are numpy arrays.
+        int: The sample rate of the audio file.
+    """
+    if envelope is not None:
+        return _representative_chords_from_envelope(audio_filename, json_filename, target_samplerate, envelope)
+
+    print(f"Loading {audio_filename}...")
+    try:
+        data, samplerate = read_resampled(audio_filename, target_samplerate)
+    except FileNotFoundError:
+        print(f"Error: Could not find '{audio_filename}'.")
+        return None, None
+
+    print(f"Loading {json_filename}...")
+    try:
+        chords_data = load_chords(json_filename)
+    except FileNotFoundError:
+        print(f"Error: Could not find '{json_filename}'.")
+        return None, None
+
+    chords_data = [c for c in chords_data if c.chord != "N"]
+    if not chords_data:
+        return {}, samplerate
+
+    starts = np.array([c.start for c in chords_data], dtype=float)
+    ends = np.array([c.end for c in chords_data], dtype=float)
+    labels, best = _best_occurrences(chords_data, score_chord_occurrences(data, samplerate, starts, ends))
+
+    chords = {}
+    for idx in best:
+        start_sample = int(starts[idx] * samplerate)
+        end_sample = int(ends[idx] * samplerate)
+        chords[str(labels[idx])] = data[start_sample:end_sample]
+
+    print(f"Selected {len(chords)} representative clips out of {len(chords_data)} occurrences.")
+    return chords, samplerate
+
+
+def _best_occurrences(chords_data, scores):
+    """Index of the best scoring occurrence of every distinct chord label."""
+    labels = np.array([sanitize_chord_name(c.chord) for c in chords_data])
+    # Sort by label, best score first, and keep the first row of every label
+    _, label_ids = np.unique(labels, return_inverse=True)
+    order = np.lexsort((-scores, label_ids))
+    return labels, order[np.r_[True, label_ids[order][1:] != label_ids[order][:-1]]]
+
+
+def _representative_chords_from_envelope(audio_filename, json_filename, target_samplerate, envelope):
+    from audio_io import read_frames
+    from envelopes import ENVELOPE_HOP
+
+    print(f"Loading {json_filename}...")
+    try:
+        chords_data = [c for c in load_chords(json_filename) if c.chord != "N"]
+        samplerate = sf.info(audio_filename).samplerate
+    except (FileNotFoundError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return None, None
+
+    output_rate = target_samplerate or samplerate
+    if not chords_data:
+        return {}, output_rate
+
+    starts = np.array([c.start for c in chords_data], dtype=float)
+    ends = np.array([c.end for c in chords_data], dtype=float)
+    labels, best = _best_occurrences(chords_data, score_from_envelope(envelope, 1.0 / ENVELOPE_HOP, starts, ends))
+
+    chords = {}
+    for idx in best:
+        segment, _ = read_frames(audio_filename, int(starts[idx] * samplerate), int(ends[idx] * samplerate))
+        if output_rate != samplerate and len(segment):
+            import soxr
+            segment = soxr.resample(segment, samplerate, output_rate)
+        chords[str(labels[idx])] = segment
+
+    print(f"Selected {len(chords)} representative clips out of {len(chords_data)} occurrences.")
+    return chords, output_rate
+
@@ -0,0 +1,335 @@
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from constants import CACHE_DIR, HOT_MIN_PLAYS, HOT_SONGS, LIBRARY_DB, STEM_STORAGE
+from audio_cache import decoded_path, read_audio
+
+# storage option -> (soundfile container, file extension)
+STEM_FORMATS = {
+    "flac": ("FLAC", ".flac"),
+    "flac24": ("FLAC", ".flac"),
+    "flac16": ("FLAC", ".flac"),
+    "pcm16": ("WAV", ".wav"),
+}
+# Sample formats FLAC holds bit-exact (8-bit stems are widened to 16 bits)
+LOSSLESS_SUBTYPES = {"PCM_S8": "PCM_16", "PCM_U8": "PCM_16", "PCM_16": "PCM_16", "PCM_24": "PCM_24"}
+FRAMES_PER_BLOCK = 1 << 18
+
+
+def _compact_subtype(storage, subtype):
+    """Sample format of a compacted stem, or None if the stem is kept as it is."""
+    if storage == "flac":
+        # Lossless only: float and 32-bit stems have no exact FLAC form
+        return LOSSLESS_SUBTYPES.get(subtype)
+    if storage in ("pcm16", "flac16"):
+        return "PCM_16"
+    # flac24: integer stems stay bit-exact, float stems are quantized to 24 bits
+    return "PCM_16" if subtype in ("PCM_S8", "PCM_U8", "PCM_16") else "PCM_24"
+
+
+def _same_audio(file_a, file_b):
+    """Whether two audio files decode to bit-identical frames."""
+    import numpy as np
+    from itertools import zip_longest
+    from audio_io import read_blocks
+
+    blocks = zip_longest(read_blocks(file_a, FRAMES_PER_BLOCK), read_blocks(file_b, FRAMES_PER_BLOCK))
+    return all(a is not None and b is not None and np.array_equal(a, b) for a, b in blocks)
+
+
+def compact_stem(stem_file, storage=STEM_STORAGE):
+    """
+    Rewrite one stem in a compact storage format, streaming block by block.
+    The new file is moved into place before the original is removed, so the
+    stem is readable at every moment.
+
+    The original is only replaced when nothing is lost beyond what the format
+    promises: "flac" rewrites are read back and must be bit-exact, and no
+    integer format may clip a float stem that peaks at or above 1.0.
+
+    Args:
+        stem_file (str): Path to the stem
+        storage (str): "flac" (lossless), "flac24", "flac16" or "pcm16"
+
+    Returns:
+        str: Path of the stored stem (unchanged if it already was compact, has
+             no safe compact form, or the rewrite failed)
+    """
+    import numpy as np
+    import soundfile as sf
+    from audio_io import read_blocks
+
+    if storage not in STEM_FORMATS:
+        print(f"Error: Unknown stem storage '{storage}' (expected one of {', '.join(STEM_FORMATS)}).")
+        return stem_file
+    container, extension = STEM_FORMATS[storage]
+
+    try:
+        info = sf.info(stem_file)
+    except (RuntimeError, OSError) as e:
+        print(f"Error: Could not read '{stem_file}': {e}")
+        return stem_file
+    subtype = _compact_subtype(storage, info.subtype)
+    if subtype is None or (info.format == container and info.subtype == subtype):
+        return stem_file
+
+    target = os.path.splitext(stem_file)[0] + extension
+    temp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        peak = 0.0
+        with sf.SoundFile(temp_path, 'w', samplerate=info.samplerate, channels=info.channels,
+                          format=container, subtype=subtype) as out:
+            for block in read_blocks(stem_file, blocksize=FRAMES_PER_BLOCK):
+                peak = max(peak, float(np.abs(block).max()))
+                out.write(block)
+        if peak >= 1.0:
+            reason = f"its peak ({peak:.2f}) would clip"
+        elif storage == "flac" and not _same_audio(stem_file, temp_path):
+            reason = "the FLAC copy is not bit-exact"
+        else:
+            reason = None
+        if reason:
+            print(f"Keeping '{stem_file}' as it is: {reason}.")
+            os.remove(temp_path)
+            return stem_file
+        os.replace(temp_path, target)
+    except (RuntimeError, OSError) as e:
+        print(f"Error: Could not compact '{stem_file}': {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return stem_file
+
+    if target != stem_file:
+        try:
+            os.remove(stem_file)
+        except FileNotFoundError:
+            pass
+    return target
+
+
+def compact_stems(stem_files, storage=STEM_STORAGE):
+    """
+    Compact the stems of a song in parallel on the audio pool.
+
+    Returns:
+        list: Paths of the stored stems, sorted like scan_song_folder lists them
+    """
+    from audio_io import map_ordered
+
+    return sorted(map_ordered(lambda stem: compact_stem(stem, storage), stem_files))
+
+
+def build_decoded(stem_file):
+    """
+    Write the decoded copy of a stem (raw float32 frames, memory-mapped by
+    readers through audio_cache.load_decoded).
+
+    Returns:
+        str: Path of the decoded copy
+    """
+    import numpy as np
+    import soundfile as sf
+
+    path = decoded_path(stem_file)
+    if os.path.exists(path):
+        return path
+    data, _ = sf.read(stem_file, dtype='float32')
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        np.save(f, data)
+    os.replace(temp_path, path)
+    return path
+
+
+def hot_songs(conn, limit=HOT_SONGS, min_plays=HOT_MIN_PLAYS):
+    """The most played songs of the library (at least min_plays plays each)."""
+    rows = conn.execute(
+        "SELECT * FROM songs WHERE plays >= ? ORDER BY plays DESC, last_played_at DESC LIMIT ?",
+        (max(1, min_plays), max(0, limit))
+    )
+    return [dict(row) for row in rows]
+
+
+def apply_storage_policy(db_path=LIBRARY_DB, limit=HOT_SONGS, min_plays=HOT_MIN_PLAYS, verbose=False):
+    """
+    Hot/cold stem storage driven by play counts: the stems of hot songs get a
+    decoded copy, so mixing and slicing them costs no decoding; the decoded
+    copies of every other song (and of stems rewritten since) are dropped and
+    those songs are read from their compact stems.
+
+    Opens its own library connection, so it can run on the audio pool.
+
+    Returns:
+        dict: {'hot': [folders], 'built': int, 'dropped': int}
+    """
+    import json
+    from library import connect
+
+    conn = connect(db_path)
+    try:
+        songs = hot_songs(conn, limit, min_plays)
+    finally:
+        conn.close()
+
+    wanted = set()
+    built = 0
+    for song in songs:
+        for stem in json.loads(song['stems']):
+            if not os.path.exists(stem):
+                continue
+            path = decoded_path(stem)
+            if not os.path.exists(path):
+                try:
+                    build_decoded(stem)
+                    built += 1
+                except (RuntimeError, OSError) as e:
+                    print(f"Error: Could not decode '{stem}': {e}")
+                    continue
+            wanted.add(os.path.abspath(path))
+
+    dropped = 0
+    decoded_dir = os.path.join(CACHE_DIR, "decoded")
+    for name in os.listdir(decoded_dir) if os.path.isdir(decoded_dir) else []:
+        path = os.path.abspath(os.path.join(decoded_dir, name))
+        # In-progress writes of other threads/processes are left alone
+        if name.endswith(".tmp") or path in wanted:
+            continue
+        try:
+            os.remove(path)
+            dropped += 1
+        except OSError:
+            # Still memory-mapped somewhere (Windows); dropped on a later pass
+            pass
+
+    if verbose:
+        print(f"Hot songs: {len(songs)}, decoded copies built: {built}, dropped: {dropped}")
+    return {'hot': [song['folder'] for song in songs], 'built': built, 'dropped': dropped}
+
+
+def folder_stem_bytes(stem_files):
+    """Total size on disk of a list of stems."""
+    return sum(os.path.getsize(stem) for stem in stem_files if os.path.exists(stem))
+
+
+def _timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark(stem_files, slices=50, slice_seconds=2.0, seed=0):
+    """
+    Compare stem storage variants on copies of a song's stems: disk footprint,
+    full reads (what mixing does) and random short reads (what slicing and
+    region mixing do). Timings are the best of three warm runs.
+
+    Args:
+        stem_files (list): Stems of one song
+        slices (int): Random reads per stem
+        slice_seconds (float): Length of each random read
+
+    Returns:
+        dict: {variant: {'bytes', 'full_s', 'slices_s'}}
+    """
+    import numpy as np
+    import soundfile as sf
+    from audio_io import read_frames
+
+    rng = np.random.default_rng(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        variants = {}
+        for storage in ("source", "pcm16", "flac", "flac24", "flac16"):
+            folder = os.path.join(workdir, storage)
+            os.makedirs(folder)
+            copies = [shutil.copy(stem, folder) for stem in stem_files]
+            variants[storage] = copies if storage == "source" else [compact_stem(stem, storage) for stem in copies]
+        variants["flac+decoded"] = variants["flac"]
+
+        for variant, files in variants.items():
+            if variant == "flac+decoded":
+                for stem in files:
+                    build_decoded(stem)
+            reads = []
+            for stem in files:
+                info = sf.info(stem)
+                length = int(slice_seconds * info.samplerate)
+                starts = rng.integers(0, max(1, info.frames - length), size=slices)
+                reads.append((stem, [(int(start), int(start) + length) for start in starts]))
+
+            def full_reads():
+                for stem in files:
+                    np.asarray(read_audio(stem)[0]).sum()
+
+            def slice_reads():
+                for stem, ranges in reads:
+                    for start, stop in ranges:
+                        np.asarray(read_frames(stem, start, stop)[0]).sum()
+
+            results[variant] = {
+                'bytes': folder_stem_bytes(files) + (
+                    sum(os.path.getsize(decoded_path(stem)) for stem in files) if variant == "flac+decoded" else 0
+                ),
+                'full_s': _timed(full_reads),
+                'slices_s': _timed(slice_reads),
+            }
+            if variant == "flac+decoded":
+                for stem in files:
+                    os.remove(decoded_path(stem))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact stem storage and hot/cold decoded copies")
+    parser.add_argument("folders", nargs="*", help="Results folders to compact (and re-index)")
+    parser.add_argument("--catalog", default=None, help="Compact every results folder found under this directory")
+    parser.add_argument("--format", default=STEM_STORAGE or "flac", choices=sorted(STEM_FORMATS), help="Storage format")
+    parser.add_argument("--policy", action="store_true", help="Apply the hot/cold policy to the library")
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark storage variants on the folders instead")
+    args = parser.parse_args()
+
+    folders = list(args.folders)
+    if args.catalog:
+        from render_package import find_song_folders
+        folders += find_song_folders(args.catalog)
+    if not folders and not args.policy:
+        parser.error("no results folders given")
+
+    from library import connect, index_song, scan_song_folder
+
+    if args.benchmark:
+        for folder in folders:
+            stems = scan_song_folder(folder)['stem_files']
+            if not stems:
+                continue
+            print(f"\n{folder} ({len(stems)} stems)")
+            print(f"{'variant':<16}{'MB':>10}{'ratio':>8}{'full read ms':>15}{'slices ms':>12}")
+            results = benchmark(stems)
+            source_bytes = results['source']['bytes']
+            for variant, result in results.items():
+                print(f"{variant:<16}{result['bytes'] / 1e6:>10.1f}{source_bytes / max(1, result['bytes']):>8.2f}"
+                      f"{result['full_s'] * 1000:>15.1f}{result['slices_s'] * 1000:>12.1f}")
+    else:
+        conn = connect()
+        total_before = total_after = 0
+        for folder in folders:
+            stems = scan_song_folder(folder)['stem_files']
+            before = folder_stem_bytes(stems)
+            after = folder_stem_bytes(compact_stems(stems, args.format))
+            index_song(conn, folder)
+            total_before += before
+            total_after += after
+            print(f"{folder}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+        if folders:
+            print(f"Stems: {total_before / 1e6:.1f} MB -> {total_after / 1e6:.1f} MB "
+                  f"({total_before / max(1, total_after):.2f}x smaller)")
+        conn.close()
+        if args.policy:
+            apply_storage_policy(verbose=True)
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from audio_cache import cache_dir, read_audio, write_audio_atomic, write_json_atomic
+from constants import AUDIO_WORKERS
+from utils import get_active_tracks, mix_audio_files
+
+NOTES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+FLATS = {"Db": "C#", "Eb": "D#", "Fb": "E", "Gb": "F#", "Ab": "G#", "Bb": "A#", "Cb": "B"}
+
+NOTE_PATTERN = re.compile(r"^([A-G][#b]?)(.*)$")
+SLASH_PATTERN = re.compile(r"/([A-G][#b]?)")
+
+
+def transpose_note(note, semitones):
+    """Transpose a single note name (e.g. "D#", "Bb"), spelling the result with sharps."""
+    note = FLATS.get(note, note)
+    if note not in NOTES:
+        return note
+    return NOTES[(NOTES.index(note) + semitones) % 12]
+
+
+def transpose_chord_label(label, semitones):
+    """
+    Transpose a chord label of any absolute vocabulary ("D#:maj", "Cm7", "C/E").
+
+    "N", Nashville numbers and anything else without a note root are returned
+    unchanged, since they do not depend on the key.
+    """
+    if not isinstance(label, str) or semitones % 12 == 0:
+        return label
+    match = NOTE_PATTERN.match(label)
+    if not match:
+        return label
+    root, rest = match.groups()
+    if FLATS.get(root, root) not in NOTES:
+        return label
+    rest = SLASH_PATTERN.sub(lambda m: "/" + transpose_note(m.group(1), semitones), rest)
+    return transpose_note(root, semitones) + rest
+
+
+def transpose_chords(chords_data, semitones):
+    """
+    Transpose every chord_* vocabulary (and the bass note) of a chord table.
+
+    Args:
+        chords_data (list): Chords data from JSON
+        semitones (int): Shift amount
+
+    Returns:
+        list: A transposed copy of chords_data
+    """
+    transposed = []
+    for chord_info in chords_data:
+        chord_info = dict(chord_info)
+        for key, value in chord_info.items():
+            if key.startswith("chord_") or key == "bass":
+                chord_info[key] = transpose_chord_label(value, semitones)
+        transposed.append(chord_info)
+    return transposed
+
+
+def _render_shifted_stem(args):
+    """Process-pool worker: pitch shift one stem into the cache (top level so it pickles)."""
+    source, destination, semitones = args
+    if os.path.exists(destination):
+        return destination
+
+    from dsp import pitch_shift
+
+    data, samplerate = read_audio(source)
+    write_audio_atomic(destination, pitch_shift(data, samplerate, semitones), samplerate)
+    return destination
+
+
+def _shifted_stem(folder, stem):
+    """Cache path of a pitch-shifted stem (always a float WAV, whatever the source format)."""
+    return os.path.join(folder, os.path.splitext(os.path.basename(stem))[0] + ".wav")
+
+
+def _read_marker(result_file):
+    try:
+        with open(result_file, 'r') as f:
+            marker = json.load(f)
+        return marker if isinstance(marker, dict) else {}
+    except (ValueError, IOError):
+        return {}
+
+
+def transpose_song(song, semitones, verbose=True):
+    """
+    Render a transposed copy of a song: transposed chord tables, pitch-shifted
+    stems and one minus-one mix per instrument.
+
+    The result is cached per (song hash, semitones) under CACHE_DIR, so only the
+    first request pays for the rendering. Stems are shifted in parallel on a
+    process pool.
+
+    Args:
+        song (dict): Song row from the library
+        semitones (int): Shift amount
+        verbose (bool): Print progress messages
+
+    Returns:
+        tuple: (folder of the transposed song, a regular results folder;
+                {instrument: minus-one mix path})
+    """
+    folder = cache_dir("transposed", f"{song['hash']}_{semitones:+d}")
+    mixes_dir = os.path.join(folder, "mixes")
+    os.makedirs(mixes_dir, exist_ok=True)
+
+    # Chord tables (all vocabularies) and lyrics
+    instruments = {}
+    for inst, files in song['instruments'].items():
+        chords_file = os.path.join(folder, os.path.basename(files['chords']))
+        if not os.path.exists(chords_file):
+            with open(files['chords'], 'r') as f:
+                chords_data = json.load(f)
+            # Other sessions may open the same copy: never let them read a partial table
+            write_json_atomic(chords_file, transpose_chords(chords_data, semitones))
+        audio_file = _shifted_stem(folder, files['audio']) if files['audio'] else None
+        instruments[inst] = {'chords': chords_file, 'audio': audio_file}
+
+    lyrics_file = os.path.join(folder, "lyrics.json")
+    if song['lyrics_file'] and not os.path.exists(lyrics_file):
+        temp_file = f"{lyrics_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(song['lyrics_file'], temp_file)
+        os.replace(temp_file, lyrics_file)
+
+    # Marks the folder as a render of the source song (see library.index_song);
+    # rewritten for copies rendered before the marker existed
+    result_file = os.path.join(folder, "result.musicai.json")
+    if not os.path.exists(result_file) or 'transposed_from' not in _read_marker(result_file):
+        write_json_atomic(result_file, {"name": f"{song['title']} ({semitones:+d} st)", "transposed_from": song['folder']})
+
+    # Pitch-shift every stem in parallel (each one is CPU bound)
+    jobs = [
+        (stem, _shifted_stem(folder, stem), semitones)
+        for stem in song['stems']
+        if not os.path.exists(_shifted_stem(folder, stem))
+    ]
+    if jobs:
+        if verbose:
+            print(f"Pitch shifting {len(jobs)} stems by {semitones:+d} semitones...")
+        with ProcessPoolExecutor(max_workers=max(1, min(AUDIO_WORKERS, len(jobs)))) as pool:
+            list(pool.map(_render_shifted_stem, jobs))
+
+    # Minus-one mixes, so serving the transposed song needs no mixing at all
+    mixes = {}
+    for inst in instruments:
+        mix_file = os.path.join(mixes_dir, f"minus_{inst}.wav")
+        active_tracks, _ = get_active_tracks(instruments, inst)
+        if active_tracks and not os.path.exists(mix_file):
+            temp_file = f"{mix_file}.{os.getpid()}.tmp.wav"
+            if mix_audio_files(active_tracks, temp_file):
+                os.replace(temp_file, mix_file)
+        if os.path.exists(mix_file):
+            mixes[inst] = mix_file
+
+    return folder, mixes
@@ -1,7 +1,18 @@
-import json
 import os
+from loaders import load_chords
 
-def get_instruments(chords_files, stem_files):
+def instrument_name(file_path):
+    """
+    Guess the instrument type from a chord or stem file name.
+    """
+    filename_lower = file_path.lower()
+    for inst in ("guitar", "piano", "vocals", "bass", "drums"):
+        if inst in filename_lower:
+            return inst
+    # Try to extract instrument from filename
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def get_instruments(chords_files, stem_files, silent_stems=None):
     """
     Scans a list of chord files and audio stems, and returns a dictionary mapping
     instrument types (e.g., 'guitar', 'piano', 'voice') to their chord and audio files.
@@ -9,67 +20,37 @@ def get_instruments(chords_files, stem_files):
     Args:
         chords_files (list): List of file paths to JSON chord files.
         stem_files (list): List of file paths to audio stem files.
+        silent_stems (set): Stems known to be (near) silent; their instruments
+            are left out unless that would leave no instrument at all.
 
     Returns:
         dict: {instrument_type: {'chords': chord_file, 'audio': audio_file}}
     """
     instruments = {}
 
-    # 1. Find all valid chords files (vocals always included, others need > 1 event OR are the only instrument)
+    # Parse every chord file once (typed loader, only the fields we need)
+    event_counts = {}
     for file_path in chords_files:
         if not os.path.exists(file_path):
             continue
         try:
-            with open(file_path, 'r') as f:
-                chords_data = json.load(f)
-                if isinstance(chords_data, list):
-                    filename_lower = file_path.lower()
-                    is_vocals = "vocals" in filename_lower
-                    
-                    # Include vocals regardless of chord count, others need > 1 event
-                    if is_vocals or len(chords_data) > 1:
-                        if "guitar" in filename_lower:
-                            inst = "guitar"
-                        elif "piano" in filename_lower:
-                            inst = "piano"
-                        elif "vocals" in filename_lower:
-                            inst = "vocals"
-                        elif "bass" in filename_lower:
-                            inst = "bass"
-                        elif "drums" in filename_lower:
-                            inst = "drums"
-                        else:
-                            # Try to extract instrument from filename
-                            inst = os.path.splitext(os.path.basename(file_path))[0]
-                        instruments[inst] = {'chords': file_path, 'audio': None}
-        except (json.JSONDecodeError, IOError):
+            event_counts[file_path] = len(load_chords(file_path))
+        except (ValueError, IOError):
             continue
 
+    # 1. Find all valid chords files (vocals always included, others need > 1 event OR are the only instrument)
+    for file_path, count in event_counts.items():
+        is_vocals = "vocals" in file_path.lower()
+        
+        # Include vocals regardless of chord count, others need > 1 event
+        if is_vocals or count > 1:
+            instruments[instrument_name(file_path)] = {'chords': file_path, 'audio': None}
+
     # If no instruments found with > 1 event, accept any instrument with at least 1 event
     if not instruments:
-        for file_path in chords_files:
-            if not os.path.exists(file_path):
-                continue
-            try:
-                with open(file_path, 'r') as f:
-                    chords_data = json.load(f)
-                    if isinstance(chords_data, list) and len(chords_data) > 0:
-                        filename_lower = file_path.lower()
-                        if "guitar" in filename_lower:
-                            inst = "guitar"
-                        elif "piano" in filename_lower:
-                            inst = "piano"
-                        elif "vocals" in filename_lower:
-                            inst = "vocals"
-                        elif "bass" in filename_lower:
-                            inst = "bass"
-                        elif "drums" in filename_lower:
-                            inst = "drums"
-                        else:
-                            inst = os.path.splitext(os.path.basename(file_path))[0]
-                        instruments[inst] = {'chords': file_path, 'audio': None}
-            except (json.JSONDecodeError, IOError):
-                continue
+        for file_path, count in event_counts.items():
+            if count > 0:
+                instruments[instrument_name(file_path)] = {'chords': file_path, 'audio': None}
 
     if not instruments:
         print("Warning: No valid chord files found.")
@@ -84,53 +65,176 @@ def get_instruments(chords_files, stem_files):
         if not instruments[inst]['audio']:
             print(f"Warning: Found {inst} chords, but no matching audio stem.")
 
+    # 3. Drop instruments whose stem has nothing to play or hear
+    if silent_stems:
+        audible = {inst: files for inst, files in instruments.items() if files['audio'] not in silent_stems}
+        if audible:
+            for inst in instruments.keys() - audible.keys():
+                print(f"Skipping {inst}: its stem is silent.")
+            instruments = audible
+
     return instruments
 
+def get_active_tracks(instruments, muted):
+    """
+    Pick the stems to play when one instrument is muted for play-along.
+    Vocals are always included when available and not muted.
+
+    Args:
+        instruments (dict): Output of get_instruments.
+        muted (str): The instrument the user plays.
+
+    Returns:
+        tuple: (list of audio file paths, list of display names)
+    """
+    active_tracks = []
+    active_track_names = []
+    vocals_audio = None
+    vocals_name = None
+
+    # First, check for vocals and keep it aside
+    for inst, files in instruments.items():
+        if inst.lower() == 'vocals' and files['audio']:
+            vocals_audio = files['audio']
+            vocals_name = inst.title()
+            break
+
+    # Add all active tracks except muted
+    for inst, files in instruments.items():
+        if inst != muted and files['audio']:
+            active_tracks.append(files['audio'])
+            active_track_names.append(inst.title())
+
+    # Ensure vocals is always included if available and not muted
+    if vocals_audio and muted.lower() != 'vocals' and vocals_audio not in active_tracks:
+        active_tracks.insert(0, vocals_audio)
+        if vocals_name not in active_track_names:
+            active_track_names.insert(0, vocals_name)
+
+    return active_tracks, active_track_names
+
+def common_samplerate(audio_files):
+    """
+    Pick the sample rate every stem should be reconciled to (the highest one,
+    so no stem loses bandwidth).
+
+    Args:
+        audio_files (list): List of audio file paths.
+
+    Returns:
+        int: Target sample rate, or None if no file could be inspected.
+    """
+    import soundfile as sf
+
+    rates = []
+    for audio_file in audio_files:
+        try:
+            rates.append(sf.info(audio_file).samplerate)
+        except Exception as e:
+            print(f"Error reading {audio_file}: {e}")
+    return max(rates) if rates else None
+
+def sum_stems(stems):
+    """
+    Sum decoded stems in order, zero padding the shorter ones, and normalize
+    the result if it would clip.
+
+    Args:
+        stems (list): [(audio_file, numpy array), ...] at a common sample rate.
+
+    Returns:
+        numpy array: The mix.
+    """
+    import numpy as np
+    from kernels import accumulate, normalize_peak
+
+    # Shorter stems are implicitly zero padded to the longest one
+    length = max(len(audio_data) for _, audio_data in stems)
+    mixed_audio = np.zeros((length,) + stems[0][1].shape[1:])
+    
+    # Accumulate in order so the result does not depend on decode timing
+    for audio_file, audio_data in stems:
+        try:
+            accumulate(mixed_audio, audio_data)
+        except ValueError as e:
+            print(f"Error processing {audio_file}: {e}")
+            continue
+    
+    # Normalize to prevent clipping
+    return normalize_peak(mixed_audio)
+
 def mix_audio_files(audio_files, output_path):
     """
     Mix multiple audio files into a single output file.
+    Stems with a different sample rate are resampled to a common rate (cached on disk).
+    Stems are decoded in parallel on the shared audio pool and summed in input order.
     """
     import soundfile as sf
-    import numpy as np
+    from audio_cache import read_resampled
+    from audio_io import map_ordered
     
     if not audio_files:
         return None
     
-    # Load first audio file to get properties
-    mixed_audio, sample_rate = sf.read(audio_files[0])
+    sample_rate = common_samplerate(audio_files)
     
-    # Mix in other audio files
-    for audio_file in audio_files[1:]:
+    def read_stem(audio_file):
         try:
-            audio_data, sr = sf.read(audio_file)
-            if sr != sample_rate:
-                print(f"Warning: Sample rate mismatch in {audio_file}")
-                continue
-            
-            # Handle different lengths by padding with zeros
-            if len(audio_data) > len(mixed_audio):
-                # Pad mixed_audio to match longer file
-                if mixed_audio.ndim == 1:
-                    mixed_audio = np.pad(mixed_audio, (0, len(audio_data) - len(mixed_audio)))
-                else:
-                    mixed_audio = np.pad(mixed_audio, ((0, len(audio_data) - len(mixed_audio)), (0, 0)))
-            elif len(audio_data) < len(mixed_audio):
-                # Pad audio_data to match mixed_audio
-                if audio_data.ndim == 1:
-                    audio_data = np.pad(audio_data, (0, len(mixed_audio) - len(audio_data)))
-                else:
-                    audio_data = np.pad(audio_data, ((0, len(mixed_audio) - len(audio_data)), (0, 0)))
-            
-            # Add audio data to mix
-            mixed_audio = mixed_audio + audio_data
+            audio_data, _ = read_resampled(audio_file, sample_rate)
+            return audio_data
         except Exception as e:
             print(f"Error processing {audio_file}: {e}")
-            continue
+            return None
     
-    # Normalize to prevent clipping
-    if mixed_audio.max() > 1.0 or mixed_audio.min() < -1.0:
-        mixed_audio = mixed_audio / np.max(np.abs(mixed_audio))
+    # Decode every stem concurrently (soundfile releases the GIL while decoding)
+    stems = [(f, d) for f, d in zip(audio_files, map_ordered(read_stem, audio_files)) if d is not None]
+    if not stems:
+        return None
+    
+    mixed_audio = sum_stems(stems)
     
     # Save mixed audio
     sf.write(output_path, mixed_audio, sample_rate)
+    return output_path
+
+def mix_audio_region(audio_files, start_time, end_time, output_path, envelopes=None):
+    """
+    Mix only the [start_time, end_time) range of the stems, reading just those
+    frames from each file instead of decoding whole songs.
+    Stems whose activity envelope (see envelopes.py) is silent over the range
+    are not read at all.
+    """
+    import soundfile as sf
+    from audio_io import map_ordered, read_frames
+    
+    if not audio_files or end_time <= start_time:
+        return None
+    
+    if envelopes:
+        from envelopes import silent_stems
+        silent = silent_stems(envelopes, audio_files, start_time, end_time)
+        # Keep one stem so a silent passage still renders (as silence)
+        audio_files = [f for f in audio_files if f not in silent] or audio_files[:1]
+    
+    sample_rate = common_samplerate(audio_files)
+    
+    def read_region(audio_file):
+        try:
+            stem_rate = sf.info(audio_file).samplerate
+            audio_data, _ = read_frames(audio_file, int(start_time * stem_rate), int(end_time * stem_rate))
+            if stem_rate != sample_rate:
+                import soxr
+                audio_data = soxr.resample(audio_data, stem_rate, sample_rate)
+            return audio_data
+        except Exception as e:
+            print(f"Error processing {audio_file}: {e}")
+            return None
+    
+    stems = [(f, d) for f, d in zip(audio_files, map_ordered(read_region, audio_files)) if d is not None and len(d)]
+    if not stems:
+        return None
+    
+    # Loops are shared cache entries: other sessions must never see a partial file
+    from audio_cache import write_audio_atomic
+    write_audio_atomic(output_path, sum_stems(stems), sample_rate, subtype='PCM_16')
     return output_path
\ No newline at end of file